@@ -3,6 +3,11 @@ from typing import Optional
 from fastapi import Depends, FastAPI, HTTPException, status, Security
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError, jwt
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from app.config import int_env
+from app.database import get_db
+from app.models import models
 import bcrypt
 import os
 from dotenv import load_dotenv
@@ -20,11 +25,7 @@ security = HTTPBearer(
 # override these with real secrets.
 SECRET_KEY = os.getenv("SECRET_KEY", "dev-secret-key")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
-try:
-    ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
-except (TypeError, ValueError):
-    # Fall back to a reasonable default if the env var is malformed
-    ACCESS_TOKEN_EXPIRE_MINUTES = 30
+ACCESS_TOKEN_EXPIRE_MINUTES = int_env("ACCESS_TOKEN_EXPIRE_MINUTES", 30)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     # Ensure passwords are properly encoded
@@ -56,6 +57,18 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+def token_claims(token: str) -> Optional[dict]:
+    """The claims of a valid access token, or None."""
+    try:
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+
+def token_subject(token: str) -> Optional[str]:
+    """The ``sub`` of a valid access token, or None."""
+    claims = token_claims(token)
+    return claims.get("sub") if claims else None
+
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Security(security)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -72,4 +85,17 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Security(
         raise credentials_exception
         
     # User validation will be implemented here
-    return email
\ No newline at end of file
+    return email
+
+async def verify_admin(current_user: str = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    # Use SQLAlchemy select expression
+    query = select(models.User.role).where(models.User.email == current_user)
+    result = await db.execute(query)
+    user_role = result.scalar_one_or_none()
+    
+    if not user_role or user_role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin privileges required"
+        )
+    return current_user
\ No newline at end of file
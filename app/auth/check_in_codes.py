@@ -0,0 +1,44 @@
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+from app.auth.auth_handler import SECRET_KEY
+import base64
+import calendar
+import hashlib
+import hmac
+
+# Check-in is allowed from 5 minutes before to 5 minutes after the slot start
+CHECK_IN_WINDOW = timedelta(minutes=5)
+
+_KEY = hashlib.sha256(f"check-in:{SECRET_KEY}".encode('utf-8')).digest()
+
+def _sign(payload: str) -> str:
+    digest = hmac.new(_KEY, payload.encode('utf-8'), hashlib.sha256).digest()[:12]
+    return base64.urlsafe_b64encode(digest).decode('ascii')
+
+def issue_code(booking_id: int, start_time: datetime) -> str:
+    """Return a code of the form ``<booking_id>.<slot start epoch>.<signature>``."""
+    payload = f"{booking_id}.{calendar.timegm(start_time.utctimetuple())}"
+    return f"{payload}.{_sign(payload)}"
+
+def verify_code(code: str, now: Optional[datetime] = None) -> Tuple[Optional[int], Optional[str]]:
+    """Check a code's signature and time window without touching the database.
+
+    Returns ``(booking_id, None)`` when the code can be used now, otherwise
+    ``(booking_id or None, reason)``.
+    """
+    try:
+        booking_id, start_epoch, signature = code.strip().split(".")
+        payload = f"{int(booking_id)}.{int(start_epoch)}"
+    except (AttributeError, ValueError):
+        return None, "Invalid check-in code"
+
+    if not hmac.compare_digest(signature, _sign(payload)):
+        return None, "Invalid check-in code"
+
+    now = now or datetime.utcnow()
+    start_time = datetime.utcfromtimestamp(int(start_epoch))
+    if now < start_time - CHECK_IN_WINDOW:
+        return int(booking_id), "Too early to check in"
+    if now > start_time + CHECK_IN_WINDOW:
+        return int(booking_id), "Check-in period has expired"
+    return int(booking_id), None
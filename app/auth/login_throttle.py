@@ -0,0 +1,134 @@
+from app.auth.auth_handler import get_password_hash, verify_password
+from app.database import current_site
+from app.config import int_env
+from collections import OrderedDict, deque
+from typing import Deque, Optional
+import time
+
+# Failed logins are counted per account and per client IP over a sliding
+# window. An account's email and SAP ID share one count; usernames that match
+# no account are counted by the name as typed. Past the free attempts each further
+# failure doubles the wait before the next attempt; at the lockout threshold
+# the key is locked for LOGIN_LOCKOUT_SECONDS. All checks run before bcrypt.
+LOGIN_WINDOW_SECONDS = int_env("LOGIN_WINDOW_SECONDS", 900)
+ACCOUNT_FREE_ATTEMPTS = int_env("LOGIN_ACCOUNT_FREE_ATTEMPTS", 5)
+ACCOUNT_LOCKOUT_ATTEMPTS = int_env("LOGIN_ACCOUNT_LOCKOUT_ATTEMPTS", 10)
+IP_FREE_ATTEMPTS = int_env("LOGIN_IP_FREE_ATTEMPTS", 20)
+IP_LOCKOUT_ATTEMPTS = int_env("LOGIN_IP_LOCKOUT_ATTEMPTS", 50)
+LOGIN_LOCKOUT_SECONDS = int_env("LOGIN_LOCKOUT_SECONDS", 900)
+BACKOFF_BASE_SECONDS = 1
+BACKOFF_MAX_SECONDS = 300
+# Bounds memory under a storm of distinct usernames or addresses; the least
+# recently seen keys are dropped first
+MAX_TRACKED_KEYS = int_env("LOGIN_THROTTLE_MAX_KEYS", 10000)
+
+stats = {
+    "checks": 0,
+    "failures": 0,
+    "throttled_account": 0,
+    "throttled_ip": 0,
+    "lockouts": 0,
+    "dummy_verifies": 0,
+}
+
+class SlidingWindow:
+    """Failure timestamps per key within the window, LRU-bounded."""
+
+    def __init__(self, free_attempts: int, lockout_attempts: int):
+        self.free_attempts = free_attempts
+        self.lockout_attempts = lockout_attempts
+        self._failures: "OrderedDict[str, Deque[float]]" = OrderedDict()
+
+    def _recent(self, key: str, now: float) -> Optional[Deque[float]]:
+        failures = self._failures.get(key)
+        if failures is None:
+            return None
+        while failures and failures[0] <= now - LOGIN_WINDOW_SECONDS:
+            failures.popleft()
+        if not failures:
+            del self._failures[key]
+            return None
+        return failures
+
+    def retry_after(self, key: str, now: float) -> float:
+        """Seconds until ``key`` may try again; 0 when it may try now."""
+        failures = self._recent(key, now)
+        if failures is None or len(failures) < self.free_attempts:
+            return 0
+        if len(failures) >= self.lockout_attempts:
+            wait = LOGIN_LOCKOUT_SECONDS
+        else:
+            excess = len(failures) - self.free_attempts
+            wait = min(BACKOFF_BASE_SECONDS * 2 ** excess, BACKOFF_MAX_SECONDS)
+        return max(0, failures[-1] + wait - now)
+
+    def record_failure(self, key: str, now: float) -> int:
+        failures = self._recent(key, now)
+        if failures is None:
+            failures = self._failures[key] = deque(maxlen=self.lockout_attempts)
+        failures.append(now)
+        self._failures.move_to_end(key)
+        while len(self._failures) > MAX_TRACKED_KEYS:
+            self._failures.popitem(last=False)
+        return len(failures)
+
+    def clear(self, key: str):
+        self._failures.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._failures)
+
+accounts = SlidingWindow(ACCOUNT_FREE_ATTEMPTS, ACCOUNT_LOCKOUT_ATTEMPTS)
+client_ips = SlidingWindow(IP_FREE_ATTEMPTS, IP_LOCKOUT_ATTEMPTS)
+
+def _account_key(username: str, user_id: Optional[int]) -> str:
+    # The same email, SAP ID or user id can be a different account at
+    # another site
+    if user_id is not None:
+        return f"{current_site.get()}:user:{user_id}"
+    return f"{current_site.get()}:name:{username.strip().lower()}"
+
+def check(username: str, user_id: Optional[int], client_ip: str) -> int:
+    """Whole seconds the caller must wait before this login may be tried.
+    ``user_id`` is the account ``username`` names, None if there is none."""
+    now = time.monotonic()
+    stats["checks"] += 1
+    ip_wait = client_ips.retry_after(client_ip, now)
+    if ip_wait:
+        stats["throttled_ip"] += 1
+        return int(ip_wait) + 1
+    account_wait = accounts.retry_after(_account_key(username, user_id), now)
+    if account_wait:
+        stats["throttled_account"] += 1
+        return int(account_wait) + 1
+    return 0
+
+def record_failure(username: str, user_id: Optional[int], client_ip: str):
+    now = time.monotonic()
+    stats["failures"] += 1
+    account_count = accounts.record_failure(_account_key(username, user_id), now)
+    ip_count = client_ips.record_failure(client_ip, now)
+    if account_count == accounts.lockout_attempts or ip_count == client_ips.lockout_attempts:
+        stats["lockouts"] += 1
+
+def record_success(username: str, user_id: int):
+    accounts.clear(_account_key(username, user_id))
+
+_dummy_hash: Optional[str] = None
+
+def dummy_verify(password: str) -> bool:
+    """Spend the same bcrypt time as a real check for an unknown user, so
+    response times do not reveal which usernames exist. Always False."""
+    global _dummy_hash
+    if _dummy_hash is None:
+        _dummy_hash = get_password_hash("dummy-password-for-timing")
+    stats["dummy_verifies"] += 1
+    verify_password(password, _dummy_hash)
+    return False
+
+def summary() -> dict:
+    return {
+        **stats,
+        "tracked_accounts": len(accounts),
+        "tracked_ips": len(client_ips),
+    }
@@ -0,0 +1,99 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, and_
+from app.models import models
+from app.config import int_env
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+import hashlib
+import secrets
+import uuid
+
+REFRESH_TOKEN_EXPIRE_DAYS = int_env("REFRESH_TOKEN_EXPIRE_DAYS", 30)
+
+def _digest(token: str) -> str:
+    # Tokens are 256 random bits, so a fast digest is enough; bcrypt would
+    # put the cost we are avoiding back on every refresh
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+async def _store(db: AsyncSession, user_id: int, family_id: str, now: datetime) -> Tuple[str, models.RefreshToken]:
+    token = secrets.token_urlsafe(32)
+    row = models.RefreshToken(
+        user_id=user_id,
+        family_id=family_id,
+        token_hash=_digest(token),
+        expires_at=now + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
+        created_at=now
+    )
+    db.add(row)
+    await db.flush()
+    return token, row
+
+async def issue(db: AsyncSession, user_id: int) -> str:
+    """Start a new token family for one login. The caller commits."""
+    token, _ = await _store(db, user_id, uuid.uuid4().hex, datetime.utcnow())
+    return token
+
+async def revoke_family(db: AsyncSession, family_id: str, now: datetime = None):
+    await db.execute(
+        update(models.RefreshToken)
+        .where(
+            and_(
+                models.RefreshToken.family_id == family_id,
+                models.RefreshToken.revoked_at.is_(None)
+            )
+        )
+        .values(revoked_at=now or datetime.utcnow())
+    )
+
+async def rotate(db: AsyncSession, token: str) -> Tuple[Optional[models.User], Optional[str]]:
+    """Exchange a refresh token for a new one in the same family.
+
+    Returns ``(user, new_token)``, or ``(None, None)`` when the token is
+    unknown, expired or revoked. A token that was already exchanged means it
+    leaked, so its whole family is revoked. The caller commits in every case.
+    """
+    now = datetime.utcnow()
+    result = await db.execute(
+        select(models.RefreshToken, models.User)
+        .join(models.User, models.RefreshToken.user_id == models.User.id)
+        .where(models.RefreshToken.token_hash == _digest(token))
+    )
+    row = result.first()
+    if not row:
+        return None, None
+    current, user = row
+
+    if current.replaced_by is not None:
+        await revoke_family(db, current.family_id, now)
+        return None, None
+    if current.revoked_at is not None or current.expires_at <= now or not user.is_active:
+        return None, None
+
+    new_token, new_row = await _store(db, user.id, current.family_id, now)
+    # Guarded so two concurrent refreshes with the same token cannot both win
+    claimed = await db.execute(
+        update(models.RefreshToken)
+        .where(
+            and_(
+                models.RefreshToken.id == current.id,
+                models.RefreshToken.replaced_by.is_(None),
+                models.RefreshToken.revoked_at.is_(None)
+            )
+        )
+        .values(replaced_by=new_row.id)
+    )
+    if claimed.rowcount != 1:
+        await db.delete(new_row)
+        await revoke_family(db, current.family_id, now)
+        return None, None
+    return user, new_token
+
+async def revoke(db: AsyncSession, token: str):
+    """Log a device out by revoking the family of its refresh token."""
+    result = await db.execute(
+        select(models.RefreshToken.family_id)
+        .where(models.RefreshToken.token_hash == _digest(token))
+    )
+    family_id = result.scalar_one_or_none()
+    if family_id:
+        await revoke_family(db, family_id)
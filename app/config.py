@@ -0,0 +1,16 @@
+import os
+
+# Settings read from the environment fall back to their default when the
+# variable is unset or malformed, so a typo never stops the app starting.
+
+def int_env(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except (TypeError, ValueError):
+        return default
+
+def float_env(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except (TypeError, ValueError):
+        return default
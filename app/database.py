@@ -1,15 +1,56 @@
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+from sqlalchemy import inspect, text
 from sqlalchemy.orm import sessionmaker, declarative_base
+from typing import Dict, NamedTuple
+import contextvars
+import os
+import re
 
-SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///./game_booking.db"
+# Each site (office building) keeps its data in its own SQLite file, so the
+# sites do not queue behind one write lock. SITES lists the site names; left
+# unset there is a single site, "default", in ./game_booking.db as before.
+# Other sites live in SITE_DATABASE_DIR/game_booking_<site>.db. Requests pick
+# their site by path prefix, header or token claim (app/services/sites.py);
+# requests that name none go to DEFAULT_SITE, the first listed.
+SITE_DATABASE_DIR = os.getenv("SITE_DATABASE_DIR", ".")
+SITES = tuple(name.strip() for name in os.getenv("SITES", "default").split(",") if name.strip()) or ("default",)
+DEFAULT_SITE = os.getenv("DEFAULT_SITE", SITES[0])
+SITE_NAME_PATTERN = re.compile(r"^[a-z0-9][a-z0-9_-]{0,31}$")
 
-engine = create_async_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+for _site in SITES + (DEFAULT_SITE,):
+    if not SITE_NAME_PATTERN.match(_site):
+        raise ValueError(f"Invalid site name {_site!r}: use lower-case letters, digits, '-' and '_'")
+if DEFAULT_SITE not in SITES:
+    raise ValueError(f"DEFAULT_SITE {DEFAULT_SITE!r} is not one of SITES")
 
-async_session = sessionmaker(
-    engine, class_=AsyncSession, expire_on_commit=False
-)
+def database_url(site: str) -> str:
+    if site == "default":
+        return "sqlite+aiosqlite:///./game_booking.db"
+    return f"sqlite+aiosqlite:///{os.path.join(SITE_DATABASE_DIR, f'game_booking_{site}.db')}"
+
+class Shard(NamedTuple):
+    site: str
+    engine: AsyncEngine
+    session: sessionmaker
+
+def open_shard(site: str, url: str = None) -> Shard:
+    engine = create_async_engine(
+        url or database_url(site), connect_args={"check_same_thread": False}
+    )
+    return Shard(site, engine, sessionmaker(engine, class_=AsyncSession, expire_on_commit=False))
+
+# Engines open their file on first use
+shards: Dict[str, Shard] = {site: open_shard(site) for site in SITES}
+
+# The site the current request or background task works on
+current_site: contextvars.ContextVar = contextvars.ContextVar("site", default=DEFAULT_SITE)
+
+def shard() -> Shard:
+    return shards[current_site.get()]
+
+def async_session(**kwargs) -> AsyncSession:
+    """A session on the current site's database."""
+    return shard().session(**kwargs)
 
 Base = declarative_base()
 
@@ -23,3 +64,25 @@ async def get_db():
             raise
         finally:
             await session.close()
+
+def add_missing_columns(connection):
+    """create_all does not alter existing tables; add columns declared on
+    them since the database file was created. Such columns must be
+    nullable or have a server default."""
+    inspector = inspect(connection)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            column_type = column.type.compile(dialect=connection.dialect)
+            connection.execute(text(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}'))
+
+def create_missing_indexes(connection):
+    """create_all only builds indexes for new tables; add ones declared on
+    existing tables since the database file was created."""
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
@@ -6,9 +6,11 @@ from sqlalchemy import select, update, and_
 from datetime import datetime, timedelta
 import asyncio
 from typing import List
-from app.database import get_db, engine, Base
+from app.database import get_db, shards, shard, Base, add_missing_columns, create_missing_indexes
 from app.models import models
 from app.auth.auth_handler import get_current_user
+from app.services import participants, waitlist, archive, jobs, idempotency, static_ui, booking_writer, lottery, profiling, booking_search, sites
+from app.services.slot_index import slot_index
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
@@ -23,6 +25,8 @@ app = FastAPI(
         {"name": "slots", "description": "Slot booking and management"},
         {"name": "bookings", "description": "Booking operations"},
         {"name": "admin", "description": "Admin only operations"},
+        {"name": "grid", "description": "Compact multi-day availability"},
+        {"name": "bootstrap", "description": "Dashboard data in one request"},
     ],
     swagger_ui_parameters={
         "defaultModelsExpandDepth": -1,
@@ -30,7 +34,20 @@ app = FastAPI(
     }
 )
 
-# CORS middleware configuration
+# Replay stored responses for retried writes. Added before CORS so that
+# replayed responses still get CORS headers.
+app.add_middleware(idempotency.IdempotencyMiddleware)
+
+# Profile single requests on demand (X-Profile header from an admin, or
+# sampling). Added before CORS so CORS handling is not part of the profile.
+app.add_middleware(profiling.ProfilingMiddleware, router=app.router)
+
+# Pick each request's site database. Added after idempotency and profiling
+# so that it runs before them and they see the request's site.
+app.add_middleware(sites.SiteMiddleware)
+
+# CORS middleware configuration. The UI served by the app itself is
+# same-origin; this is for UIs served from elsewhere.
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -39,17 +56,33 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize database
+# Initialize every site's database
 @app.on_event("startup")
 async def startup():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    for site, site_shard in shards.items():
+        async with site_shard.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.run_sync(add_missing_columns)
+            await conn.run_sync(create_missing_indexes)
+            await conn.run_sync(participants.backfill_participants)
+            await conn.run_sync(booking_search.backfill_slot_columns)
+            await conn.run_sync(sites.assign_game_site(site))
+
+# Load the built web UI into memory, building it first if it is out of date
+@app.on_event("startup")
+async def load_ui():
+    try:
+        served = static_ui.load()
+        if served:
+            print(f"Serving {static_ui.UI_DIR} at / ({served} paths)")
+    except Exception as e:
+        print(f"Error loading UI from {static_ui.UI_DIR}: {e}")
 
 # Background task for checking and releasing slots
 async def check_and_release_slots():
     while True:
         try:
-            async with AsyncSession(engine) as session:
+            async with AsyncSession(shard().engine) as session:
                 current_time = datetime.utcnow()
                 check_time = current_time + timedelta(minutes=5)
                 
@@ -58,7 +91,11 @@ async def check_and_release_slots():
                     select(
                         models.Booking.id,
                         models.Booking.user_id,
+                        models.Booking.created_at,
+                        models.Booking.slot_id,
+                        models.Slot.game_id,
                         models.Slot.start_time,
+                        models.Slot.end_time,
                         models.User.email
                     )
                     .join(models.Slot, models.Booking.slot_id == models.Slot.id)
@@ -75,7 +112,15 @@ async def check_and_release_slots():
                 result = await session.execute(query)
                 bookings_to_cancel = result.fetchall()
 
+                released_slot_ids = []
+                released = {}
                 for booking in bookings_to_cancel:
+                    # Bookings made inside the 5 minute lead time (e.g. waitlist
+                    # promotions) keep the slot until the check-in window closes
+                    late_booking = booking.created_at > booking.start_time - timedelta(minutes=5)
+                    if late_booking and current_time <= booking.start_time + timedelta(minutes=5):
+                        continue
+
                     # Cancel booking
                     update_stmt = (
                         update(models.Booking)
@@ -86,6 +131,8 @@ async def check_and_release_slots():
                         )
                     )
                     await session.execute(update_stmt)
+                    released_slot_ids.append(booking.slot_id)
+                    released[booking.slot_id] = booking
                     
                     # Send email notification
                     send_email(
@@ -93,14 +140,126 @@ async def check_and_release_slots():
                         "Booking Cancelled - No Check-in",
                         "Your booking has been cancelled due to no check-in within 5 minutes of start time."
                     )
+
+                if released_slot_ids:
+                    # Free the slots and offer them to their waitlists in one batch
+                    await session.execute(
+                        update(models.Slot)
+                        .where(
+                            and_(
+                                models.Slot.id.in_(released_slot_ids),
+                                models.Slot.is_cancelled == False
+                            )
+                        )
+                        .values(is_available=True, updated_at=current_time)
+                    )
+                    promoted = await waitlist.promote(session, released_slot_ids, current_time)
+                    for promotion in promoted:
+                        released.pop(promotion["slot_id"], None)
+                    for promotion in promoted:
+                        send_email(
+                            promotion["email"],
+                            "Booking Confirmed - Waitlist",
+                            f"A slot starting at {promotion['start_time']} is now booked for you. "
+                            "Please check in within 5 minutes of the start time."
+                        )
                 await session.commit()
+                for booking in released.values():
+                    slot_index.mark_free(booking.slot_id, booking.game_id, booking.start_time, booking.end_time)
         except Exception as e:
             print(f"Error in slot checking task: {e}")
         await asyncio.sleep(60)  # Check every minute
 
 @app.on_event("startup")
 async def start_slot_checker():
-    asyncio.create_task(check_and_release_slots())
+    sites.start_per_site(check_and_release_slots)
+
+# Background task for moving old slots and bookings to the archive tables
+async def archive_old_rows():
+    while True:
+        try:
+            archive.stats["runs"] += 1
+            cutoff = archive.archive_cutoff()
+            while True:
+                # One short transaction per batch so the write lock is
+                # released between batches
+                async with AsyncSession(shard().engine) as session:
+                    moved = await archive.archive_batch(session, cutoff)
+                    await session.commit()
+                if moved["slots"] < archive.ARCHIVE_BATCH_SIZE:
+                    break
+                await asyncio.sleep(archive.ARCHIVE_BATCH_PAUSE_SECONDS)
+            archive.stats["last_run_at"] = datetime.utcnow()
+        except Exception as e:
+            print(f"Error in archive task: {e}")
+        await asyncio.sleep(archive.ARCHIVE_INTERVAL_SECONDS)
+
+@app.on_event("startup")
+async def start_archiver():
+    sites.start_per_site(archive_old_rows)
+
+# Background task for admin jobs. Jobs are stored in admin_jobs, so queued
+# and interrupted jobs are picked up again after a restart.
+async def run_admin_jobs():
+    while True:
+        try:
+            async with AsyncSession(shard().engine) as session:
+                job = await jobs.next_job(session)
+                job_id = job.id if job else None
+            if job_id is None:
+                await jobs.wait_for_work()
+                continue
+            while True:
+                # One short transaction per chunk
+                async with AsyncSession(shard().engine, expire_on_commit=False) as session:
+                    finished = await jobs.run_chunk(session, job_id)
+                if finished:
+                    break
+                await asyncio.sleep(jobs.JOB_CHUNK_PAUSE_SECONDS)
+        except Exception as e:
+            print(f"Error in admin job task: {e}")
+            await asyncio.sleep(jobs.JOB_POLL_SECONDS)
+
+@app.on_event("startup")
+async def start_job_runner():
+    sites.start_per_site(run_admin_jobs)
+
+# Single writer for booking mutations, one per site; see app/services/booking_writer.py
+@app.on_event("startup")
+async def start_booking_writer():
+    sites.start_per_site(booking_writer.run)
+
+# Background task for allocating lottery releases whose entry window has
+# closed. Each allocation goes through the booking writer, so it is one
+# transaction ordered with the booking requests around it.
+async def allocate_lottery_releases():
+    while True:
+        try:
+            async with AsyncSession(shard().engine) as session:
+                due = await lottery.due_release_ids(session, datetime.utcnow())
+            for release_id in due:
+                async with AsyncSession(shard().engine, expire_on_commit=False) as session:
+                    await booking_writer.submit(session, lottery.allocate, release_id)
+        except Exception as e:
+            print(f"Error in lottery task: {e}")
+        await asyncio.sleep(lottery.LOTTERY_POLL_SECONDS)
+
+@app.on_event("startup")
+async def start_lottery():
+    sites.start_per_site(allocate_lottery_releases)
+
+# Background task for dropping expired idempotency keys
+async def purge_idempotency_keys():
+    while True:
+        try:
+            await idempotency.purge_expired()
+        except Exception as e:
+            print(f"Error in idempotency purge task: {e}")
+        await asyncio.sleep(idempotency.IDEMPOTENCY_PURGE_INTERVAL_SECONDS)
+
+@app.on_event("startup")
+async def start_idempotency_purge():
+    sites.start_per_site(purge_idempotency_keys)
 
 # Email sending function
 def send_email(to_email: str, subject: str, body: str):
@@ -125,10 +284,13 @@ def send_email(to_email: str, subject: str, body: str):
         print(f"Failed to send email: {e}")
 
 # Import and include routers
-from app.routers import users, games, slots, bookings, admin
+from app.routers import users, games, slots, bookings, admin, grid, bootstrap, ui
 
 app.include_router(users.router)
 app.include_router(games.router)
 app.include_router(slots.router)
 app.include_router(bookings.router)
-app.include_router(admin.router)
\ No newline at end of file
+app.include_router(admin.router)
+app.include_router(grid.router)
+app.include_router(bootstrap.router)
+app.include_router(ui.router)
\ No newline at end of file
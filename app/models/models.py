@@ -1,6 +1,6 @@
 from datetime import datetime, timedelta
 from typing import Optional, List
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, Boolean, Date, DateTime, Time, ForeignKey, Enum, Index
 from sqlalchemy.orm import relationship
 from app.database import Base
 import enum
@@ -41,12 +41,17 @@ class Game(Base):
     type = Column(String, nullable=False)
     max_players = Column(Integer, nullable=False)
     status = Column(String, default=GameStatus.ACTIVE)
+    # The site whose database holds the game; see app/database.py
+    site = Column(String, nullable=True, index=True)
     slots = relationship("Slot", back_populates="game")
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
 class Slot(Base):
     __tablename__ = "slots"
+    __table_args__ = (
+        Index("ix_slots_game_id_start_time", "game_id", "start_time"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     game_id = Column(Integer, ForeignKey("games.id"))
@@ -62,15 +67,247 @@ class Slot(Base):
 
 class Booking(Base):
     __tablename__ = "bookings"
+    __table_args__ = (
+        # Admin booking search (app/services/booking_search.py): one index
+        # per leading filter, each followed by the (slot_start_time, id) sort
+        # key and then the remaining filters, which are checked in the index
+        Index("ix_bookings_slot_start_time_id", "slot_start_time", "id", "status", "checked_in"),
+        Index("ix_bookings_game_id_slot_start_time_id", "game_id", "slot_start_time", "id", "status", "checked_in"),
+        Index("ix_bookings_user_id_slot_start_time_id", "user_id", "slot_start_time", "id", "status", "checked_in"),
+        Index("ix_bookings_status_slot_start_time_id", "status", "slot_start_time", "id", "checked_in"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     slot_id = Column(Integer, ForeignKey("slots.id"))
+    # Copies of the slot's game_id and start_time (slots never move), so
+    # bookings can be filtered and sorted without joining slots
+    game_id = Column(Integer, ForeignKey("games.id"), nullable=True)
+    slot_start_time = Column(DateTime, nullable=True)
     status = Column(String, default="pending")  # pending, confirmed, cancelled, completed
     other_players = Column(String, nullable=True)  # Comma-separated SAP IDs
     checked_in = Column(Boolean, default=False)
     check_in_time = Column(DateTime, nullable=True)
     user = relationship("User", back_populates="bookings")
     slot = relationship("Slot", back_populates="booking")
+    participants = relationship("BookingParticipant", back_populates="booking")
     created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
\ No newline at end of file
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class BookingParticipant(Base):
+    __tablename__ = "booking_participants"
+
+    # One row per player on a booking, including the user who made it.
+    # Booking.other_players is kept as the API-facing string.
+    booking_id = Column(Integer, ForeignKey("bookings.id"), primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True, index=True)
+    booking = relationship("Booking", back_populates="participants")
+
+class RefreshToken(Base):
+    __tablename__ = "refresh_tokens"
+
+    # Only a SHA-256 digest of the token is stored. Each refresh replaces the
+    # token with a new one in the same family; presenting a replaced token
+    # again revokes the whole family (app/auth/refresh_tokens.py).
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    family_id = Column(String, nullable=False, index=True)
+    token_hash = Column(String, unique=True, index=True, nullable=False)
+    replaced_by = Column(Integer, ForeignKey("refresh_tokens.id"), nullable=True)
+    expires_at = Column(DateTime, nullable=False)
+    revoked_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class WaitlistStatus(str, enum.Enum):
+    WAITING = "waiting"
+    PROMOTED = "promoted"
+    SKIPPED = "skipped"
+    LEFT = "left"
+
+class WaitlistEntry(Base):
+    __tablename__ = "slot_waitlist"
+    __table_args__ = (
+        Index("ix_slot_waitlist_slot_status_id", "slot_id", "status", "id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    slot_id = Column(Integer, ForeignKey("slots.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    other_players = Column(String, nullable=True)  # Comma-separated SAP IDs
+    status = Column(String, default=WaitlistStatus.WAITING)
+    booking_id = Column(Integer, ForeignKey("bookings.id"), nullable=True)
+    skip_reason = Column(String, nullable=True)
+    promoted_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class ReleaseStatus(str, enum.Enum):
+    COLLECTING = "collecting"
+    ALLOCATED = "allocated"
+
+class LotteryMode(str, enum.Enum):
+    RANDOM = "random"
+    WEIGHTED = "weighted"
+
+class SlotRelease(Base):
+    __tablename__ = "slot_releases"
+    __table_args__ = (
+        Index("ix_slot_releases_game_id_day_status", "game_id", "day", "status"),
+        Index("ix_slot_releases_status_allocate_at", "status", "allocate_at"),
+    )
+
+    # A high-demand day of one game released by lottery (app/services/lottery.py).
+    # Booking requests for its slots between opens_at and allocate_at are
+    # stored as entries and allocated together at allocate_at.
+    id = Column(Integer, primary_key=True, index=True)
+    game_id = Column(Integer, ForeignKey("games.id"), nullable=False)
+    day = Column(Date, nullable=False)
+    mode = Column(String, default=LotteryMode.RANDOM)
+    opens_at = Column(DateTime, nullable=False)
+    allocate_at = Column(DateTime, nullable=False)
+    status = Column(String, default=ReleaseStatus.COLLECTING)
+    counts = Column(String, default="{}")  # JSON
+    created_by = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    allocated_at = Column(DateTime, nullable=True)
+
+class LotteryEntryStatus(str, enum.Enum):
+    PENDING = "pending"
+    WON = "won"
+    LOST = "lost"
+
+class LotteryEntry(Base):
+    __tablename__ = "lottery_entries"
+    __table_args__ = (
+        Index("ix_lottery_entries_release_id_user_id_slot_id", "release_id", "user_id", "slot_id", unique=True),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    release_id = Column(Integer, ForeignKey("slot_releases.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    slot_id = Column(Integer, ForeignKey("slots.id"), nullable=False)
+    other_players = Column(String, nullable=True)  # Comma-separated SAP IDs
+    status = Column(String, default=LotteryEntryStatus.PENDING)
+    booking_id = Column(Integer, ForeignKey("bookings.id"), nullable=True)
+    reason = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class ScheduleTemplate(Base):
+    __tablename__ = "schedule_templates"
+
+    # Recurring opening hours for a game. Slots of templated games are
+    # computed on read and only stored once they are booked or cancelled.
+    id = Column(Integer, primary_key=True, index=True)
+    game_id = Column(Integer, ForeignKey("games.id"), unique=True, nullable=False)
+    weekdays = Column(String, default="0,1,2,3,4")  # Comma-separated, 0 = Monday
+    open_time = Column(Time, nullable=False)
+    close_time = Column(Time, nullable=False)
+    slot_minutes = Column(Integer, default=30)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class ScheduleException(Base):
+    __tablename__ = "schedule_exceptions"
+    __table_args__ = (
+        Index("ix_schedule_exceptions_date_game_id", "date", "game_id"),
+    )
+
+    # A closed day, for one game or for every game when game_id is NULL
+    id = Column(Integer, primary_key=True, index=True)
+    game_id = Column(Integer, ForeignKey("games.id"), nullable=True)
+    date = Column(Date, nullable=False)
+    reason = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class JobStatus(str, enum.Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+class AdminJob(Base):
+    __tablename__ = "admin_jobs"
+    __table_args__ = (
+        Index("ix_admin_jobs_status_id", "status", "id"),
+    )
+
+    # A long admin operation run in chunks by the job runner
+    # (app/services/jobs.py). cursor is the last processed id or day, so a
+    # job picks up after its last committed chunk when the server restarts.
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String, nullable=False)
+    params = Column(String, nullable=False)  # JSON
+    status = Column(String, default=JobStatus.QUEUED)
+    cursor = Column(String, nullable=True)
+    total = Column(Integer, nullable=True)
+    processed = Column(Integer, default=0)
+    counts = Column(String, default="{}")  # JSON
+    error = Column(String, nullable=True)
+    created_by = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class IdempotencyRecord(Base):
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (
+        Index("ix_idempotency_keys_scope_key", "scope", "key", unique=True),
+    )
+
+    # First response to a write sent with an Idempotency-Key header, replayed
+    # for retries (app/services/idempotency.py). status_code is NULL while the
+    # original request is still running.
+    id = Column(Integer, primary_key=True, index=True)
+    scope = Column(String, nullable=False)  # Token subject (user email)
+    key = Column(String, nullable=False)
+    request_hash = Column(String, nullable=False)
+    status_code = Column(Integer, nullable=True)
+    content_type = Column(String, nullable=True)
+    body = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+# Archive tables. Past slots and their bookings are moved here by the
+# background archiver (app/services/archive.py) so the hot tables stay small.
+# Columns mirror Slot, Booking and BookingParticipant, ids are preserved.
+
+class ArchivedSlot(Base):
+    __tablename__ = "archived_slots"
+    __table_args__ = (
+        Index("ix_archived_slots_game_id_start_time", "game_id", "start_time"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    game_id = Column(Integer, ForeignKey("games.id"))
+    start_time = Column(DateTime, nullable=False)
+    end_time = Column(DateTime, nullable=False)
+    is_available = Column(Boolean, default=True)
+    is_cancelled = Column(Boolean, default=False)
+    cancellation_reason = Column(String, nullable=True)
+    created_at = Column(DateTime)
+    updated_at = Column(DateTime)
+    archived_at = Column(DateTime, default=datetime.utcnow)
+
+class ArchivedBooking(Base):
+    __tablename__ = "archived_bookings"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
+    slot_id = Column(Integer, ForeignKey("archived_slots.id"), index=True)
+    game_id = Column(Integer, ForeignKey("games.id"), nullable=True)
+    slot_start_time = Column(DateTime, nullable=True)
+    status = Column(String)
+    other_players = Column(String, nullable=True)
+    checked_in = Column(Boolean, default=False)
+    check_in_time = Column(DateTime, nullable=True)
+    created_at = Column(DateTime)
+    updated_at = Column(DateTime)
+    archived_at = Column(DateTime, default=datetime.utcnow)
+
+class ArchivedBookingParticipant(Base):
+    __tablename__ = "archived_booking_participants"
+
+    booking_id = Column(Integer, ForeignKey("archived_bookings.id"), primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True, index=True)
@@ -1,14 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, and_
-from pydantic import BaseModel # <--- Import BaseModel
-from app.database import get_db
+from sqlalchemy import select, func, and_, case
+from pydantic import BaseModel, validator # <--- Import BaseModel
+from app.database import get_db, async_session, current_site, shards
 from app.models import models
 from app.schemas import games as game_schemas
-from app.auth.auth_handler import get_current_user
-from typing import List
+from app.auth.auth_handler import verify_admin
+from app.auth import login_throttle
+from app.services import waitlist, schedule, archive, jobs, single_flight, static_ui, booking_writer, lottery, user_index, profiling, game_catalog, booking_search, sites
+from app.services.slot_index import slot_index
+from typing import List, Optional
 from datetime import datetime, timedelta, time
+from itertools import islice
 import asyncio
+import csv
+import heapq
+import io
+import json
 
 router = APIRouter(
     prefix="/admin",
@@ -19,18 +28,15 @@ router = APIRouter(
 class GameStatusUpdateRequest(BaseModel):
     status: models.GameStatus
 
-async def verify_admin(current_user: str = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
-    # Use SQLAlchemy select expression
-    query = select(models.User.role).where(models.User.email == current_user)
-    result = await db.execute(query)
-    user_role = result.scalar_one_or_none()
-    
-    if not user_role or user_role != "admin":
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Admin privileges required"
-        )
-    return current_user
+class ProfilingSettings(BaseModel):
+    sample_rate: float
+    routes: List[str] = []  # Empty samples every route
+
+    @validator('sample_rate')
+    def validate_sample_rate(cls, v):
+        if v < 0 or v > 1:
+            raise ValueError('Sample rate must be between 0 and 1')
+        return v
 
 @router.post("/games", response_model=game_schemas.Game)
 async def create_game(
@@ -44,16 +50,19 @@ async def create_game(
         type=game.type,
         max_players=game.max_players,
         status=models.GameStatus.ACTIVE,
+        site=current_site.get(),
         created_at=now,
         updated_at=now
     )
     db.add(new_game)
     await db.commit()
     await db.refresh(new_game)
+    await game_catalog.reload(db)
+    slot_index.invalidate()
     return new_game
 
 # --- MODIFIED ENDPOINT ---
-@router.put("/games/{game_id}/status", response_model=game_schemas.Game)
+@router.put("/games/{game_id}/status", response_model=game_schemas.GameStatusUpdate)
 async def update_game_status(
     game_id: int,
     payload: GameStatusUpdateRequest, # <--- CHANGED: Use the Pydantic model here
@@ -78,44 +87,39 @@ async def update_game_status(
     game.status = payload.status # <--- CHANGED: Get status from payload
     game.updated_at = now
 
-    # If game is inactive, cancel all future slots
+    # If game is inactive, cancel all future slots in a background job that
+    # is committed together with the status change
+    job_id = None
     if payload.status == models.GameStatus.INACTIVE: # <--- CHANGED: Check status from payload
-        # Get all future slots for this game
-        future_slots_stmt = (
-            select(models.Slot)
+        result = await db.execute(
+            select(func.count(models.Slot.id))
             .where(
                 (models.Slot.game_id == game_id) &
                 (models.Slot.start_time > now)
             )
         )
-        result = await db.execute(future_slots_stmt)
-        future_slots = result.scalars().all()
-
-        # Update slots and their bookings
-        for slot in future_slots:
-            slot.is_cancelled = True
-            slot.cancellation_reason = 'Game temporarily unavailable'
-            slot.updated_at = now
-
-            # Update associated bookings
-            bookings_stmt = (
-                select(models.Booking)
-                .where(
-                    (models.Booking.slot_id == slot.id) &
-                    (models.Booking.status == 'pending')
-                )
-            )
-            result = await db.execute(bookings_stmt)
-            bookings = result.scalars().all()
-
-            for booking in bookings:
-                booking.status = 'cancelled'
-                booking.updated_at = now
-
-    await db.commit()
+        job = await jobs.submit(
+            db, jobs.DEACTIVATE_GAME, {"game_id": game_id, "after": now.isoformat()},
+            result.scalar(), admin
+        )
+        job_id = job.id
+    else:
+        await db.commit()
     await db.refresh(game) # Refresh the object to get the updated state from the DB
+    await game_catalog.reload(db)
+    slot_index.invalidate()
     
-    return game # Return the updated game object
+    return {
+        "id": game.id,
+        "name": game.name,
+        "type": game.type,
+        "max_players": game.max_players,
+        "status": game.status,
+        "site": game.site,
+        "created_at": game.created_at,
+        "updated_at": game.updated_at,
+        "job_id": job_id
+    }
 
 # ... (rest of your admin.py file is unchanged) ...
 
@@ -137,41 +141,61 @@ async def generate_slots(
     if selected_date.weekday() >= 5:
         raise HTTPException(status_code=400, detail="Cannot generate slots for weekends")
 
-    stmt = select(models.Game).where(models.Game.id == request.game_id)
-    result = await db.execute(stmt)
-    game = result.scalar_one_or_none()
-    
+    game = await game_catalog.get_game(db, request.game_id)
     if not game:
         raise HTTPException(status_code=404, detail="Game not found")
     if game.status != models.GameStatus.ACTIVE:
         raise HTTPException(status_code=400, detail="Cannot generate slots for inactive game")
 
-    slots = []
-    start_hour = 9
-    end_hour = 20
-    current = selected_date.replace(hour=start_hour, minute=0)
-    end_time = selected_date.replace(hour=end_hour, minute=0)
-
-    while current < end_time:
-        slot_end = current + timedelta(minutes=30)
-        new_slot = models.Slot(
-            game_id=request.game_id,
-            start_time=current,
-            end_time=slot_end,
-            is_available=True,
-            is_cancelled=False,
-            created_at=datetime.utcnow(),
-            updated_at=datetime.utcnow()
-        )
-        slots.append(new_slot)
-        current = slot_end
+    templates = await schedule.load_templates(db, [game.id])
+    if templates:
+        return {"message": f"{game.name} follows a schedule template; slots for {request.date} are created when booked"}
 
+    slots = schedule.generated_day_slots(request.game_id, selected_date, datetime.utcnow())
     db.add_all(slots)
     await db.commit()
+    slot_index.add_slots(slots)
 
     return {"message": f"Generated {len(slots)} slots for {request.date}"}
 
-@router.delete("/slots/cancel")
+class BulkSlotGenerateRequest(BaseModel):
+    game_id: int
+    start_date: str
+    end_date: str
+
+@router.post("/slots/generate/bulk", status_code=status.HTTP_202_ACCEPTED)
+async def generate_slots_bulk(
+    request: BulkSlotGenerateRequest,
+    admin: str = Depends(verify_admin),
+    db: AsyncSession = Depends(get_db)
+):
+    """Generate slots for every weekday in a date range as a background job.
+    Days that already have slots are skipped."""
+    try:
+        start_date = datetime.strptime(request.start_date, "%Y-%m-%d").date()
+        end_date = datetime.strptime(request.end_date, "%Y-%m-%d").date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+    days = (end_date - start_date).days + 1
+    if days < 1 or days > 366:
+        raise HTTPException(status_code=400, detail="Date range must cover 1 to 366 days")
+
+    game = await game_catalog.get_game(db, request.game_id)
+    if not game:
+        raise HTTPException(status_code=404, detail="Game not found")
+    if game.status != models.GameStatus.ACTIVE:
+        raise HTTPException(status_code=400, detail="Cannot generate slots for inactive game")
+    if await schedule.load_templates(db, [game.id]):
+        raise HTTPException(status_code=400, detail=f"{game.name} follows a schedule template; slots are created when booked")
+
+    job = await jobs.submit(
+        db, jobs.GENERATE_SLOTS,
+        {"game_id": game.id, "start_date": start_date.isoformat(), "end_date": end_date.isoformat()},
+        days, admin
+    )
+    return {"message": f"Generating slots for {game.name} from {request.start_date} to {request.end_date}", "job_id": job.id}
+
+@router.delete("/slots/cancel", status_code=status.HTTP_202_ACCEPTED)
 async def cancel_slots(
     game_id: int,
     date: str,
@@ -184,37 +208,625 @@ async def cancel_slots(
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
 
-    now = datetime.utcnow()
-
-    stmt = (
-        select(models.Slot)
+    result = await db.execute(
+        select(func.count(models.Slot.id))
         .where(
             (models.Slot.game_id == game_id) &
             (func.date(models.Slot.start_time) == selected_date.date())
         )
     )
-    result = await db.execute(stmt)
-    slots = result.scalars().all()
+    job = await jobs.submit(
+        db, jobs.CANCEL_SLOTS,
+        {"game_id": game_id, "date": selected_date.date().isoformat(), "reason": reason},
+        result.scalar(), admin
+    )
+    return {"message": f"Cancelling all slots for game {game_id} on {date}", "job_id": job.id}
 
-    for slot in slots:
-        slot.is_cancelled = True
-        slot.is_available = False
-        slot.cancellation_reason = reason
-        slot.updated_at = now
+@router.get("/jobs/{job_id}", response_model=game_schemas.AdminJob)
+async def get_job(
+    job_id: int,
+    admin: str = Depends(verify_admin),
+    db: AsyncSession = Depends(get_db)
+):
+    job = await db.get(models.AdminJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "params": json.loads(job.params),
+        "total": job.total,
+        "processed": job.processed or 0,
+        "counts": json.loads(job.counts or "{}"),
+        "error": job.error,
+        "created_by": job.created_by,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+        "updated_at": job.updated_at
+    }
 
-        booking_stmt = (
-            select(models.Booking)
-            .where(
-                (models.Booking.slot_id == slot.id) &
-                (models.Booking.status == 'pending')
-            )
-        )
-        result = await db.execute(booking_stmt)
-        bookings = result.scalars().all()
+@router.get("/waitlist/stats")
+async def get_waitlist_stats(
+    admin: str = Depends(verify_admin),
+    db: AsyncSession = Depends(get_db)
+):
+    queues = await waitlist.queue_lengths(db)
+    return {
+        "waiting_total": sum(queues.values()),
+        "slots_with_queue": len(queues),
+        "longest_queue": max(queues.values(), default=0),
+        **waitlist.stats,
+        **waitlist.latency_summary()
+    }
+
+def _template_response(template: models.ScheduleTemplate) -> dict:
+    return {
+        "game_id": template.game_id,
+        "weekdays": sorted(schedule.parse_weekdays(template.weekdays)),
+        "open_time": template.open_time,
+        "close_time": template.close_time,
+        "slot_minutes": template.slot_minutes,
+        "updated_at": template.updated_at
+    }
+
+@router.get("/games/{game_id}/schedule", response_model=game_schemas.ScheduleTemplate)
+async def get_schedule_template(
+    game_id: int,
+    admin: str = Depends(verify_admin),
+    db: AsyncSession = Depends(get_db)
+):
+    templates = await schedule.load_templates(db, [game_id])
+    if game_id not in templates:
+        raise HTTPException(status_code=404, detail="Game has no schedule template")
+    return _template_response(templates[game_id])
+
+@router.put("/games/{game_id}/schedule", response_model=game_schemas.ScheduleTemplate)
+async def set_schedule_template(
+    game_id: int,
+    payload: game_schemas.ScheduleTemplateUpdate,
+    admin: str = Depends(verify_admin),
+    db: AsyncSession = Depends(get_db)
+):
+    """Serve this game's slots from a recurring template instead of generated rows."""
+    if not await game_catalog.get_game(db, game_id):
+        raise HTTPException(status_code=404, detail="Game not found")
+
+    now = datetime.utcnow()
+    templates = await schedule.load_templates(db, [game_id])
+    template = templates.get(game_id)
+    if template is None:
+        template = models.ScheduleTemplate(game_id=game_id, created_at=now)
+        db.add(template)
+    template.weekdays = ",".join(str(day) for day in payload.weekdays)
+    template.open_time = payload.open_time
+    template.close_time = payload.close_time
+    template.slot_minutes = payload.slot_minutes
+    template.updated_at = now
+
+    await db.commit()
+    await db.refresh(template)
+    slot_index.invalidate()
+    return _template_response(template)
+
+@router.delete("/games/{game_id}/schedule")
+async def delete_schedule_template(
+    game_id: int,
+    admin: str = Depends(verify_admin),
+    db: AsyncSession = Depends(get_db)
+):
+    """Stop serving template slots. Stored (booked or cancelled) slots are kept."""
+    templates = await schedule.load_templates(db, [game_id])
+    if game_id not in templates:
+        raise HTTPException(status_code=404, detail="Game has no schedule template")
+    await db.delete(templates[game_id])
+    await db.commit()
+    slot_index.invalidate()
+    return {"message": f"Removed schedule template for game {game_id}"}
+
+@router.get("/schedule/exceptions", response_model=List[game_schemas.ScheduleException])
+async def list_schedule_exceptions(
+    admin: str = Depends(verify_admin),
+    db: AsyncSession = Depends(get_db)
+):
+    query = (
+        select(models.ScheduleException)
+        .where(models.ScheduleException.date >= datetime.utcnow().date())
+        .order_by(models.ScheduleException.date)
+    )
+    result = await db.execute(query)
+    return result.scalars().all()
+
+@router.post("/schedule/exceptions", response_model=game_schemas.ScheduleException)
+async def create_schedule_exception(
+    payload: game_schemas.ScheduleExceptionCreate,
+    admin: str = Depends(verify_admin),
+    db: AsyncSession = Depends(get_db)
+):
+    """Close template slots on a holiday, for one game or all games.
+
+    Slots that are already stored (booked or cancelled) are not affected;
+    cancel those with DELETE /admin/slots/cancel.
+    """
+    exception = models.ScheduleException(
+        game_id=payload.game_id,
+        date=payload.date,
+        reason=payload.reason,
+        created_at=datetime.utcnow()
+    )
+    db.add(exception)
+    await db.commit()
+    await db.refresh(exception)
+    slot_index.invalidate()
+    return exception
+
+@router.delete("/schedule/exceptions/{exception_id}")
+async def delete_schedule_exception(
+    exception_id: int,
+    admin: str = Depends(verify_admin),
+    db: AsyncSession = Depends(get_db)
+):
+    result = await db.execute(
+        select(models.ScheduleException).where(models.ScheduleException.id == exception_id)
+    )
+    exception = result.scalar_one_or_none()
+    if not exception:
+        raise HTTPException(status_code=404, detail="Schedule exception not found")
+    await db.delete(exception)
+    await db.commit()
+    slot_index.invalidate()
+    return {"message": "Schedule exception removed"}
+
+@router.post("/releases", response_model=game_schemas.SlotRelease)
+async def create_release(
+    request: game_schemas.SlotReleaseCreate,
+    admin: str = Depends(verify_admin),
+    db: AsyncSession = Depends(get_db)
+):
+    """Release a game's slots for a day by lottery: booking requests made
+    between opens_at and the end of the window become entries, allocated
+    together when the window closes (see app/services/lottery.py)."""
+    game = await game_catalog.get_game(db, request.game_id)
+    if not game:
+        raise HTTPException(status_code=404, detail="Game not found")
+    if game.status != models.GameStatus.ACTIVE:
+        raise HTTPException(status_code=400, detail=f"{game.name} is not active")
+    if await lottery.collecting_release(db, game.id, request.day):
+        raise HTTPException(status_code=409, detail=f"{game.name} already has an open release for {request.day}")
 
-        for booking in bookings:
-            booking.status = 'cancelled'
-            booking.updated_at = now
+    now = datetime.utcnow()
+    opens_at = request.opens_at or now
+    allocate_at = opens_at + timedelta(minutes=request.window_minutes)
+    if allocate_at.date() > request.day:
+        raise HTTPException(status_code=400, detail="The entry window must close before the day starts")
 
+    release = models.SlotRelease(
+        game_id=game.id,
+        day=request.day,
+        mode=request.mode,
+        opens_at=opens_at,
+        allocate_at=allocate_at,
+        status=models.ReleaseStatus.COLLECTING,
+        counts="{}",
+        created_by=admin,
+        created_at=now
+    )
+    db.add(release)
     await db.commit()
-    return {"message": f"Cancelled all slots for game {game_id} on {date}"}
\ No newline at end of file
+    await db.refresh(release)
+    return lottery.release_response(release)
+
+@router.get("/releases/{release_id}", response_model=game_schemas.SlotRelease)
+async def get_release(
+    release_id: int,
+    admin: str = Depends(verify_admin),
+    db: AsyncSession = Depends(get_db)
+):
+    release = await db.get(models.SlotRelease, release_id)
+    if not release:
+        raise HTTPException(status_code=404, detail="Release not found")
+    response = lottery.release_response(release)
+    if release.status == models.ReleaseStatus.COLLECTING:
+        result = await db.execute(
+            select(func.count(models.LotteryEntry.id), func.count(func.distinct(models.LotteryEntry.user_id)))
+            .where(models.LotteryEntry.release_id == release.id)
+        )
+        entries, users = result.one()
+        response["counts"] = {"entries": entries, "users": users}
+    return response
+
+@router.get("/game-catalog/stats")
+async def get_game_catalog_stats(admin: str = Depends(verify_admin)):
+    """Games in the in-memory catalog snapshot and how often it was reloaded."""
+    return game_catalog.summary()
+
+@router.get("/lottery/stats")
+async def get_lottery_stats(admin: str = Depends(verify_admin)):
+    return lottery.summary()
+
+@router.get("/archive/stats")
+async def get_archive_stats(admin: str = Depends(verify_admin)):
+    return {
+        "archive_after_days": archive.ARCHIVE_AFTER_DAYS,
+        "batch_size": archive.ARCHIVE_BATCH_SIZE,
+        **archive.stats
+    }
+
+@router.get("/login-throttle/stats")
+async def get_login_throttle_stats(admin: str = Depends(verify_admin)):
+    return login_throttle.summary()
+
+@router.get("/booking-writer/stats")
+async def get_booking_writer_stats(admin: str = Depends(verify_admin)):
+    """Group-commit batches of booking mutations and their average size."""
+    return booking_writer.summary()
+
+@router.get("/ui/stats")
+async def get_ui_stats(admin: str = Depends(verify_admin)):
+    """Served UI assets and how often each encoding was sent."""
+    return static_ui.summary()
+
+@router.get("/user-index/stats")
+async def get_user_index_stats(admin: str = Depends(verify_admin)):
+    """Size of the player autocomplete index and how often it was used."""
+    return user_index.summary()
+
+@router.get("/single-flight/stats")
+async def get_single_flight_stats(admin: str = Depends(verify_admin)):
+    """Per-route switch and fan-in (requests served per query executed)."""
+    return single_flight.summary()
+
+@router.put("/single-flight/{route}")
+async def set_single_flight(
+    route: str,
+    enabled: bool,
+    admin: str = Depends(verify_admin)
+):
+    if route not in single_flight.enabled:
+        raise HTTPException(status_code=404, detail="Unknown single-flight route")
+    single_flight.enabled[route] = enabled
+    return {"route": route, "enabled": enabled}
+
+@router.get("/profiling")
+async def get_profiling(admin: str = Depends(verify_admin)):
+    """Request profiling settings and counters; see app/services/profiling.py."""
+    return profiling.summary()
+
+@router.put("/profiling")
+async def set_profiling(
+    settings: ProfilingSettings,
+    admin: str = Depends(verify_admin)
+):
+    profiling.sample_rate = settings.sample_rate
+    profiling.routes = {route.strip() for route in settings.routes if route.strip()}
+    return profiling.summary()
+
+@router.get("/profiles")
+async def list_profiles(
+    limit: int = Query(20, ge=1, le=200),
+    admin: str = Depends(verify_admin)
+):
+    """Recent request profiles, newest first."""
+    return profiling.recent(limit)
+
+@router.get("/profiles/{profile_id}")
+async def get_profile(profile_id: str, admin: str = Depends(verify_admin)):
+    """A profile's top functions by cumulative time and the SQL statements
+    executed while it ran, each with the app code that issued it."""
+    report = profiling.get(profile_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return report
+
+@router.get("/profiles/{profile_id}/stats")
+async def download_profile_stats(profile_id: str, admin: str = Depends(verify_admin)):
+    """The raw pstats dump, for snakeviz or ``python -m pstats``."""
+    path = profiling.stats_path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="application/octet-stream", filename=f"{profile_id}.prof")
+
+def _search_dates(from_date: Optional[str], to_date: Optional[str]):
+    try:
+        start = datetime.strptime(from_date, "%Y-%m-%d") if from_date else None
+        end = datetime.strptime(to_date, "%Y-%m-%d") + timedelta(days=1) if to_date else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+    return start, end
+
+async def _user_id_for(db: AsyncSession, user: str) -> Optional[int]:
+    result = await db.execute(
+        select(models.User.id).where(
+            (func.lower(models.User.email) == user.strip().lower()) | (models.User.sap_id == user.strip())
+        )
+    )
+    return result.scalars().first()
+
+def _admin_booking(row, catalog: game_catalog.Catalog) -> dict:
+    game = catalog.get(row.game_id)
+    return {
+        "id": row.id,
+        "status": row.status,
+        "checked_in": bool(row.checked_in),
+        "check_in_time": row.check_in_time,
+        "other_players": row.other_players,
+        "created_at": row.created_at,
+        "slot_id": row.slot_id,
+        "start_time": row.slot_start_time,
+        "end_time": row.end_time,
+        "game_id": row.game_id,
+        "game_name": game.name if game else None,
+        "user_id": row.user_id,
+        "user_email": row.email,
+        "user_sap_id": row.sap_id,
+    }
+
+@router.get("/bookings", response_model=game_schemas.AdminBookingPage)
+async def search_bookings(
+    game_id: Optional[int] = None,
+    from_date: Optional[str] = Query(None, alias="from"),
+    to_date: Optional[str] = Query(None, alias="to"),
+    status_filter: Optional[str] = Query(None, alias="status"),
+    user_id: Optional[int] = None,
+    user: Optional[str] = Query(None, description="Email or SAP ID of the booking user"),
+    checked_in: Optional[bool] = None,
+    order: str = Query("asc", pattern="^(asc|desc)$"),
+    cursor: Optional[str] = None,
+    limit: int = Query(booking_search.PAGE_SIZE, ge=1, le=booking_search.MAX_PAGE_SIZE),
+    admin: str = Depends(verify_admin),
+    db: AsyncSession = Depends(get_db)
+):
+    """Bookings matching every given filter, by slot start time and then
+    booking id (newest first with ``order=desc``). ``from`` and ``to`` are
+    inclusive dates of the slot start. Pass ``next_cursor`` back as
+    ``cursor`` with the same filters for the next page."""
+    start, end = _search_dates(from_date, to_date)
+    after = None
+    if cursor:
+        after = booking_search.decode_cursor(cursor)
+        if after is None:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    if user:
+        matched_id = await _user_id_for(db, user)
+        if matched_id is None or (user_id is not None and user_id != matched_id):
+            return {"items": [], "next_cursor": None}
+        user_id = matched_id
+
+    filters = booking_search.Filters(
+        game_id=game_id,
+        user_id=user_id,
+        status=status_filter,
+        checked_in=checked_in,
+        start=start,
+        end=end
+    )
+    result = await db.execute(booking_search.page_query(filters, after, order == "desc", limit))
+    rows = result.all()
+    catalog = await game_catalog.current(db)
+    items = [_admin_booking(row, catalog) for row in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        next_cursor = booking_search.encode_cursor(last.slot_start_time, last.id)
+    return {"items": items, "next_cursor": next_cursor}
+
+def _requested_sites(site: Optional[List[str]]) -> Optional[List[str]]:
+    if not site:
+        return None
+    unknown = sorted(set(site) - set(shards))
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown sites: {', '.join(unknown)}")
+    return site
+
+@router.get("/sites/bookings", response_model=game_schemas.SiteBookingPage)
+async def search_bookings_across_sites(
+    from_date: Optional[str] = Query(None, alias="from"),
+    to_date: Optional[str] = Query(None, alias="to"),
+    status_filter: Optional[str] = Query(None, alias="status"),
+    user: Optional[str] = Query(None, description="Email or SAP ID of the booking user"),
+    checked_in: Optional[bool] = None,
+    site: Optional[List[str]] = Query(None, description="Only these sites; all when omitted"),
+    order: str = Query("asc", pattern="^(asc|desc)$"),
+    cursor: Optional[str] = None,
+    limit: int = Query(booking_search.PAGE_SIZE, ge=1, le=booking_search.MAX_PAGE_SIZE),
+    admin: str = Depends(verify_admin)
+):
+    """GET /admin/bookings over every site's database at once, by slot
+    start time, site and booking id. Game and user ids differ between sites,
+    so games cannot be filtered on and users are given by email or SAP ID."""
+    start, end = _search_dates(from_date, to_date)
+    after = None
+    if cursor:
+        after = booking_search.decode_site_cursor(cursor)
+        if after is None:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    descending = order == "desc"
+    filters = booking_search.Filters(status=status_filter, checked_in=checked_in, start=start, end=end)
+
+    async def search(db: AsyncSession) -> List[dict]:
+        here = current_site.get()
+        site_filters = filters
+        if user:
+            user_id = await _user_id_for(db, user)
+            if user_id is None:
+                return []
+            site_filters = filters._replace(user_id=user_id)
+        site_after = booking_search.site_after(here, after) if after else None
+        result = await db.execute(booking_search.page_query(site_filters, site_after, descending, limit))
+        catalog = await game_catalog.current(db)
+        return [{**_admin_booking(row, catalog), "site": here} for row in result.all()]
+
+    by_site = await sites.fan_out(search, _requested_sites(site))
+    # Each site's page is already in order; merge them and keep the first
+    # ``limit``. Any site that has more rows shows up past ``limit``.
+    merged = list(islice(
+        heapq.merge(
+            *by_site.values(),
+            key=lambda item: (item["start_time"], item["site"], item["id"]),
+            reverse=descending
+        ),
+        limit + 1
+    ))
+    next_cursor = None
+    if len(merged) > limit:
+        last = merged[limit - 1]
+        next_cursor = booking_search.encode_site_cursor(last["start_time"], last["site"], last["id"])
+    return {"items": merged[:limit], "next_cursor": next_cursor}
+
+async def _site_report(db: AsyncSession, start: datetime, end: datetime) -> dict:
+    result = await db.execute(
+        select(
+            models.Booking.status,
+            func.count(),
+            func.sum(case((models.Booking.checked_in == True, 1), else_=0))
+        )
+        .where(and_(models.Booking.slot_start_time >= start, models.Booking.slot_start_time < end))
+        .group_by(models.Booking.status)
+    )
+    bookings = {}
+    checked_in = 0
+    for booking_status, count, checked in result.all():
+        bookings[booking_status] = count
+        checked_in += checked or 0
+    result = await db.execute(
+        select(func.count())
+        .select_from(models.Slot)
+        .where(and_(models.Slot.start_time >= start, models.Slot.start_time < end))
+    )
+    slots = result.scalar_one()
+    result = await db.execute(select(func.count()).select_from(models.User))
+    users = result.scalar_one()
+    catalog = await game_catalog.current(db)
+    return {
+        "games": len(catalog.active()),
+        "users": users,
+        "slots": slots,
+        "bookings": bookings,
+        "checked_in": checked_in,
+    }
+
+@router.get("/sites")
+async def report_sites(
+    from_date: str = Query(..., alias="from"),
+    to_date: str = Query(..., alias="to"),
+    site: Optional[List[str]] = Query(None, description="Only these sites; all when omitted"),
+    admin: str = Depends(verify_admin)
+):
+    """Games, users, slots and bookings by status of every site for slots
+    starting between ``from`` and ``to`` (inclusive), queried on all site
+    databases concurrently, with totals."""
+    start, end = _search_dates(from_date, to_date)
+    by_site = await sites.fan_out(lambda db: _site_report(db, start, end), _requested_sites(site))
+    totals = {"games": 0, "users": 0, "slots": 0, "bookings": {}, "checked_in": 0}
+    for report in by_site.values():
+        for key in ("games", "users", "slots", "checked_in"):
+            totals[key] += report[key]
+        for booking_status, count in report["bookings"].items():
+            totals["bookings"][booking_status] = totals["bookings"].get(booking_status, 0) + count
+    return {
+        "from": from_date,
+        "to": to_date,
+        "sites": [{"site": name, **report} for name, report in by_site.items()],
+        "totals": totals,
+    }
+
+EXPORT_COLUMNS = [
+    "booking_id", "status", "checked_in", "check_in_time", "created_at", "other_players",
+    "user_id", "user_email", "user_sap_id",
+    "slot_id", "start_time", "end_time",
+    "game_id", "game_name", "game_type",
+]
+EXPORT_CHUNK_ROWS = 1000
+
+def _export_query(Booking, Slot, start: datetime, end: datetime, status_filter, game_id, user_id):
+    query = (
+        select(
+            Booking.id, Booking.status, Booking.checked_in, Booking.check_in_time,
+            Booking.created_at, Booking.other_players,
+            models.User.id, models.User.email, models.User.sap_id,
+            Slot.id, Slot.start_time, Slot.end_time,
+            models.Game.id, models.Game.name, models.Game.type,
+        )
+        .join(Slot, Booking.slot_id == Slot.id)
+        .join(models.Game, Slot.game_id == models.Game.id)
+        .join(models.User, Booking.user_id == models.User.id)
+        .where(and_(Slot.start_time >= start, Slot.start_time < end))
+        .order_by(Slot.start_time, Booking.id)
+    )
+    if status_filter:
+        query = query.where(Booking.status == status_filter)
+    if game_id is not None:
+        query = query.where(Slot.game_id == game_id)
+    if user_id is not None:
+        query = query.where(Booking.user_id == user_id)
+    return query
+
+def _export_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+async def _export_rows(queries):
+    """Yield result partitions from a server-side cursor on a dedicated session,
+    so memory stays flat regardless of how many rows match."""
+    async with async_session() as session:
+        for query in queries:
+            result = await session.stream(query.execution_options(yield_per=EXPORT_CHUNK_ROWS))
+            async for partition in result.partitions():
+                yield partition
+
+async def _csv_stream(queries):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    yield buffer.getvalue()
+    async for partition in _export_rows(queries):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([[_export_value(value) for value in row] for row in partition])
+        yield buffer.getvalue()
+
+async def _ndjson_stream(queries):
+    async for partition in _export_rows(queries):
+        yield "".join(
+            json.dumps(dict(zip(EXPORT_COLUMNS, map(_export_value, row)))) + "\n"
+            for row in partition
+        )
+
+@router.get("/bookings/export")
+async def export_bookings(
+    from_date: str = Query(..., alias="from"),
+    to_date: str = Query(..., alias="to"),
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    status_filter: Optional[str] = Query(None, alias="status"),
+    game_id: Optional[int] = None,
+    user_id: Optional[int] = None,
+    include_archived: bool = False,
+    admin: str = Depends(verify_admin)
+):
+    """Stream bookings with their slot, game and user for slots starting
+    between ``from`` and ``to`` (inclusive) as CSV or NDJSON."""
+    try:
+        start = datetime.strptime(from_date, "%Y-%m-%d")
+        end = datetime.strptime(to_date, "%Y-%m-%d") + timedelta(days=1)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+
+    queries = [
+        _export_query(Booking, Slot, start, end, status_filter, game_id, user_id)
+        for Booking, Slot, _ in archive.booking_tables(include_archived)
+    ]
+    filename = f"bookings_{from_date}_{to_date}.{format}"
+    if format == "csv":
+        return StreamingResponse(
+            _csv_stream(queries),
+            media_type="text/csv",
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+        )
+    return StreamingResponse(
+        _ndjson_stream(queries),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
@@ -1,12 +1,17 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, func, update, insert
+from sqlalchemy import select, and_, update, insert
 from app.database import get_db
 from app.models import models
 from app.schemas import games as game_schemas
-from app.auth.auth_handler import get_current_user
+from app.auth.auth_handler import get_current_user, verify_admin
+from app.auth import check_in_codes
+from app.services import participants, booking_rules, waitlist, schedule, booking_writer, lottery, game_catalog
+from app.services.slot_index import slot_index
 from typing import List
-from datetime import datetime, timedelta
+from datetime import datetime
 
 router = APIRouter(
     prefix="/bookings",
@@ -19,6 +24,9 @@ async def create_booking(
     current_user: str = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
+    return await booking_writer.submit(db, _create_booking, current_user, booking)
+
+async def _create_booking(db: AsyncSession, current_user: str, booking: game_schemas.BookingCreate) -> booking_writer.Outcome:
     # Get user details
     user_query = select(models.User).where(models.User.email == current_user)
     result = await db.execute(user_query)
@@ -26,74 +34,82 @@ async def create_booking(
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    # Get slot details with game information
-    slot_query = (
-        select(
-            models.Slot,
-            models.Game.type.label('game_type'),
-            models.Game.max_players
-        )
-        .join(models.Game)
-        .where(models.Slot.id == booking.slot_id)
-    )
-    result = await db.execute(slot_query)
-    slot_data = result.first()
-    if not slot_data:
+    # Slots of templated games are only stored once they are booked
+    slot_id = await schedule.materialize(db, booking.slot_id)
+    if slot_id is None:
         raise HTTPException(status_code=404, detail="Slot not found")
 
-    slot, game_type, max_players = slot_data
+    # Get slot details; game information comes from the catalog
+    result = await db.execute(select(models.Slot).where(models.Slot.id == slot_id))
+    slot = result.scalar_one_or_none()
+    game = await game_catalog.get_game(db, slot.game_id) if slot else None
+    if not game:
+        raise HTTPException(status_code=404, detail="Slot not found")
+
+    game_type, max_players = game.type, game.max_players
     
     if not slot.is_available or slot.is_cancelled:
         raise HTTPException(status_code=400, detail="Slot is not available")
 
     # Check if user has already booked same game twice today
-    today_bookings_query = (
-        select(func.count())
-        .select_from(models.Booking)
-        .join(models.Slot)
-        .join(models.Game)
-        .where(
-            and_(
-                models.Booking.user_id == user.id,
-                models.Game.type == game_type,
-                func.date(models.Slot.start_time) == datetime.utcnow().date(),
-                models.Booking.status != 'cancelled'
-            )
-        )
-    )
-    result = await db.execute(today_bookings_query)
-    booking_count = result.scalar()
-    if booking_count >= 2:
+    booking_count = await booking_rules.count_bookings_today(db, user.id, game_type)
+    if booking_count >= booking_rules.DAILY_GAME_LIMIT:
         raise HTTPException(
             status_code=400,
             detail=f"You have already booked {game_type} twice today"
         )
 
     # Validate other players if provided
-    if booking.other_players:
-        other_players_list = booking.other_players.split(",")
-        if len(other_players_list) > max_players - 1:
+    other_players_list = participants.parse_sap_ids(booking.other_players)
+    if len(other_players_list) > max_players - 1:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Maximum {max_players} players allowed for this game"
+        )
+
+    # Verify other players exist
+    players_by_sap_id = await participants.resolve_sap_ids(db, other_players_list)
+    if len(players_by_sap_id) != len(other_players_list):
+        raise HTTPException(status_code=400, detail="One or more player SAP IDs are invalid")
+
+    # Make sure nobody on the booking is already playing at the same time
+    player_ids = [user.id] + list(players_by_sap_id.values())
+    conflicts = await participants.find_conflicting_players(
+        db, player_ids, slot.start_time, slot.end_time
+    )
+    if conflicts:
+        raise HTTPException(
+            status_code=400,
+            detail="One or more players already have a booking at this time"
+        )
+
+    # Slots of a day released by lottery are allocated together once its
+    # entry window closes; until then the request is stored as an entry
+    now = datetime.utcnow()
+    release = await lottery.collecting_release(db, slot.game_id, slot.start_time.date())
+    if release is not None:
+        if now < release.opens_at:
             raise HTTPException(
                 status_code=400,
-                detail=f"Maximum {max_players} players allowed for this game"
+                detail=f"Booking for this day opens at {release.opens_at.isoformat()}"
             )
-        
-        # Verify other players exist
-        other_players_query = (
-            select(func.count())
-            .select_from(models.User)
-            .where(models.User.sap_id.in_(other_players_list))
-        )
-        result = await db.execute(other_players_query)
-        valid_players_count = result.scalar()
-        if valid_players_count != len(other_players_list):
-            raise HTTPException(status_code=400, detail="One or more player SAP IDs are invalid")
+        if now >= release.allocate_at:
+            raise HTTPException(
+                status_code=409,
+                detail="Slots for this day are being allocated, try again shortly"
+            )
+        entry = await lottery.enter(db, release, user.id, slot_id, booking.other_players, now)
+        return booking_writer.Outcome(JSONResponse(
+            status_code=status.HTTP_202_ACCEPTED,
+            content=jsonable_encoder(lottery.entry_response(entry, release))
+        ))
 
     # Create booking
-    now = datetime.utcnow()
     new_booking_stmt = insert(models.Booking).values(
         user_id=user.id,
-        slot_id=booking.slot_id,
+        slot_id=slot_id,
+        game_id=slot.game_id,
+        slot_start_time=slot.start_time,
         other_players=booking.other_players,
         status='pending',
         created_at=now,
@@ -102,17 +118,90 @@ async def create_booking(
     
     result = await db.execute(new_booking_stmt)
     new_booking = result.scalar_one()
+    await participants.add_participants(db, new_booking.id, player_ids)
 
     # Update slot availability
     update_stmt = (
         update(models.Slot)
-        .where(models.Slot.id == booking.slot_id)
+        .where(models.Slot.id == slot_id)
         .values(is_available=False)
     )
     await db.execute(update_stmt)
 
-    await db.commit()
-    return new_booking
+    def on_commit():
+        slot_index.mark_taken(booking.slot_id)
+        slot_index.mark_taken(slot_id)
+
+    return booking_writer.Outcome({
+        **new_booking.__dict__,
+        'check_in_code': check_in_codes.issue_code(new_booking.id, slot.start_time)
+    }, on_commit)
+
+@router.get("/lottery", response_model=List[game_schemas.LotteryEntry])
+async def get_lottery_entries(
+    current_user: str = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """The user's lottery entries, newest first. A won entry has the id of
+    the booking it became."""
+    result = await db.execute(
+        select(models.LotteryEntry, models.SlotRelease)
+        .join(models.SlotRelease, models.LotteryEntry.release_id == models.SlotRelease.id)
+        .join(models.User, models.LotteryEntry.user_id == models.User.id)
+        .where(models.User.email == current_user)
+        .order_by(models.LotteryEntry.id.desc())
+    )
+    return [lottery.entry_response(entry, release) for entry, release in result.all()]
+
+@router.post("/check-in/batch", response_model=List[game_schemas.CheckInResult])
+async def batch_check_in(
+    request: game_schemas.BatchCheckInRequest,
+    admin: str = Depends(verify_admin),
+    db: AsyncSession = Depends(get_db)
+):
+    """Check in many bookings at once from a front-desk kiosk.
+
+    Codes are verified from their signature alone; all valid ones are then
+    checked in with a single UPDATE. A valid code whose booking is no longer
+    pending (cancelled or already checked in) is reported as not updated.
+    """
+    now = datetime.utcnow()
+    results = []
+    valid_ids = set()
+    for code in request.codes:
+        booking_id, reason = check_in_codes.verify_code(code, now)
+        if reason is None:
+            valid_ids.add(booking_id)
+        results.append({"code": code, "booking_id": booking_id, "checked_in": False, "detail": reason})
+
+    updated_ids = set()
+    if valid_ids:
+        result = await db.execute(
+            update(models.Booking)
+            .where(
+                and_(
+                    models.Booking.id.in_(valid_ids),
+                    models.Booking.status == 'pending',
+                    models.Booking.checked_in == False
+                )
+            )
+            .values(checked_in=True, check_in_time=now, status='confirmed', updated_at=now)
+            .returning(models.Booking.id)
+        )
+        updated_ids = set(result.scalars().all())
+        await db.commit()
+
+    reported = set()
+    for item in results:
+        if item["detail"] is not None:
+            continue
+        if item["booking_id"] in updated_ids and item["booking_id"] not in reported:
+            item["checked_in"] = True
+            item["detail"] = "Successfully checked in"
+            reported.add(item["booking_id"])
+        else:
+            item["detail"] = "Booking is not pending check-in"
+    return results
 
 @router.post("/{booking_id}/check-in")
 async def check_in(
@@ -120,17 +209,17 @@ async def check_in(
     current_user: str = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
+    return await booking_writer.submit(db, _check_in, booking_id, current_user)
+
+async def _check_in(db: AsyncSession, booking_id: int, current_user: str) -> booking_writer.Outcome:
     # Get booking details
-    booking_result = await db.execute(
-        """
-        SELECT b.*, s.start_time, u.email
-        FROM bookings b
-        JOIN slots s ON b.slot_id = s.id
-        JOIN users u ON b.user_id = u.id
-        WHERE b.id = :booking_id
-        """,
-        {"booking_id": booking_id}
+    booking_query = (
+        select(models.Booking.status, models.Slot.start_time, models.User.email)
+        .join(models.Slot, models.Booking.slot_id == models.Slot.id)
+        .join(models.User, models.Booking.user_id == models.User.id)
+        .where(models.Booking.id == booking_id)
     )
+    booking_result = await db.execute(booking_query)
     booking = booking_result.first()
 
     if not booking:
@@ -139,35 +228,26 @@ async def check_in(
     if booking.email != current_user:
         raise HTTPException(status_code=403, detail="Not authorized to check in for this booking")
 
+    if booking.status != 'pending':
+        raise HTTPException(status_code=400, detail="Booking is not pending check-in")
+
     now = datetime.utcnow()
     start_time = booking.start_time
 
     # Check if it's too early or too late to check in
-    if now < start_time - timedelta(minutes=5):
+    if now < start_time - check_in_codes.CHECK_IN_WINDOW:
         raise HTTPException(status_code=400, detail="Too early to check in")
     
-    if now > start_time + timedelta(minutes=5):
+    if now > start_time + check_in_codes.CHECK_IN_WINDOW:
         raise HTTPException(status_code=400, detail="Check-in period has expired")
 
     # Update booking status
     await db.execute(
-        """
-        UPDATE bookings 
-        SET checked_in = true,
-            check_in_time = :check_in_time,
-            status = 'confirmed',
-            updated_at = :updated_at
-        WHERE id = :booking_id
-        """,
-        {
-            "booking_id": booking_id,
-            "check_in_time": now,
-            "updated_at": now
-        }
+        update(models.Booking)
+        .where(models.Booking.id == booking_id)
+        .values(checked_in=True, check_in_time=now, status='confirmed', updated_at=now)
     )
-
-    await db.commit()
-    return {"message": "Successfully checked in"}
+    return booking_writer.Outcome({"message": "Successfully checked in"})
 
 
 @router.delete("/{booking_id}")
@@ -177,6 +257,9 @@ async def cancel_booking(
     db: AsyncSession = Depends(get_db)
 ):
     """Cancel a booking. Allowed for booking owner or admin."""
+    return await booking_writer.submit(db, _cancel_booking, booking_id, current_user)
+
+async def _cancel_booking(db: AsyncSession, booking_id: int, current_user: str) -> booking_writer.Outcome:
     # Fetch booking, slot and owner
     stmt = (
         select(models.Booking, models.Slot, models.User)
@@ -223,5 +306,16 @@ async def cancel_booking(
         .values(is_available=True, updated_at=now)
     )
 
-    await db.commit()
-    return {"message": "Booking cancelled successfully"}
\ No newline at end of file
+    # Hand the freed slot to the first eligible user on its waitlist
+    promoted = await waitlist.promote(db, [slot_obj.id], now)
+
+    # Plain values: the session is closed by the time this runs
+    freed = None
+    if not promoted and not slot_obj.is_cancelled:
+        freed = (slot_obj.id, slot_obj.game_id, slot_obj.start_time, slot_obj.end_time)
+
+    def on_commit():
+        if freed:
+            slot_index.mark_free(*freed)
+
+    return booking_writer.Outcome({"message": "Booking cancelled successfully"}, on_commit)
\ No newline at end of file
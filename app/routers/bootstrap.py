@@ -0,0 +1,104 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, and_
+from app.database import get_db
+from app.models import models
+from app.schemas import users as user_schemas
+from app.auth.auth_handler import get_current_user
+from app.auth import check_in_codes
+from app.services import schedule, game_catalog
+from typing import Optional
+from datetime import datetime, timedelta
+
+router = APIRouter(
+    prefix="/bootstrap",
+    tags=["bootstrap"]
+)
+
+async def _upcoming_bookings(db: AsyncSession, user_id: int, now: datetime, limit: int) -> list:
+    # Bookings the user made or was added to, soonest first
+    result = await db.execute(
+        select(
+            models.Booking,
+            models.Slot.start_time,
+            models.Slot.end_time,
+            models.Slot.game_id
+        )
+        .join(models.Slot, models.Booking.slot_id == models.Slot.id)
+        .join(models.BookingParticipant, models.BookingParticipant.booking_id == models.Booking.id)
+        .where(
+            and_(
+                models.BookingParticipant.user_id == user_id,
+                models.Booking.status != 'cancelled',
+                models.Slot.end_time > now
+            )
+        )
+        .order_by(models.Slot.start_time)
+        .limit(limit)
+    )
+    bookings = []
+    for booking, start_time, end_time, game_id in result.all():
+        game = await game_catalog.get_game(db, game_id)
+        bookings.append({
+            'id': booking.id,
+            'game_name': game.name,
+            'start_time': start_time,
+            'end_time': end_time,
+            'status': booking.status,
+            'other_players': booking.other_players,
+            'checked_in': booking.checked_in,
+            'check_in_time': booking.check_in_time,
+            'check_in_code': (
+                check_in_codes.issue_code(booking.id, start_time)
+                if booking.status == 'pending' else None
+            ),
+            'created_at': booking.created_at
+        })
+    return bookings
+
+@router.get("/", response_model=user_schemas.Bootstrap)
+async def get_bootstrap(
+    date: Optional[str] = None,
+    bookings_limit: int = Query(5, ge=1, le=50),
+    current_user: str = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Everything the dashboard needs after login in one response: the
+    user, the game catalog, the day's slots for all active games and the
+    user's next upcoming bookings.
+
+    Replaces /users/me, /games/, the per-game slot list and
+    /users/bookings/history on page load. ``date`` defaults to today;
+    weekends return no slots rather than an error.
+    """
+    now = datetime.utcnow()
+    try:
+        day = datetime.strptime(date, "%Y-%m-%d") if date else datetime.combine(now.date(), datetime.min.time())
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+
+    result = await db.execute(select(models.User).where(models.User.email == current_user))
+    user = result.scalar_one_or_none()
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    catalog = await game_catalog.current(db)
+
+    slots = []
+    if day.weekday() < 5:
+        slots = await schedule.slots_between(db, catalog.active(), day, day + timedelta(days=1))
+
+    return {
+        "user": {
+            "email": user.email,
+            "sap_id": user.sap_id,
+            "id": user.id,
+            "role": user.role,
+            "is_active": user.is_active,
+            "created_at": user.created_at
+        },
+        "games": [game_catalog.game_response(game) for game in catalog.games],
+        "date": day.date(),
+        "slots": [schedule.slot_response(slot) for slot in slots if schedule.within_booking_hours(slot)],
+        "upcoming_bookings": await _upcoming_bookings(db, user.id, now, bookings_limit)
+    }
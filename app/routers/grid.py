@@ -0,0 +1,90 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_db
+from app.services import schedule, game_catalog
+from typing import List, Optional
+from datetime import datetime, timedelta, time
+
+router = APIRouter(
+    prefix="/grid",
+    tags=["grid"]
+)
+
+# The booking day is split into fixed 30 minute cells from 9 AM to 8 PM
+DAY_START = time(9, 0)
+DAY_END = time(20, 0)
+SLOT_MINUTES = 30
+CELLS_PER_DAY = (DAY_END.hour * 60 + DAY_END.minute - DAY_START.hour * 60 - DAY_START.minute) // SLOT_MINUTES
+MAX_DAYS = 31
+
+@router.get("/")
+async def get_availability_grid(
+    from_date: str = Query(..., alias="from"),
+    to_date: str = Query(..., alias="to"),
+    game_ids: Optional[List[int]] = Query(None),
+    db: AsyncSession = Depends(get_db)
+):
+    """Availability for many games and days in one response.
+
+    Each day is encoded as two bitmasks over the day's cells (bit ``i`` is the
+    cell starting ``i * 30`` minutes after 9 AM): ``slots`` marks cells that
+    have a bookable (not cancelled) slot and ``free`` marks cells that are
+    still available. ``slot_ids`` lists the slot id of every cell, or null.
+    Days without slots are left out.
+    """
+    try:
+        start_date = datetime.strptime(from_date, "%Y-%m-%d")
+        end_date = datetime.strptime(to_date, "%Y-%m-%d")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+
+    if end_date < start_date:
+        raise HTTPException(status_code=400, detail="'to' must not be before 'from'")
+    if (end_date - start_date).days >= MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_DAYS} days per request")
+
+    catalog = await game_catalog.current(db)
+    if game_ids:
+        games = [game for game in catalog.games if game.id in game_ids]
+    else:
+        games = catalog.active()
+
+    # One range query for every requested game and day (plus template slots), grouped in Python
+    slots = await schedule.slots_between(db, games, start_date, end_date + timedelta(days=1))
+
+    days_by_game = {game.id: {} for game in games}
+    for slot in slots:
+        if slot.start_time.weekday() >= 5:
+            continue
+        minutes = (slot.start_time.hour * 60 + slot.start_time.minute) - (DAY_START.hour * 60 + DAY_START.minute)
+        cell, offset = divmod(minutes, SLOT_MINUTES)
+        if offset or not 0 <= cell < CELLS_PER_DAY:
+            continue
+
+        day = days_by_game[slot.game_id].setdefault(
+            slot.start_time.date().isoformat(),
+            {"slots": 0, "free": 0, "slot_ids": [None] * CELLS_PER_DAY}
+        )
+        day["slots"] |= 1 << cell
+        if slot.is_available:
+            day["free"] |= 1 << cell
+        day["slot_ids"][cell] = slot.id
+
+    return {
+        "from": start_date.date().isoformat(),
+        "to": end_date.date().isoformat(),
+        "day_start": DAY_START.strftime("%H:%M"),
+        "slot_minutes": SLOT_MINUTES,
+        "cells": CELLS_PER_DAY,
+        "games": [
+            {
+                "id": game.id,
+                "name": game.name,
+                "type": game.type,
+                "max_players": game.max_players,
+                "status": game.status,
+                "days": days_by_game[game.id]
+            }
+            for game in games
+        ]
+    }
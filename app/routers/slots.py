@@ -1,35 +1,75 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, func, join
+from sqlalchemy import select, and_, func, join, update
 from app.database import get_db
 from app.models import models
 from app.schemas import games as game_schemas
 from app.auth.auth_handler import get_current_user
-from typing import List
-from datetime import datetime, timedelta, time
+from app.services import participants, schedule, single_flight, game_catalog
+from app.services.slot_index import slot_index
+from typing import List, Optional
+from datetime import datetime, timedelta, timezone
 
 router = APIRouter(
     prefix="/slots",
     tags=["slots"]
 )
 
+def _naive_utc(value: datetime) -> datetime:
+    # Slot times are stored as naive UTC; "...Z" or "+02:00" parse as aware
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+@router.get("/search", response_model=List[game_schemas.SlotSearchResult])
+async def search_slots(
+    start: datetime,
+    end: datetime,
+    players: int = Query(1, ge=1),
+    game_types: Optional[List[str]] = Query(None),
+    min_duration: int = Query(30, ge=1, description="Minutes of consecutive free slots needed"),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_db)
+):
+    """Find free windows across all games, earliest first. Times without an
+    offset are taken as UTC."""
+    start, end = _naive_utc(start), _naive_utc(end)
+    if end <= start:
+        raise HTTPException(status_code=400, detail="end must be after start")
+
+    await slot_index.ensure_loaded(db)
+    return slot_index.search(start, end, players, game_types, min_duration, limit)
+
 @router.get("/{slot_id}", response_model=game_schemas.Slot)
 async def get_slot(
     slot_id: int,
     db: AsyncSession = Depends(get_db)
 ):
-    query = select(models.Slot).where(models.Slot.id == slot_id)
-    result = await db.execute(query)
-    slot = result.scalar_one_or_none()
+    if slot_id < 0:
+        slot = await schedule.get_virtual_slot(db, slot_id)
+    else:
+        query = select(models.Slot).where(models.Slot.id == slot_id)
+        result = await db.execute(query)
+        slot = result.scalar_one_or_none()
     if not slot:
         raise HTTPException(status_code=404, detail="Slot not found")
     return slot
 
+async def _available_slots(db: AsyncSession, day: str, game_type: Optional[str] = None) -> List[dict]:
+    selected_date = datetime.strptime(day, "%Y-%m-%d")
+    catalog = await game_catalog.current(db)
+    games = catalog.active(game_type)
+
+    slots = await schedule.slots_between(db, games, selected_date, selected_date + timedelta(days=1))
+    return [
+        schedule.slot_response(slot) for slot in slots
+        if slot.is_available and schedule.within_booking_hours(slot)
+    ]
+
 @router.get("/available/{date}", response_model=List[game_schemas.Slot])
 async def get_available_slots(
     date: str,
-    game_type: str = None,
-    db: AsyncSession = Depends(get_db)
+    game_type: str = None
 ):
     try:
         selected_date = datetime.strptime(date, "%Y-%m-%d")
@@ -40,30 +80,9 @@ async def get_available_slots(
     if selected_date.weekday() >= 5:  # 5 = Saturday, 6 = Sunday
         raise HTTPException(status_code=400, detail="No slots available on weekends")
 
-    # Build the query using SQLAlchemy expressions
-    query = (
-        select(models.Slot)
-        .join(models.Game)
-        .where(
-            and_(
-                func.date(models.Slot.start_time) == selected_date.date(),
-                func.time(models.Slot.start_time) >= time(9, 0),
-                func.time(models.Slot.start_time) <= time(20, 0),
-                models.Slot.is_available == True,
-                models.Slot.is_cancelled == False,
-                models.Game.status == 'active'
-            )
-        )
-    )
-
-    if game_type:
-        query = query.where(models.Game.type == game_type)
-
-    query = query.order_by(models.Slot.start_time)
-    
-    result = await db.execute(query)
-    slots = result.scalars().all()
-    return slots
+    # Clients poll this at slot release; identical requests share one query
+    params = {"day": selected_date.strftime("%Y-%m-%d"), "game_type": game_type or None}
+    return await single_flight.serve("slots_available", params, _available_slots)
 
 @router.get("/game/{game_id}/date/{date}", response_model=List[game_schemas.Slot])
 async def get_game_slots_by_date(
@@ -80,22 +99,145 @@ async def get_game_slots_by_date(
     if selected_date.weekday() >= 5:
         raise HTTPException(status_code=400, detail="No slots available on weekends")
 
+    game = await game_catalog.get_game(db, game_id)
+    if not game or game.status != models.GameStatus.ACTIVE:
+        return []
+
+    slots = await schedule.slots_between(db, [game], selected_date, selected_date + timedelta(days=1))
+    return [slot for slot in slots if schedule.within_booking_hours(slot)]
+
+async def _get_user(db: AsyncSession, email: str) -> models.User:
+    result = await db.execute(select(models.User).where(models.User.email == email))
+    user = result.scalar_one_or_none()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    return user
+
+async def _waitlist_response(db: AsyncSession, entry: models.WaitlistEntry) -> dict:
+    waiting = and_(
+        models.WaitlistEntry.slot_id == entry.slot_id,
+        models.WaitlistEntry.status == models.WaitlistStatus.WAITING
+    )
+    result = await db.execute(select(func.count()).select_from(models.WaitlistEntry).where(waiting))
+    queue_length = result.scalar()
+
+    position = None
+    if entry.status == models.WaitlistStatus.WAITING:
+        result = await db.execute(
+            select(func.count())
+            .select_from(models.WaitlistEntry)
+            .where(and_(waiting, models.WaitlistEntry.id <= entry.id))
+        )
+        position = result.scalar()
+
+    return {
+        "id": entry.id,
+        "slot_id": entry.slot_id,
+        "status": entry.status,
+        "other_players": entry.other_players,
+        "booking_id": entry.booking_id,
+        "position": position,
+        "queue_length": queue_length,
+        "created_at": entry.created_at
+    }
+
+async def _latest_entry(db: AsyncSession, slot_id: int, user_id: int):
     query = (
-        select(models.Slot)
-        .join(models.Game)
+        select(models.WaitlistEntry)
         .where(
             and_(
-                models.Slot.game_id == game_id,
-                func.date(models.Slot.start_time) == selected_date.date(),
-                func.time(models.Slot.start_time) >= time(9, 0),
-                func.time(models.Slot.start_time) <= time(20, 0),
-                models.Slot.is_cancelled == False,
-                models.Game.status == 'active'
+                models.WaitlistEntry.slot_id == slot_id,
+                models.WaitlistEntry.user_id == user_id
             )
         )
-        .order_by(models.Slot.start_time)
+        .order_by(models.WaitlistEntry.id.desc())
+        .limit(1)
     )
-    
     result = await db.execute(query)
-    slots = result.scalars().all()
-    return slots
\ No newline at end of file
+    return result.scalar_one_or_none()
+
+@router.post("/{slot_id}/waitlist", response_model=game_schemas.WaitlistEntry)
+async def join_waitlist(
+    slot_id: int,
+    request: game_schemas.WaitlistJoin,
+    current_user: str = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Queue for a booked slot. The first eligible waiter gets it when it is freed."""
+    user = await _get_user(db, current_user)
+
+    result = await db.execute(select(models.Slot).where(models.Slot.id == slot_id))
+    slot = result.scalar_one_or_none()
+    game = await game_catalog.get_game(db, slot.game_id) if slot else None
+    if not game:
+        raise HTTPException(status_code=404, detail="Slot not found")
+
+    max_players = game.max_players
+    if slot.is_cancelled:
+        raise HTTPException(status_code=400, detail="Slot is cancelled")
+    if slot.is_available:
+        raise HTTPException(status_code=400, detail="Slot is available, book it directly")
+    if slot.start_time <= datetime.utcnow():
+        raise HTTPException(status_code=400, detail="Slot has already started")
+    # Cancelling would otherwise hand the slot straight back to them
+    if await participants.holds_slot(db, slot_id, user.id):
+        raise HTTPException(status_code=400, detail="You already hold a booking for this slot")
+
+    if len(participants.parse_sap_ids(request.other_players)) > max_players - 1:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Maximum {max_players} players allowed for this game"
+        )
+
+    existing = await _latest_entry(db, slot_id, user.id)
+    if existing and existing.status == models.WaitlistStatus.WAITING:
+        raise HTTPException(status_code=400, detail="Already on the waitlist for this slot")
+
+    now = datetime.utcnow()
+    entry = models.WaitlistEntry(
+        slot_id=slot_id,
+        user_id=user.id,
+        other_players=request.other_players,
+        status=models.WaitlistStatus.WAITING,
+        created_at=now,
+        updated_at=now
+    )
+    db.add(entry)
+    await db.commit()
+    await db.refresh(entry)
+    return await _waitlist_response(db, entry)
+
+@router.get("/{slot_id}/waitlist", response_model=game_schemas.WaitlistEntry)
+async def get_waitlist_position(
+    slot_id: int,
+    current_user: str = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    user = await _get_user(db, current_user)
+    entry = await _latest_entry(db, slot_id, user.id)
+    if not entry:
+        raise HTTPException(status_code=404, detail="Not on the waitlist for this slot")
+    return await _waitlist_response(db, entry)
+
+@router.delete("/{slot_id}/waitlist")
+async def leave_waitlist(
+    slot_id: int,
+    current_user: str = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    user = await _get_user(db, current_user)
+    result = await db.execute(
+        update(models.WaitlistEntry)
+        .where(
+            and_(
+                models.WaitlistEntry.slot_id == slot_id,
+                models.WaitlistEntry.user_id == user.id,
+                models.WaitlistEntry.status == models.WaitlistStatus.WAITING
+            )
+        )
+        .values(status=models.WaitlistStatus.LEFT, updated_at=datetime.utcnow())
+    )
+    if result.rowcount == 0:
+        raise HTTPException(status_code=404, detail="Not on the waitlist for this slot")
+    await db.commit()
+    return {"message": "Left the waitlist"}
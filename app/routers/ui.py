@@ -0,0 +1,28 @@
+from fastapi import APIRouter, Header, HTTPException
+from app.services import static_ui
+from typing import Optional
+
+# Serves the built web UI; see app/services/static_ui.py
+router = APIRouter(include_in_schema=False)
+
+def _serve(path: str, accept_encoding: Optional[str], if_none_match: Optional[str]):
+    response = static_ui.respond(path, accept_encoding, if_none_match)
+    if response is None:
+        raise HTTPException(status_code=404, detail="Not found")
+    return response
+
+@router.get("/")
+@router.get("/index.html")
+async def get_index(
+    accept_encoding: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None)
+):
+    return _serve("/", accept_encoding, if_none_match)
+
+@router.get("/assets/{name}")
+async def get_asset(
+    name: str,
+    accept_encoding: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None)
+):
+    return _serve(static_ui.ASSET_PREFIX + name, accept_encoding, if_none_match)
@@ -1,10 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, or_, and_, join
-from app.database import get_db
+from app.database import get_db, current_site
 from app.models import models
 from app.schemas import users as user_schemas
-from app.auth.auth_handler import get_password_hash, create_access_token, verify_password, get_current_user
+from app.auth.auth_handler import get_password_hash, create_access_token, verify_password, get_current_user, ACCESS_TOKEN_EXPIRE_MINUTES
+from app.auth import check_in_codes, refresh_tokens, login_throttle
+from app.services import archive, game_catalog
+from app.services.user_index import user_index
 from datetime import timedelta
 from typing import List
 
@@ -41,6 +44,7 @@ async def register_user(user: user_schemas.UserCreate, db: AsyncSession = Depend
     db.add(new_user)
     await db.commit()
     await db.refresh(new_user)
+    user_index.add_user(new_user)
     return new_user
 
 @router.post(
@@ -55,15 +59,17 @@ async def register_user(user: user_schemas.UserCreate, db: AsyncSession = Depend
                 "application/json": {
                     "example": {
                         "access_token": "eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9...",
-                        "token_type": "bearer"
+                        "token_type": "bearer",
+                        "refresh_token": "Yk3v0nZ5..."
                     }
                 }
             }
         },
-        401: {"description": "Invalid credentials"}
+        401: {"description": "Invalid credentials"},
+        429: {"description": "Too many failed attempts; retry after the Retry-After header"}
     }
 )
-async def login(user: user_schemas.UserLogin, db: AsyncSession = Depends(get_db)):
+async def login(user: user_schemas.UserLogin, request: Request, db: AsyncSession = Depends(get_db)):
     # Check if the username is an email or SAP ID
     query = select(models.User).where(
         or_(
@@ -73,19 +79,81 @@ async def login(user: user_schemas.UserLogin, db: AsyncSession = Depends(get_db)
     )
     result = await db.execute(query)
     user_data = result.first()
-    
-    if not user_data or not verify_password(user.password, user_data[0].hashed_password):
+    user_id = user_data[0].id if user_data else None
+
+    # Refuse throttled accounts and addresses before spending any bcrypt time
+    client_ip = request.client.host if request.client else "unknown"
+    retry_after = login_throttle.check(user.username, user_id, client_ip)
+    if retry_after:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many failed login attempts. Try again later.",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+    if user_data:
+        valid = verify_password(user.password, user_data[0].hashed_password)
+    else:
+        valid = login_throttle.dummy_verify(user.password)
+    if not valid:
+        login_throttle.record_failure(user.username, user_id, client_ip)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email, SAP ID or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    access_token_expires = timedelta(minutes=30)
+    login_throttle.record_success(user.username, user_id)
+    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    access_token = create_access_token(
+        data={"sub": user_data[0].email, "site": current_site.get()}, expires_delta=access_token_expires
+    )
+    refresh_token = await refresh_tokens.issue(db, user_data[0].id)
+    await db.commit()
+    return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token}
+
+@router.post(
+    "/token/refresh",
+    response_model=user_schemas.Token,
+    summary="Exchange a refresh token for a new access token",
+    description="Returns a new access token and a new refresh token; the old refresh token stops working",
+    responses={401: {"description": "Invalid, expired or reused refresh token"}}
+)
+async def refresh_access_token(payload: user_schemas.RefreshRequest, db: AsyncSession = Depends(get_db)):
+    user, refresh_token = await refresh_tokens.rotate(db, payload.refresh_token)
+    # Commit even on failure so a detected reuse revokes the family
+    await db.commit()
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
     access_token = create_access_token(
-        data={"sub": user_data[0].email}, expires_delta=access_token_expires
+        data={"sub": user.email, "site": current_site.get()}, expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     )
-    return {"access_token": access_token, "token_type": "bearer"}
+    return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token}
+
+@router.post("/logout")
+async def logout(payload: user_schemas.RefreshRequest, db: AsyncSession = Depends(get_db)):
+    """Revoke the refresh token and every token rotated from the same login."""
+    await refresh_tokens.revoke(db, payload.refresh_token)
+    await db.commit()
+    return {"message": "Logged out"}
+
+@router.get("/search", response_model=List[user_schemas.UserMatch])
+async def search_users(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=50),
+    current_user: str = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Autocomplete for other players: active users whose SAP ID or email
+    starts with ``q``, case-insensitively. Served from an in-memory index
+    (app/services/user_index.py), not the users table."""
+    await user_index.ensure_loaded(db)
+    return user_index.search(q, limit)
 
 @router.get("/me", response_model=user_schemas.User)
 async def get_current_user_info(
@@ -101,35 +169,45 @@ async def get_current_user_info(
 
 @router.get("/bookings/history", response_model=List[user_schemas.BookingHistory])
 async def get_user_booking_history(
+    include_archived: bool = False,
     current_user: str = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
-    # Create a query to get booking history using joins
-    query = (
-        select(
-            models.Booking,
-            models.Slot.start_time,
-            models.Slot.end_time,
-            models.Game.name.label('game_name')
+    # Bookings the user made or was added to as another player
+    bookings = []
+    for Booking, Slot, Participant in archive.booking_tables(include_archived):
+        query = (
+            select(
+                Booking,
+                Slot.start_time,
+                Slot.end_time,
+                Slot.game_id
+            )
+            .join(Slot, Booking.slot_id == Slot.id)
+            .join(Participant, Participant.booking_id == Booking.id)
+            .join(models.User, Participant.user_id == models.User.id)
+            .where(
+                (models.User.email == current_user) &
+                (Booking.status != 'cancelled')
+            )
+            .order_by(Booking.created_at.desc())
         )
-        .join(models.Slot, models.Booking.slot_id == models.Slot.id)
-        .join(models.Game, models.Slot.game_id == models.Game.id)
-        .join(models.User, models.Booking.user_id == models.User.id)
-        .where(
-            (models.User.email == current_user) &
-            (models.Booking.status != 'cancelled')
-        )
-        .order_by(models.Booking.created_at.desc())
-    )
-    
-    result = await db.execute(query)
-    bookings = result.fetchall()
-    return [
-        {
+
+        result = await db.execute(query)
+        bookings.extend(result.fetchall())
+    if include_archived:
+        bookings.sort(key=lambda booking: booking[0].created_at, reverse=True)
+    history = []
+    for booking in bookings:
+        game = await game_catalog.get_game(db, booking[3])
+        history.append({
             **booking[0].__dict__,
             'start_time': booking[1],
             'end_time': booking[2],
-            'game_name': booking[3]
-        }
-        for booking in bookings
-    ]
\ No newline at end of file
+            'game_name': game.name,
+            'check_in_code': (
+                check_in_codes.issue_code(booking[0].id, booking[1])
+                if booking[0].status == 'pending' else None
+            )
+        })
+    return history
\ No newline at end of file
@@ -1,7 +1,7 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, validator
 from typing import Optional, List
-from datetime import datetime
-from app.models.models import GameType, GameStatus
+from datetime import date, datetime, time
+from app.models.models import GameType, GameStatus, LotteryMode
 
 class GameBase(BaseModel):
     name: str
@@ -14,12 +14,31 @@ class GameCreate(GameBase):
 class Game(GameBase):
     id: int
     status: GameStatus
+    site: Optional[str] = None
     created_at: datetime
     updated_at: datetime
 
     class Config:
         orm_mode = True
 
+class GameStatusUpdate(Game):
+    job_id: Optional[int] = None  # Set when deactivation cancels future slots
+
+class AdminJob(BaseModel):
+    id: int
+    kind: str
+    status: str
+    params: dict
+    total: Optional[int]
+    processed: int
+    counts: dict
+    error: Optional[str]
+    created_by: Optional[str]
+    created_at: datetime
+    started_at: Optional[datetime]
+    finished_at: Optional[datetime]
+    updated_at: datetime
+
 class SlotBase(BaseModel):
     game_id: int
     start_time: datetime
@@ -52,8 +71,157 @@ class Booking(BookingBase):
     status: str
     checked_in: bool
     check_in_time: Optional[datetime]
+    check_in_code: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        orm_mode = True
+
+class WaitlistJoin(BaseModel):
+    other_players: Optional[str] = None
+
+class WaitlistEntry(BaseModel):
+    id: int
+    slot_id: int
+    status: str
+    other_players: Optional[str]
+    booking_id: Optional[int]
+    position: Optional[int]
+    queue_length: int
     created_at: datetime
+
+    class Config:
+        orm_mode = True
+
+class SlotSearchResult(BaseModel):
+    game_id: int
+    game_name: str
+    game_type: str
+    max_players: int
+    start_time: datetime
+    end_time: datetime
+    slot_ids: List[int]
+
+class BatchCheckInRequest(BaseModel):
+    codes: List[str]
+
+    @validator('codes')
+    def validate_codes(cls, v):
+        if len(v) > 500:
+            raise ValueError('At most 500 codes per batch')
+        return v
+
+class CheckInResult(BaseModel):
+    code: str
+    booking_id: Optional[int]
+    checked_in: bool
+    detail: str
+
+class ScheduleTemplateUpdate(BaseModel):
+    weekdays: List[int] = [0, 1, 2, 3, 4]  # 0 = Monday
+    open_time: time = time(9, 0)
+    close_time: time = time(20, 0)
+    slot_minutes: int = 30
+
+    @validator('weekdays')
+    def validate_weekdays(cls, v):
+        if not v or any(day < 0 or day > 6 for day in v):
+            raise ValueError('Weekdays must be between 0 (Monday) and 6 (Sunday)')
+        return sorted(set(v))
+
+    @validator('slot_minutes')
+    def validate_slot_minutes(cls, v):
+        if v < 5 or v > 240:
+            raise ValueError('Slot length must be between 5 and 240 minutes')
+        return v
+
+    @validator('close_time')
+    def validate_close_time(cls, v, values):
+        if 'open_time' in values and v <= values['open_time']:
+            raise ValueError('Close time must be after open time')
+        return v
+
+class ScheduleTemplate(BaseModel):
+    game_id: int
+    weekdays: List[int]
+    open_time: time
+    close_time: time
+    slot_minutes: int
     updated_at: datetime
 
+class ScheduleExceptionCreate(BaseModel):
+    date: date
+    game_id: Optional[int] = None  # None closes every game
+    reason: Optional[str] = None
+
+class ScheduleException(ScheduleExceptionCreate):
+    id: int
+    created_at: datetime
+
     class Config:
-        orm_mode = True
\ No newline at end of file
+        orm_mode = True
+
+class SlotReleaseCreate(BaseModel):
+    game_id: int
+    day: date
+    opens_at: Optional[datetime] = None  # Defaults to now
+    window_minutes: int = 10  # Entries are taken until opens_at + window_minutes
+    mode: LotteryMode = LotteryMode.RANDOM
+
+    @validator('window_minutes')
+    def validate_window_minutes(cls, v):
+        if v < 1 or v > 7 * 24 * 60:
+            raise ValueError('Window must be between 1 minute and 7 days')
+        return v
+
+class SlotRelease(BaseModel):
+    id: int
+    game_id: int
+    day: date
+    mode: str
+    opens_at: datetime
+    allocate_at: datetime
+    status: str
+    counts: dict
+    created_by: Optional[str]
+    created_at: datetime
+    allocated_at: Optional[datetime]
+
+class LotteryEntry(BaseModel):
+    id: int
+    release_id: int
+    slot_id: int
+    other_players: Optional[str]
+    status: str
+    booking_id: Optional[int]
+    reason: Optional[str]
+    allocate_at: datetime
+    created_at: datetime
+
+class AdminBooking(BaseModel):
+    id: int
+    status: str
+    checked_in: bool
+    check_in_time: Optional[datetime]
+    other_players: Optional[str]
+    created_at: Optional[datetime]
+    slot_id: int
+    start_time: datetime
+    end_time: datetime
+    game_id: int
+    game_name: Optional[str]
+    user_id: int
+    user_email: str
+    user_sap_id: Optional[str]
+
+class AdminBookingPage(BaseModel):
+    items: List[AdminBooking]
+    next_cursor: Optional[str]  # Pass as ?cursor= for the next page; None on the last page
+
+class SiteBooking(AdminBooking):
+    site: str
+
+class SiteBookingPage(BaseModel):
+    items: List[SiteBooking]
+    next_cursor: Optional[str]
@@ -1,7 +1,8 @@
 from pydantic import BaseModel, EmailStr, validator
 from typing import Optional, List
-from datetime import datetime
+from datetime import date, datetime
 from app.models.models import GameType, GameStatus, UserRole
+from app.schemas import games as game_schemas
 
 class PasswordMixin:
     @validator('password')
@@ -40,9 +41,17 @@ class User(UserBase):
     class Config:
         orm_mode = True
 
+class UserMatch(BaseModel):
+    sap_id: Optional[str]
+    email: str
+
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
 
 class BookingHistory(BaseModel):
     id: int
@@ -53,7 +62,15 @@ class BookingHistory(BaseModel):
     other_players: Optional[str]
     checked_in: bool
     check_in_time: Optional[datetime]
+    check_in_code: Optional[str] = None
     created_at: datetime
 
     class Config:
-        orm_mode = True
\ No newline at end of file
+        orm_mode = True
+
+class Bootstrap(BaseModel):
+    user: User
+    games: List[game_schemas.Game]
+    date: date
+    slots: List[game_schemas.Slot]
+    upcoming_bookings: List[BookingHistory]
\ No newline at end of file
@@ -0,0 +1,96 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, insert, delete, literal, DateTime
+from app.models import models
+from app.config import int_env
+from datetime import datetime, timedelta
+
+# Slots that ended more than ARCHIVE_AFTER_DAYS ago are archived together
+# with their bookings, ARCHIVE_BATCH_SIZE slots per transaction.
+ARCHIVE_AFTER_DAYS = int_env("ARCHIVE_AFTER_DAYS", 30)
+ARCHIVE_BATCH_SIZE = int_env("ARCHIVE_BATCH_SIZE", 500)
+ARCHIVE_INTERVAL_SECONDS = int_env("ARCHIVE_INTERVAL_SECONDS", 3600)
+# Pause between batches so waiting writers can take the SQLite write lock
+ARCHIVE_BATCH_PAUSE_SECONDS = 0.05
+
+stats = {
+    "runs": 0,
+    "batches": 0,
+    "slots_archived": 0,
+    "bookings_archived": 0,
+    "last_run_at": None,
+}
+
+def _columns(model) -> list:
+    return [column.name for column in model.__table__.columns]
+
+def _copy(target, source, where, now: datetime):
+    """INSERT INTO target SELECT source columns..., now WHERE ..."""
+    names = [name for name in _columns(target) if name != "archived_at"]
+    columns = [getattr(source, name) for name in names]
+    if "archived_at" in _columns(target):
+        names.append("archived_at")
+        columns.append(literal(now, DateTime))
+    return insert(target).from_select(names, select(*columns).where(where))
+
+async def archive_batch(db: AsyncSession, cutoff: datetime, batch_size: int = ARCHIVE_BATCH_SIZE) -> dict:
+    """Move one batch of slots that ended before ``cutoff``, with their
+    bookings and participants, into the archive tables.
+
+    Rows are copied with INSERT ... SELECT and then deleted, so each batch is
+    a handful of set-based statements. The caller commits. Waitlist entries
+    for archived slots are dropped; those slots can no longer be booked.
+    """
+    now = datetime.utcnow()
+    result = await db.execute(
+        select(models.Slot.id)
+        .where(models.Slot.end_time < cutoff)
+        .order_by(models.Slot.id)
+        .limit(batch_size)
+    )
+    slot_ids = list(result.scalars().all())
+    if not slot_ids:
+        return {"slots": 0, "bookings": 0}
+
+    result = await db.execute(
+        select(models.Booking.id).where(models.Booking.slot_id.in_(slot_ids))
+    )
+    booking_ids = list(result.scalars().all())
+
+    await db.execute(_copy(models.ArchivedSlot, models.Slot, models.Slot.id.in_(slot_ids), now))
+    if booking_ids:
+        await db.execute(
+            _copy(models.ArchivedBooking, models.Booking, models.Booking.id.in_(booking_ids), now)
+        )
+        await db.execute(
+            _copy(
+                models.ArchivedBookingParticipant,
+                models.BookingParticipant,
+                models.BookingParticipant.booking_id.in_(booking_ids),
+                now
+            )
+        )
+        await db.execute(
+            delete(models.BookingParticipant).where(models.BookingParticipant.booking_id.in_(booking_ids))
+        )
+        await db.execute(delete(models.Booking).where(models.Booking.id.in_(booking_ids)))
+    await db.execute(delete(models.WaitlistEntry).where(models.WaitlistEntry.slot_id.in_(slot_ids)))
+    await db.execute(delete(models.Slot).where(models.Slot.id.in_(slot_ids)))
+
+    stats["batches"] += 1
+    stats["slots_archived"] += len(slot_ids)
+    stats["bookings_archived"] += len(booking_ids)
+    return {"slots": len(slot_ids), "bookings": len(booking_ids)}
+
+def archive_cutoff(now: datetime = None) -> datetime:
+    return (now or datetime.utcnow()) - timedelta(days=ARCHIVE_AFTER_DAYS)
+
+def booking_tables(include_archived: bool = False) -> list:
+    """(Booking, Slot, BookingParticipant) model triples to read from.
+
+    Read paths that can serve history build the same query once per triple,
+    so passing ``include_archived=True`` adds the archive tables.
+    """
+    tables = [(models.Booking, models.Slot, models.BookingParticipant)]
+    if include_archived:
+        tables.append((models.ArchivedBooking, models.ArchivedSlot, models.ArchivedBookingParticipant))
+    return tables
@@ -0,0 +1,50 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, and_, func
+from app.models import models
+from app.services import game_catalog
+from datetime import date, datetime
+from typing import Dict, Iterable
+
+# A user may book the same type of game at most this many times per day
+DAILY_GAME_LIMIT = 2
+
+async def count_bookings_today(db: AsyncSession, user_id: int, game_type: str) -> int:
+    catalog = await game_catalog.current(db)
+    query = (
+        select(func.count())
+        .select_from(models.Booking)
+        .join(models.Slot)
+        .where(
+            and_(
+                models.Booking.user_id == user_id,
+                models.Slot.game_id.in_(catalog.ids_of_type(game_type)),
+                func.date(models.Slot.start_time) == datetime.utcnow().date(),
+                models.Booking.status != 'cancelled'
+            )
+        )
+    )
+    result = await db.execute(query)
+    return result.scalar()
+
+async def count_bookings_on(db: AsyncSession, user_ids: Iterable[int], game_type: str, day: date) -> Dict[int, int]:
+    """Live bookings of ``game_type`` each user made for ``day``, in one
+    query. Users without any are left out of the result."""
+    user_ids = list(user_ids)
+    if not user_ids:
+        return {}
+    catalog = await game_catalog.current(db)
+    query = (
+        select(models.Booking.user_id, func.count())
+        .join(models.Slot)
+        .where(
+            and_(
+                models.Booking.user_id.in_(user_ids),
+                models.Slot.game_id.in_(catalog.ids_of_type(game_type)),
+                func.date(models.Slot.start_time) == day,
+                models.Booking.status != 'cancelled'
+            )
+        )
+        .group_by(models.Booking.user_id)
+    )
+    result = await db.execute(query)
+    return dict(result.all())
@@ -0,0 +1,293 @@
+from sqlalchemy import select, update, and_, tuple_, text
+from sqlalchemy.sql import Select
+from app.models import models
+from datetime import datetime, timedelta
+from typing import List, NamedTuple, Optional, Tuple
+import argparse
+import base64
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+
+# Admin booking search pages through bookings in (slot_start_time, id)
+# order with a keyset cursor: a page starts right after the last row of the
+# previous one, so every page is one range scan of an index on bookings,
+# however deep it is. Each filter combination has an index leading with its
+# most selective equality filter (see models.Booking); game_id and
+# slot_start_time are copied onto bookings so slots need not be joined.
+#
+# Across sites (app/services/sites.py), each site's database is searched
+# concurrently and the pages merged in (slot_start_time, site, id) order;
+# the cursor then also names the site of the last row.
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+BACKFILL_BATCH_SIZE = 50000
+MAX_ID = 2 ** 63 - 1
+
+class Filters(NamedTuple):
+    game_id: Optional[int] = None
+    user_id: Optional[int] = None
+    status: Optional[str] = None
+    checked_in: Optional[bool] = None
+    start: Optional[datetime] = None  # Slot start, inclusive
+    end: Optional[datetime] = None  # Slot start, exclusive
+
+def encode_cursor(start_time: datetime, booking_id: int) -> str:
+    raw = f"{start_time.isoformat()}|{booking_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Optional[Tuple[datetime, int]]:
+    """(slot_start_time, id) of the last row of the previous page, or None
+    for a malformed cursor."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        start_time, booking_id = raw.split("|")
+        return datetime.fromisoformat(start_time), int(booking_id)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+def encode_site_cursor(start_time: datetime, site: str, booking_id: int) -> str:
+    raw = f"{start_time.isoformat()}|{booking_id}|{site}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_site_cursor(cursor: str) -> Optional[Tuple[datetime, str, int]]:
+    """(slot_start_time, site, id) of the last row of the previous
+    cross-site page, or None for a malformed cursor."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        start_time, booking_id, site = raw.split("|")
+        return datetime.fromisoformat(start_time), site, int(booking_id)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+def site_after(site: str, cursor: Tuple[datetime, str, int]) -> Tuple[datetime, int]:
+    """The position in ``site``'s own (slot_start_time, id) order where a
+    cross-site page continues. Rows at the cursor's start time from sites
+    ordered before the cursor's were already returned; those from sites
+    after it were not."""
+    start_time, cursor_site, booking_id = cursor
+    if site == cursor_site:
+        return start_time, booking_id
+    return (start_time, MAX_ID) if site < cursor_site else (start_time, 0)
+
+def page_query(
+    filters: Filters,
+    after: Optional[Tuple[datetime, int]] = None,
+    descending: bool = False,
+    limit: int = PAGE_SIZE
+) -> Select:
+    """One page of bookings with their slot end time and user. Selects one
+    row more than ``limit`` so the caller can tell whether there is a next
+    page."""
+    Booking = models.Booking
+    query = (
+        select(
+            Booking.id, Booking.status, Booking.checked_in, Booking.check_in_time,
+            Booking.other_players, Booking.created_at,
+            Booking.slot_id, Booking.game_id, Booking.slot_start_time, models.Slot.end_time,
+            Booking.user_id, models.User.email, models.User.sap_id,
+        )
+        # Bookings drive the join; slots and users are looked up by primary
+        # key for the rows on the page only
+        .join(models.Slot, Booking.slot_id == models.Slot.id)
+        .join(models.User, Booking.user_id == models.User.id)
+    )
+    conditions = []
+    if filters.game_id is not None:
+        conditions.append(Booking.game_id == filters.game_id)
+    if filters.user_id is not None:
+        conditions.append(Booking.user_id == filters.user_id)
+    if filters.status:
+        conditions.append(Booking.status == filters.status)
+    if filters.checked_in is not None:
+        conditions.append(Booking.checked_in == filters.checked_in)
+    if filters.start is not None:
+        conditions.append(Booking.slot_start_time >= filters.start)
+    if filters.end is not None:
+        conditions.append(Booking.slot_start_time < filters.end)
+    if after is not None:
+        key = tuple_(Booking.slot_start_time, Booking.id)
+        conditions.append(key < tuple_(*after) if descending else key > tuple_(*after))
+    if conditions:
+        query = query.where(and_(*conditions))
+    if descending:
+        query = query.order_by(Booking.slot_start_time.desc(), Booking.id.desc())
+    else:
+        query = query.order_by(Booking.slot_start_time, Booking.id)
+    return query.limit(limit + 1)
+
+def backfill_slot_columns(connection):
+    """Copy game_id and start_time from slots onto bookings made before the
+    columns existed. Runs through ``AsyncConnection.run_sync`` at startup, in
+    batches; a database without such bookings costs one index probe."""
+    while True:
+        batch = (
+            select(models.Booking.id)
+            .where(models.Booking.slot_start_time.is_(None))
+            .limit(BACKFILL_BATCH_SIZE)
+            .scalar_subquery()
+        )
+        result = connection.execute(
+            update(models.Booking)
+            .where(
+                and_(
+                    models.Booking.id.in_(batch),
+                    models.Booking.slot_id == models.Slot.id
+                )
+            )
+            .values(game_id=models.Slot.game_id, slot_start_time=models.Slot.start_time)
+        )
+        if result.rowcount < BACKFILL_BATCH_SIZE:
+            return
+
+# Benchmark: python -m app.services.booking_search [--bookings N] [--dir DIR]
+
+BENCH_GAMES = 20
+BENCH_BOOKINGS_PER_USER = 200
+BENCH_STATUSES = ["pending", "confirmed", "cancelled", "completed"]
+
+def _load_scratch(connection, bookings: int):
+    """Fill an empty database with ``bookings`` bookings: two per slot over
+    continuous 30 minute slots of BENCH_GAMES games, random users and
+    statuses. Indexes are dropped while loading and built afterwards."""
+    from app.database import create_missing_indexes
+
+    indexed = [models.Booking.__table__, models.Slot.__table__]
+    for table in indexed:
+        for index in table.indexes:
+            index.drop(connection)
+
+    rng = random.Random(42)
+    raw = connection.connection.dbapi_connection
+    raw.executemany(
+        "INSERT INTO games (id, name, type, max_players, status) VALUES (?, ?, ?, ?, 'active')",
+        [(game_id, f"Game {game_id}", "chess", 4) for game_id in range(1, BENCH_GAMES + 1)]
+    )
+    users = max(1, bookings // BENCH_BOOKINGS_PER_USER)
+    raw.executemany(
+        "INSERT INTO users (id, email, sap_id, hashed_password, role, is_active) VALUES (?, ?, ?, 'x', 'user', 1)",
+        ((user_id, f"user{user_id}@example.com", f"S{user_id}") for user_id in range(1, users + 1))
+    )
+
+    origin = datetime(2000, 1, 3)
+    slots = bookings // 2
+
+    def slot_rows():
+        for slot_id in range(1, slots + 1):
+            game_id = (slot_id - 1) % BENCH_GAMES + 1
+            start = origin + timedelta(minutes=30 * ((slot_id - 1) // BENCH_GAMES))
+            yield slot_id, game_id, start.isoformat(" "), (start + timedelta(minutes=30)).isoformat(" ")
+
+    def booking_rows():
+        for booking_id in range(1, slots * 2 + 1):
+            slot_id = (booking_id + 1) // 2
+            game_id = (slot_id - 1) % BENCH_GAMES + 1
+            start = origin + timedelta(minutes=30 * ((slot_id - 1) // BENCH_GAMES))
+            # The first booking of each slot was cancelled, the second stands
+            status = "cancelled" if booking_id % 2 else rng.choice(BENCH_STATUSES[:2] + BENCH_STATUSES[3:])
+            yield (booking_id, rng.randint(1, users), slot_id, game_id, start.isoformat(" "),
+                   status, status in ("confirmed", "completed"))
+
+    raw.executemany(
+        "INSERT INTO slots (id, game_id, start_time, end_time, is_available, is_cancelled) VALUES (?, ?, ?, ?, 0, 0)",
+        slot_rows()
+    )
+    raw.executemany(
+        "INSERT INTO bookings (id, user_id, slot_id, game_id, slot_start_time, status, checked_in) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        booking_rows()
+    )
+    create_missing_indexes(connection)
+    connection.execute(text("ANALYZE"))
+    return users, origin, origin + timedelta(minutes=30 * (slots // BENCH_GAMES))
+
+def _time_pages(connection, filters: Filters, pages: int, descending: bool = False) -> List[float]:
+    """Milliseconds per page for ``pages`` consecutive pages."""
+    timings = []
+    after = None
+    for _ in range(pages):
+        started = time.perf_counter()
+        rows = connection.execute(page_query(filters, after, descending)).all()
+        timings.append((time.perf_counter() - started) * 1000)
+        if len(rows) <= PAGE_SIZE:
+            break
+        last = rows[PAGE_SIZE - 1]
+        after = (last.slot_start_time, last.id)
+    return timings
+
+def _time_offset_page(connection, game_id: int, offset: int) -> float:
+    """Milliseconds for one page of a game's bookings the way it would be
+    written without the copied columns: joined to slots, paged by OFFSET."""
+    query = (
+        select(models.Booking.id, models.Slot.start_time, models.Slot.end_time)
+        .join(models.Slot, models.Booking.slot_id == models.Slot.id)
+        .where(models.Slot.game_id == game_id)
+        .order_by(models.Slot.start_time, models.Booking.id)
+        .offset(offset)
+        .limit(PAGE_SIZE)
+    )
+    started = time.perf_counter()
+    connection.execute(query).all()
+    return (time.perf_counter() - started) * 1000
+
+def _plan(connection, filters: Filters) -> str:
+    compiled = page_query(filters, (datetime(2001, 1, 1), 1)).compile(
+        dialect=connection.dialect, compile_kwargs={"literal_binds": True}
+    )
+    rows = connection.execute(text(f"EXPLAIN QUERY PLAN {compiled}")).all()
+    return "; ".join(row[-1] for row in rows)
+
+def _benchmark(bookings: int, pages: int, database_path: str):
+    from sqlalchemy import create_engine
+    from app.database import Base
+
+    engine = create_engine(f"sqlite:///{database_path}")
+    with engine.begin() as connection:
+        connection.execute(text("PRAGMA journal_mode=OFF"))
+        connection.execute(text("PRAGMA synchronous=OFF"))
+        Base.metadata.create_all(connection)
+        started = time.perf_counter()
+        users, first, last = _load_scratch(connection, bookings)
+        print(f"{bookings:,} bookings, {users:,} users, loaded and indexed in {time.perf_counter() - started:.0f}s "
+              f"({os.path.getsize(database_path) / 2**30:.1f} GiB)")
+
+    middle = first + (last - first) / 2
+    week = (middle, middle + timedelta(days=7))
+    scenarios = [
+        ("no filter", Filters()),
+        ("one week", Filters(start=week[0], end=week[1])),
+        ("game", Filters(game_id=7)),
+        ("game + week", Filters(game_id=7, start=week[0], end=week[1])),
+        ("user", Filters(user_id=users // 2)),
+        ("status=pending", Filters(status="pending")),
+        ("status + checked_in", Filters(status="confirmed", checked_in=True)),
+        ("game + status + week", Filters(game_id=7, status="cancelled", start=week[0], end=week[1])),
+        ("checked_in=false, from middle", Filters(checked_in=False, start=middle)),
+    ]
+    print(f"{'filters':32} {'pages':>5} {'first ms':>9} {'median ms':>10} {'max ms':>8}  plan")
+    with engine.connect() as connection:
+        for name, filters in scenarios:
+            timings = _time_pages(connection, filters, pages)
+            print(f"{name:32} {len(timings):5} {timings[0]:9.2f} {statistics.median(timings):10.2f} "
+                  f"{max(timings):8.2f}  {_plan(connection, filters)}")
+        timings = _time_pages(connection, Filters(game_id=7), pages, descending=True)
+        print(f"{'game, newest first':32} {len(timings):5} {timings[0]:9.2f} {statistics.median(timings):10.2f} "
+              f"{max(timings):8.2f}")
+        for offset in (0, 10_000, 100_000):
+            print(f"{'game, join + OFFSET ' + format(offset, ','):32} {1:5} "
+                  f"{_time_offset_page(connection, 7, offset):9.2f}")
+    engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Page latency of the admin booking search")
+    parser.add_argument("--bookings", type=int, default=20_000_000)
+    parser.add_argument("--pages", type=int, default=50, help="consecutive pages timed per filter combination")
+    parser.add_argument("--dir", default=".", help="where to create the scratch database")
+    args = parser.parse_args()
+    work_dir = tempfile.mkdtemp(prefix="booking-search-bench-", dir=args.dir)
+    try:
+        _benchmark(args.bookings, args.pages, os.path.join(work_dir, "bench.db"))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
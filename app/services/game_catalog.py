@@ -0,0 +1,149 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from app.database import current_site
+from app.models import models
+from app.config import int_env
+from collections import defaultdict
+from datetime import datetime
+from types import MappingProxyType
+from typing import Dict, Iterable, NamedTuple, Optional, Tuple
+import asyncio
+import time
+
+# Games change a few times a month, so routers read them from an immutable
+# in-memory snapshot instead of querying or joining the games table. Admin
+# changes made through this process swap in a new snapshot right away; the
+# snapshot is reloaded after GAME_CATALOG_REFRESH_SECONDS to pick up changes
+# made by other workers. Each site has its own snapshot.
+REFRESH_SECONDS = int_env("GAME_CATALOG_REFRESH_SECONDS", 60)
+
+# A lookup for an unknown id reloads the snapshot at most this often, so a
+# game just created by another worker is found without letting requests for
+# bogus ids reload on every call
+MISS_RELOAD_SECONDS = 1
+
+stats = {
+    "reloads": 0,
+    "miss_reloads": 0,
+}
+
+class CatalogGame(NamedTuple):
+    """The columns of a Game row. Has the attributes routers and
+    schedule.slots_between read from models.Game."""
+    id: int
+    name: str
+    type: str
+    max_players: int
+    status: str
+    site: Optional[str]
+    created_at: Optional[datetime]
+    updated_at: Optional[datetime]
+
+def _value(value) -> str:
+    # Freshly assigned columns may still hold the str-enum member
+    return getattr(value, "value", value)
+
+def game_response(game) -> dict:
+    """A game as the Game schema serializes it, for endpoints that return
+    plain dicts."""
+    return {
+        "name": game.name,
+        "type": game.type,
+        "max_players": game.max_players,
+        "id": game.id,
+        "status": game.status,
+        "site": game.site,
+        "created_at": game.created_at,
+        "updated_at": game.updated_at
+    }
+
+class Catalog:
+    """One snapshot of the games table, indexed by id and by type. Never
+    modified after it is built; a change builds and swaps in a new one."""
+
+    __slots__ = ("games", "by_id", "by_type", "loaded_at")
+
+    def __init__(self, games: Iterable[CatalogGame]):
+        self.games: Tuple[CatalogGame, ...] = tuple(sorted(games, key=lambda game: game.id))
+        self.by_id = MappingProxyType({game.id: game for game in self.games})
+        by_type = {}
+        for game in self.games:
+            by_type.setdefault(game.type, []).append(game)
+        self.by_type = MappingProxyType({game_type: tuple(games) for game_type, games in by_type.items()})
+        self.loaded_at = time.monotonic()
+
+    def get(self, game_id: int) -> Optional[CatalogGame]:
+        return self.by_id.get(game_id)
+
+    def active(self, game_type: Optional[str] = None) -> Tuple[CatalogGame, ...]:
+        """Active games, of ``game_type`` only when given, ordered by id."""
+        games = self.by_type.get(_value(game_type), ()) if game_type else self.games
+        return tuple(game for game in games if game.status == models.GameStatus.ACTIVE)
+
+    def ids_of_type(self, game_type: str) -> Tuple[int, ...]:
+        return tuple(game.id for game in self.by_type.get(_value(game_type), ()))
+
+_catalogs: Dict[str, Catalog] = {}
+_locks: Dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+
+async def reload(db: AsyncSession) -> Catalog:
+    """Build a snapshot of the current site's games table and swap it in."""
+    result = await db.execute(select(models.Game))
+    catalog = Catalog(
+        CatalogGame(
+            id=game.id,
+            name=game.name,
+            type=_value(game.type),
+            max_players=game.max_players,
+            status=_value(game.status),
+            site=game.site,
+            created_at=game.created_at,
+            updated_at=game.updated_at
+        )
+        for game in result.scalars().all()
+    )
+    _catalogs[current_site.get()] = catalog
+    stats["reloads"] += 1
+    return catalog
+
+def _is_fresh(catalog: Optional[Catalog]) -> bool:
+    return catalog is not None and time.monotonic() - catalog.loaded_at <= REFRESH_SECONDS
+
+async def current(db: AsyncSession) -> Catalog:
+    """The current snapshot, loaded first if missing or stale. Hold on to
+    the result for the rest of the request so it sees one consistent set."""
+    site = current_site.get()
+    catalog = _catalogs.get(site)
+    if _is_fresh(catalog):
+        return catalog
+    async with _locks[site]:
+        catalog = _catalogs.get(site)
+        if _is_fresh(catalog):
+            return catalog
+        return await reload(db)
+
+async def get_game(db: AsyncSession, game_id: int) -> Optional[CatalogGame]:
+    """One game from the snapshot; an unknown id reloads it first if it is
+    more than MISS_RELOAD_SECONDS old."""
+    catalog = await current(db)
+    game = catalog.get(game_id)
+    if game is None and time.monotonic() - catalog.loaded_at > MISS_RELOAD_SECONDS:
+        site = current_site.get()
+        async with _locks[site]:
+            catalog = _catalogs[site]
+            if time.monotonic() - catalog.loaded_at > MISS_RELOAD_SECONDS:
+                stats["miss_reloads"] += 1
+                catalog = await reload(db)
+        game = catalog.get(game_id)
+    return game
+
+def summary() -> dict:
+    """Counters, and the current site's snapshot."""
+    catalog = _catalogs.get(current_site.get())
+    return {
+        "games": len(catalog.games) if catalog else 0,
+        "types": sorted(catalog.by_type) if catalog else [],
+        "age_seconds": round(time.monotonic() - catalog.loaded_at, 1) if catalog else None,
+        "refresh_seconds": REFRESH_SECONDS,
+        **stats,
+    }
@@ -0,0 +1,290 @@
+from sqlalchemy import select, update, delete, and_
+from sqlalchemy.exc import IntegrityError
+from app.database import async_session, current_site
+from app.models import models
+from app.auth.auth_handler import token_subject
+from app.config import int_env
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import NamedTuple, Optional, Tuple
+import asyncio
+import hashlib
+import json
+
+# Stored responses are replayed for IDEMPOTENCY_TTL_SECONDS. A claim for a
+# request that is still running expires after IDEMPOTENCY_CLAIM_SECONDS, so a
+# worker that died mid-request does not block the key for the whole TTL.
+IDEMPOTENCY_TTL_SECONDS = int_env("IDEMPOTENCY_TTL_SECONDS", 86400)
+IDEMPOTENCY_CLAIM_SECONDS = int_env("IDEMPOTENCY_CLAIM_SECONDS", 60)
+IDEMPOTENCY_CACHE_SIZE = int_env("IDEMPOTENCY_CACHE_SIZE", 10000)
+IDEMPOTENCY_PURGE_INTERVAL_SECONDS = int_env("IDEMPOTENCY_PURGE_INTERVAL_SECONDS", 3600)
+MAX_KEY_LENGTH = 255
+
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+stats = {
+    "executed": 0,
+    "replayed": 0,
+    "waited": 0,
+    "rejected": 0,
+}
+
+class StoredResponse(NamedTuple):
+    request_hash: str
+    status_code: int
+    content_type: Optional[str]
+    body: bytes
+    expires_at: datetime
+
+# Front cache of stored responses, most recently used last. Keys are
+# (site, scope, key): records are stored in each site's own database.
+_cache: "OrderedDict[Tuple[str, str, str], StoredResponse]" = OrderedDict()
+# Requests running in this process; duplicates wait on the original's future
+_in_flight: "dict[Tuple[str, str, str], asyncio.Future]" = {}
+
+def applies(method: str, path: str) -> bool:
+    """POST /bookings/ and every admin write honour Idempotency-Key."""
+    if method not in WRITE_METHODS:
+        return False
+    return (method == "POST" and path == "/bookings/") or path.startswith("/admin/")
+
+def request_hash(method: str, path: str, query: bytes, body: bytes) -> str:
+    digest = hashlib.sha256()
+    for part in (method.encode(), path.encode(), query, body):
+        digest.update(part)
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+def _remember(cache_key: Tuple[str, str, str], response: StoredResponse):
+    _cache[cache_key] = response
+    _cache.move_to_end(cache_key)
+    while len(_cache) > IDEMPOTENCY_CACHE_SIZE:
+        _cache.popitem(last=False)
+
+async def _lookup(cache_key: Tuple[str, str, str]) -> Optional[StoredResponse]:
+    now = datetime.utcnow()
+    cached = _cache.get(cache_key)
+    if cached is not None:
+        if cached.expires_at > now:
+            _cache.move_to_end(cache_key)
+            return cached
+        del _cache[cache_key]
+
+    _, scope, key = cache_key
+    async with async_session() as session:
+        result = await session.execute(
+            select(models.IdempotencyRecord)
+            .where(
+                and_(
+                    models.IdempotencyRecord.scope == scope,
+                    models.IdempotencyRecord.key == key,
+                    models.IdempotencyRecord.status_code.isnot(None),
+                    models.IdempotencyRecord.expires_at > now
+                )
+            )
+        )
+        record = result.scalar_one_or_none()
+    if record is None:
+        return None
+    response = StoredResponse(
+        record.request_hash, record.status_code, record.content_type,
+        (record.body or "").encode("utf-8"), record.expires_at
+    )
+    _remember(cache_key, response)
+    return response
+
+async def _claim(cache_key: Tuple[str, str, str], hashed: str) -> bool:
+    """Insert a pending row for the key. False if another worker holds it."""
+    _, scope, key = cache_key
+    now = datetime.utcnow()
+    async with async_session() as session:
+        await session.execute(
+            delete(models.IdempotencyRecord)
+            .where(
+                and_(
+                    models.IdempotencyRecord.scope == scope,
+                    models.IdempotencyRecord.key == key,
+                    models.IdempotencyRecord.expires_at <= now
+                )
+            )
+        )
+        session.add(models.IdempotencyRecord(
+            scope=scope,
+            key=key,
+            request_hash=hashed,
+            created_at=now,
+            expires_at=now + timedelta(seconds=IDEMPOTENCY_CLAIM_SECONDS)
+        ))
+        try:
+            await session.commit()
+        except IntegrityError:
+            await session.rollback()
+            return False
+    return True
+
+async def _finish(cache_key: Tuple[str, str, str], response: Optional[StoredResponse]):
+    """Store the response, or release the claim so the request can be retried."""
+    _, scope, key = cache_key
+    where = and_(
+        models.IdempotencyRecord.scope == scope,
+        models.IdempotencyRecord.key == key
+    )
+    async with async_session() as session:
+        if response is None:
+            await session.execute(delete(models.IdempotencyRecord).where(where))
+        else:
+            await session.execute(
+                update(models.IdempotencyRecord)
+                .where(where)
+                .values(
+                    status_code=response.status_code,
+                    content_type=response.content_type,
+                    body=response.body.decode("utf-8", errors="replace"),
+                    expires_at=response.expires_at
+                )
+            )
+        await session.commit()
+    if response is not None:
+        _remember(cache_key, response)
+
+async def purge_expired() -> int:
+    async with async_session() as session:
+        result = await session.execute(
+            delete(models.IdempotencyRecord)
+            .where(models.IdempotencyRecord.expires_at <= datetime.utcnow())
+        )
+        await session.commit()
+    return result.rowcount
+
+def _error(status_code: int, detail: str) -> StoredResponse:
+    body = json.dumps({"detail": detail}).encode("utf-8")
+    return StoredResponse("", status_code, "application/json", body, datetime.utcnow())
+
+async def _send_response(send, response: StoredResponse, replayed: bool):
+    headers = [(b"content-length", str(len(response.body)).encode())]
+    if response.content_type:
+        headers.append((b"content-type", response.content_type.encode()))
+    if replayed:
+        headers.append((b"idempotent-replayed", b"true"))
+    await send({"type": "http.response.start", "status": response.status_code, "headers": headers})
+    await send({"type": "http.response.body", "body": response.body})
+
+class IdempotencyMiddleware:
+    """Replay the first response for retries that carry the same
+    ``Idempotency-Key`` header.
+
+    Keys are scoped to the caller's token subject. A retry with a different
+    method, path, query or body gets 422. Responses with a 5xx status are not
+    stored, so those requests can be retried. While the original is running,
+    duplicates in this process wait for it; duplicates that reach another
+    worker get 409.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not applies(scope["method"], scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        key = headers.get(b"idempotency-key", b"").decode("latin-1").strip()
+        authorization = headers.get(b"authorization", b"").decode("latin-1")
+        subject = None
+        if authorization.lower().startswith("bearer "):
+            subject = token_subject(authorization[7:].strip())
+        if not key or subject is None:
+            # Unauthenticated requests fail in the route; nothing to replay
+            await self.app(scope, receive, send)
+            return
+        if len(key) > MAX_KEY_LENGTH:
+            await _send_response(send, _error(400, f"Idempotency-Key must be at most {MAX_KEY_LENGTH} characters"), False)
+            return
+
+        body = b""
+        more_body = True
+        while more_body:
+            message = await receive()
+            body += message.get("body", b"")
+            more_body = message.get("more_body", False)
+        hashed = request_hash(scope["method"], scope["path"], scope.get("query_string", b""), body)
+        cache_key = (current_site.get(), subject, key)
+
+        while True:
+            stored = await _lookup(cache_key)
+            if stored is not None:
+                if stored.request_hash != hashed:
+                    stats["rejected"] += 1
+                    stored = _error(422, "Idempotency-Key was already used for a different request")
+                    await _send_response(send, stored, False)
+                    return
+                stats["replayed"] += 1
+                await _send_response(send, stored, True)
+                return
+
+            running = _in_flight.get(cache_key)
+            if running is None:
+                break
+            stats["waited"] += 1
+            response = await asyncio.shield(running)
+            if response is None:
+                # The original failed before responding; run this one instead
+                continue
+            if response.request_hash != hashed:
+                stats["rejected"] += 1
+                response = _error(422, "Idempotency-Key was already used for a different request")
+            await _send_response(send, response, response.request_hash == hashed)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        _in_flight[cache_key] = future
+        claimed = False
+        response = None
+        try:
+            if not await _claim(cache_key, hashed):
+                stats["rejected"] += 1
+                await _send_response(send, _error(409, "A request with this Idempotency-Key is still in progress"), False)
+                return
+            claimed = True
+
+            stats["executed"] += 1
+            response = await self._run(scope, receive, body, send, hashed)
+        finally:
+            try:
+                if claimed:
+                    keep = response is not None and response.status_code < 500
+                    await _finish(cache_key, response if keep else None)
+            finally:
+                _in_flight.pop(cache_key, None)
+                future.set_result(response)
+
+    async def _run(self, scope, receive, body: bytes, send, hashed: str) -> StoredResponse:
+        """Run the route, passing its response through while capturing it."""
+        sent = False
+
+        async def replay_receive():
+            nonlocal sent
+            if sent:
+                return await receive()
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        status_code = 500
+        content_type = None
+        chunks = []
+
+        async def capture_send(message):
+            nonlocal status_code, content_type
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                for name, value in message.get("headers", []):
+                    if name.lower() == b"content-type":
+                        content_type = value.decode("latin-1")
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        await self.app(scope, replay_receive, capture_send)
+        expires_at = datetime.utcnow() + timedelta(seconds=IDEMPOTENCY_TTL_SECONDS)
+        return StoredResponse(hashed, status_code, content_type, b"".join(chunks), expires_at)
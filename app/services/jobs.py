@@ -0,0 +1,262 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, and_, func
+from app.database import current_site
+from app.models import models
+from app.services import schedule
+from app.services.slot_index import slot_index
+from app.config import int_env
+from datetime import date, datetime, timedelta
+from collections import defaultdict
+from typing import Dict, Optional
+import asyncio
+import json
+
+# Each chunk is one short transaction touching at most JOB_BATCH_SIZE slots
+# (or one day for slot generation), so other writers are not held off.
+JOB_BATCH_SIZE = int_env("JOB_BATCH_SIZE", 200)
+JOB_POLL_SECONDS = int_env("JOB_POLL_SECONDS", 30)
+JOB_CHUNK_PAUSE_SECONDS = 0.05
+
+DEACTIVATE_GAME = "deactivate_game"
+CANCEL_SLOTS = "cancel_slots"
+GENERATE_SLOTS = "generate_slots"
+
+# One job runner per site, each woken by jobs submitted on its site
+_wakeups: Dict[str, asyncio.Event] = defaultdict(asyncio.Event)
+
+def wake():
+    _wakeups[current_site.get()].set()
+
+async def wait_for_work():
+    wakeup = _wakeups[current_site.get()]
+    try:
+        await asyncio.wait_for(wakeup.wait(), JOB_POLL_SECONDS)
+    except asyncio.TimeoutError:
+        pass
+    wakeup.clear()
+
+async def submit(db: AsyncSession, kind: str, params: dict, total: int, created_by: str) -> models.AdminJob:
+    """Queue a job and commit it, together with anything else pending on ``db``."""
+    now = datetime.utcnow()
+    job = models.AdminJob(
+        kind=kind,
+        params=json.dumps(params),
+        status=models.JobStatus.QUEUED,
+        total=total,
+        processed=0,
+        counts="{}",
+        created_by=created_by,
+        created_at=now,
+        updated_at=now
+    )
+    db.add(job)
+    await db.commit()
+    await db.refresh(job)
+    wake()
+    return job
+
+async def next_job(db: AsyncSession) -> Optional[models.AdminJob]:
+    """Oldest unfinished job. Jobs left running by a restart come back here."""
+    result = await db.execute(
+        select(models.AdminJob)
+        .where(models.AdminJob.status.in_([models.JobStatus.QUEUED, models.JobStatus.RUNNING]))
+        .order_by(models.AdminJob.id)
+        .limit(1)
+    )
+    return result.scalar_one_or_none()
+
+async def _cancel_slot_batch(db: AsyncSession, slot_ids: list, reason: str, now: datetime, make_unavailable: bool) -> int:
+    """Cancel the slots and their pending bookings; returns bookings cancelled."""
+    values = {"is_cancelled": True, "cancellation_reason": reason, "updated_at": now}
+    if make_unavailable:
+        values["is_available"] = False
+    await db.execute(update(models.Slot).where(models.Slot.id.in_(slot_ids)).values(**values))
+    result = await db.execute(
+        update(models.Booking)
+        .where(
+            and_(
+                models.Booking.slot_id.in_(slot_ids),
+                models.Booking.status == 'pending'
+            )
+        )
+        .values(status='cancelled', updated_at=now)
+    )
+    return result.rowcount
+
+async def _deactivate_game_step(db: AsyncSession, job: models.AdminJob, params: dict) -> dict:
+    game = await db.get(models.Game, params["game_id"])
+    if not game or game.status != models.GameStatus.INACTIVE:
+        # Reactivated while the job was queued; leave the remaining slots alone
+        return {"done": True, "counts": {"stopped_early": 1}}
+
+    last_id = int(job.cursor or 0)
+    result = await db.execute(
+        select(models.Slot.id)
+        .where(
+            and_(
+                models.Slot.game_id == game.id,
+                models.Slot.start_time > datetime.fromisoformat(params["after"]),
+                models.Slot.id > last_id
+            )
+        )
+        .order_by(models.Slot.id)
+        .limit(JOB_BATCH_SIZE)
+    )
+    slot_ids = list(result.scalars().all())
+    if not slot_ids:
+        return {"done": True}
+
+    bookings = await _cancel_slot_batch(
+        db, slot_ids, 'Game temporarily unavailable', datetime.utcnow(), make_unavailable=False
+    )
+    return {
+        "done": len(slot_ids) < JOB_BATCH_SIZE,
+        "cursor": str(slot_ids[-1]),
+        "processed": len(slot_ids),
+        "counts": {"slots_cancelled": len(slot_ids), "bookings_cancelled": bookings},
+        "taken": slot_ids,
+    }
+
+async def _cancel_slots_step(db: AsyncSession, job: models.AdminJob, params: dict) -> dict:
+    day_start = datetime.fromisoformat(params["date"])
+    if job.cursor is None:
+        # First chunk: store cancelled rows for template slots of the day
+        game = await db.get(models.Game, params["game_id"])
+        materialized = 0
+        if game:
+            materialized = await schedule.materialize_cancelled(db, game, day_start, params["reason"])
+        return {
+            "done": False,
+            "cursor": "0",
+            "counts": {"template_slots_cancelled": materialized},
+            "invalidate": materialized > 0,
+        }
+
+    result = await db.execute(
+        select(models.Slot.id)
+        .where(
+            and_(
+                models.Slot.game_id == params["game_id"],
+                func.date(models.Slot.start_time) == day_start.date(),
+                # Skips the rows the first chunk stored already cancelled,
+                # which are counted as template_slots_cancelled
+                models.Slot.is_cancelled == False,
+                models.Slot.id > int(job.cursor)
+            )
+        )
+        .order_by(models.Slot.id)
+        .limit(JOB_BATCH_SIZE)
+    )
+    slot_ids = list(result.scalars().all())
+    if not slot_ids:
+        return {"done": True}
+
+    bookings = await _cancel_slot_batch(
+        db, slot_ids, params["reason"], datetime.utcnow(), make_unavailable=True
+    )
+    return {
+        "done": len(slot_ids) < JOB_BATCH_SIZE,
+        "cursor": str(slot_ids[-1]),
+        "processed": len(slot_ids),
+        "counts": {"slots_cancelled": len(slot_ids), "bookings_cancelled": bookings},
+        "taken": slot_ids,
+    }
+
+async def _generate_slots_step(db: AsyncSession, job: models.AdminJob, params: dict) -> dict:
+    end = date.fromisoformat(params["end_date"])
+    day = date.fromisoformat(job.cursor) + timedelta(days=1) if job.cursor else date.fromisoformat(params["start_date"])
+    if day > end:
+        return {"done": True}
+
+    step = {"done": day >= end, "cursor": day.isoformat(), "processed": 1}
+    day_start = datetime.combine(day, datetime.min.time())
+    game = await db.get(models.Game, params["game_id"])
+    if not game or game.status != models.GameStatus.ACTIVE:
+        return {"done": True, "counts": {"stopped_early": 1}}
+    if day.weekday() >= 5:
+        step["counts"] = {"days_skipped": 1}
+        return step
+
+    # Days that already have slots are left as they are
+    result = await db.execute(
+        select(func.count(models.Slot.id))
+        .where(
+            and_(
+                models.Slot.game_id == game.id,
+                models.Slot.start_time >= day_start,
+                models.Slot.start_time < day_start + timedelta(days=1)
+            )
+        )
+    )
+    if result.scalar():
+        step["counts"] = {"days_skipped": 1}
+        return step
+
+    slots = schedule.generated_day_slots(game.id, day_start, datetime.utcnow())
+    db.add_all(slots)
+    step["counts"] = {"days_generated": 1, "slots_created": len(slots)}
+    step["added"] = slots
+    return step
+
+_STEPS = {
+    DEACTIVATE_GAME: _deactivate_game_step,
+    CANCEL_SLOTS: _cancel_slots_step,
+    GENERATE_SLOTS: _generate_slots_step,
+}
+
+async def _fail(db: AsyncSession, job_id: int, error: str):
+    await db.rollback()
+    now = datetime.utcnow()
+    await db.execute(
+        update(models.AdminJob)
+        .where(models.AdminJob.id == job_id)
+        .values(status=models.JobStatus.FAILED, error=error[:500], finished_at=now, updated_at=now)
+    )
+    await db.commit()
+
+async def run_chunk(db: AsyncSession, job_id: int) -> bool:
+    """Run one chunk of a job in its own transaction. Returns True once the
+    job has finished, successfully or not.
+
+    The cursor, progress and counts are saved in the same transaction as the
+    chunk's changes, so a restart never repeats or skips a committed chunk.
+    """
+    job = await db.get(models.AdminJob, job_id)
+    if job is None or job.status not in (models.JobStatus.QUEUED, models.JobStatus.RUNNING):
+        return True
+    step = _STEPS.get(job.kind)
+    if step is None:
+        await _fail(db, job_id, f"Unknown job kind: {job.kind}")
+        return True
+
+    now = datetime.utcnow()
+    if job.status == models.JobStatus.QUEUED:
+        job.status = models.JobStatus.RUNNING
+        job.started_at = now
+
+    try:
+        outcome = await step(db, job, json.loads(job.params))
+    except Exception as e:
+        await _fail(db, job_id, str(e) or e.__class__.__name__)
+        return True
+
+    if "cursor" in outcome:
+        job.cursor = outcome["cursor"]
+    job.processed = (job.processed or 0) + outcome.get("processed", 0)
+    counts = json.loads(job.counts or "{}")
+    for name, value in outcome.get("counts", {}).items():
+        counts[name] = counts.get(name, 0) + value
+    job.counts = json.dumps(counts)
+    job.updated_at = now
+    if outcome["done"]:
+        job.status = models.JobStatus.COMPLETED
+        job.finished_at = now
+    await db.commit()
+
+    for slot_id in outcome.get("taken", []):
+        slot_index.mark_taken(slot_id)
+    if outcome.get("added"):
+        slot_index.add_slots(outcome["added"])
+    if outcome.get("invalidate"):
+        slot_index.invalidate()
+    return outcome["done"]
@@ -0,0 +1,348 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, insert, update, and_, func
+from app.models import models
+from app.services import participants, booking_rules, game_catalog
+from app.services.booking_writer import Outcome
+from app.services.slot_index import slot_index
+from app.config import int_env
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+import json
+import random
+import time
+
+# When a popular day is released, first-come-first-served turns into a race
+# decided by network latency and retries. For a day with a release, booking
+# requests made between opens_at and allocate_at are stored as entries and
+# allocated in one pass at allocate_at: users are drawn in random order
+# (weighted towards those with fewer recent bookings in "weighted" mode) and
+# take turns getting their most preferred slot that is still free, one slot
+# per turn, until the daily quota or their entries run out.
+LOTTERY_POLL_SECONDS = int_env("LOTTERY_POLL_SECONDS", 5)
+LOTTERY_HISTORY_DAYS = int_env("LOTTERY_HISTORY_DAYS", 14)
+
+stats = {
+    "entries": 0,
+    "allocations": 0,
+    "won": 0,
+    "lost": 0,
+    "last_allocation_ms": None,
+}
+
+def release_response(release: models.SlotRelease) -> dict:
+    return {
+        "id": release.id,
+        "game_id": release.game_id,
+        "day": release.day,
+        "mode": release.mode,
+        "opens_at": release.opens_at,
+        "allocate_at": release.allocate_at,
+        "status": release.status,
+        "counts": json.loads(release.counts or "{}"),
+        "created_by": release.created_by,
+        "created_at": release.created_at,
+        "allocated_at": release.allocated_at
+    }
+
+def entry_response(entry: models.LotteryEntry, release: models.SlotRelease) -> dict:
+    return {
+        "id": entry.id,
+        "release_id": entry.release_id,
+        "slot_id": entry.slot_id,
+        "other_players": entry.other_players,
+        "status": entry.status,
+        "booking_id": entry.booking_id,
+        "reason": entry.reason,
+        "allocate_at": release.allocate_at,
+        "created_at": entry.created_at
+    }
+
+async def collecting_release(db: AsyncSession, game_id: int, day: date) -> Optional[models.SlotRelease]:
+    """The release still collecting entries for ``game_id`` on ``day``, if any."""
+    result = await db.execute(
+        select(models.SlotRelease).where(
+            and_(
+                models.SlotRelease.game_id == game_id,
+                models.SlotRelease.day == day,
+                models.SlotRelease.status == models.ReleaseStatus.COLLECTING
+            )
+        )
+    )
+    return result.scalars().first()
+
+async def enter(
+    db: AsyncSession,
+    release: models.SlotRelease,
+    user_id: int,
+    slot_id: int,
+    other_players: Optional[str],
+    now: datetime
+) -> models.LotteryEntry:
+    """Record a booking request as an entry. Asking again for the same slot
+    updates the players on the existing entry."""
+    result = await db.execute(
+        select(models.LotteryEntry).where(
+            and_(
+                models.LotteryEntry.release_id == release.id,
+                models.LotteryEntry.user_id == user_id,
+                models.LotteryEntry.slot_id == slot_id
+            )
+        )
+    )
+    entry = result.scalar_one_or_none()
+    if entry is None:
+        entry = models.LotteryEntry(
+            release_id=release.id,
+            user_id=user_id,
+            slot_id=slot_id,
+            status=models.LotteryEntryStatus.PENDING,
+            created_at=now
+        )
+        db.add(entry)
+        stats["entries"] += 1
+    entry.other_players = other_players
+    entry.updated_at = now
+    await db.flush()
+    return entry
+
+async def due_release_ids(db: AsyncSession, now: datetime) -> List[int]:
+    result = await db.execute(
+        select(models.SlotRelease.id)
+        .where(
+            and_(
+                models.SlotRelease.status == models.ReleaseStatus.COLLECTING,
+                models.SlotRelease.allocate_at <= now
+            )
+        )
+        .order_by(models.SlotRelease.allocate_at)
+    )
+    return list(result.scalars().all())
+
+async def _recent_booking_counts(db: AsyncSession, user_ids: List[int], day: date) -> Dict[int, int]:
+    """Live bookings each user played in over the LOTTERY_HISTORY_DAYS before ``day``."""
+    start = datetime.combine(day - timedelta(days=LOTTERY_HISTORY_DAYS), datetime.min.time())
+    result = await db.execute(
+        select(models.BookingParticipant.user_id, func.count())
+        .join(models.Booking, models.BookingParticipant.booking_id == models.Booking.id)
+        .join(models.Slot, models.Booking.slot_id == models.Slot.id)
+        .where(
+            and_(
+                models.BookingParticipant.user_id.in_(user_ids),
+                models.Booking.status != 'cancelled',
+                models.Slot.start_time >= start,
+                models.Slot.start_time < datetime.combine(day, datetime.min.time())
+            )
+        )
+        .group_by(models.BookingParticipant.user_id)
+    )
+    return dict(result.all())
+
+async def _busy_times(db: AsyncSession, user_ids: List[int], day: date) -> Dict[int, list]:
+    """(start, end) of every live booking each user plays in on ``day``."""
+    start = datetime.combine(day, datetime.min.time())
+    result = await db.execute(
+        select(models.BookingParticipant.user_id, models.Slot.start_time, models.Slot.end_time)
+        .join(models.Booking, models.BookingParticipant.booking_id == models.Booking.id)
+        .join(models.Slot, models.Booking.slot_id == models.Slot.id)
+        .where(
+            and_(
+                models.BookingParticipant.user_id.in_(user_ids),
+                models.Booking.status != 'cancelled',
+                models.Slot.start_time < start + timedelta(days=1),
+                models.Slot.end_time > start
+            )
+        )
+    )
+    busy = defaultdict(list)
+    for user_id, slot_start, slot_end in result.all():
+        busy[user_id].append((slot_start, slot_end))
+    return busy
+
+def _draw_order(user_ids: List[int], weights: Dict[int, float], rng: random.Random) -> List[int]:
+    # Weighted random permutation: sorting by u ** (1 / weight) gives each
+    # remaining user a chance of coming next proportional to their weight
+    return sorted(user_ids, key=lambda user_id: rng.random() ** (1 / weights[user_id]), reverse=True)
+
+async def allocate(db: AsyncSession, release_id: int, seed: Optional[int] = None) -> Outcome:
+    """Allocate a release's entries; a booking_writer mutation, so the new
+    bookings, participants, slot updates and entry results are committed
+    in one transaction. Returns the release's counts."""
+    started = time.perf_counter()
+    release = await db.get(models.SlotRelease, release_id)
+    if release is None or release.status != models.ReleaseStatus.COLLECTING:
+        return Outcome(None)
+    game = await game_catalog.get_game(db, release.game_id)
+
+    result = await db.execute(
+        select(models.LotteryEntry)
+        .where(
+            and_(
+                models.LotteryEntry.release_id == release.id,
+                models.LotteryEntry.status == models.LotteryEntryStatus.PENDING
+            )
+        )
+        .order_by(models.LotteryEntry.id)
+    )
+    entries = result.scalars().all()
+
+    result = await db.execute(
+        select(models.Slot).where(
+            and_(
+                models.Slot.id.in_({entry.slot_id for entry in entries}),
+                models.Slot.is_available == True,
+                models.Slot.is_cancelled == False
+            )
+        )
+    )
+    slots = {slot.id: slot for slot in result.scalars().all()}
+
+    # Everything the pass checks is loaded up front, a handful of queries
+    # however many entries there are
+    entries_by_user = defaultdict(list)
+    for entry in entries:
+        entries_by_user[entry.user_id].append(entry)
+    user_ids = list(entries_by_user)
+    sap_ids = {sap_id for entry in entries for sap_id in participants.parse_sap_ids(entry.other_players)}
+    players_by_sap_id = await participants.resolve_sap_ids(db, list(sap_ids))
+    booked = await booking_rules.count_bookings_on(db, user_ids, game.type, release.day)
+    busy = await _busy_times(db, list(set(user_ids) | set(players_by_sap_id.values())), release.day)
+    weights = {user_id: 1.0 for user_id in user_ids}
+    if release.mode == models.LotteryMode.WEIGHTED:
+        recent = await _recent_booking_counts(db, user_ids, release.day)
+        weights = {user_id: 1 / (1 + recent.get(user_id, 0)) for user_id in user_ids}
+
+    def rejection(entry: models.LotteryEntry, slot: Optional[models.Slot]) -> Optional[str]:
+        if slot is None:
+            return "Slot is not available"
+        if slot.id in won_slots:
+            return "Slot went to another entry"
+        sap_ids = participants.parse_sap_ids(entry.other_players)
+        if len(sap_ids) > game.max_players - 1:
+            return f"Maximum {game.max_players} players allowed for this game"
+        if any(sap_id not in players_by_sap_id for sap_id in sap_ids):
+            return "One or more player SAP IDs are invalid"
+        for player_id in [entry.user_id] + [players_by_sap_id[sap_id] for sap_id in sap_ids]:
+            if any(start < slot.end_time and end > slot.start_time for start, end in busy[player_id]):
+                return "One or more players already have a booking at this time"
+        return None
+
+    # Users take turns in the drawn order; each turn gives a user their
+    # first remaining entry that can still be booked
+    order = _draw_order(user_ids, weights, random.Random(seed))
+    won_slots = {}
+    results = {}
+    progress = True
+    while progress:
+        progress = False
+        for user_id in order:
+            queue = entries_by_user[user_id]
+            if booked.get(user_id, 0) >= booking_rules.DAILY_GAME_LIMIT:
+                continue
+            while queue:
+                entry = queue.pop(0)
+                slot = slots.get(entry.slot_id)
+                reason = rejection(entry, slot)
+                if reason:
+                    results[entry.id] = reason
+                    continue
+                player_ids = [user_id] + [
+                    players_by_sap_id[sap_id] for sap_id in participants.parse_sap_ids(entry.other_players)
+                ]
+                won_slots[slot.id] = (entry, list(dict.fromkeys(player_ids)))
+                for player_id in player_ids:
+                    busy[player_id].append((slot.start_time, slot.end_time))
+                booked[user_id] = booked.get(user_id, 0) + 1
+                progress = True
+                break
+    for queue in entries_by_user.values():
+        for entry in queue:
+            results[entry.id] = f"You have already booked {game.type} twice that day"
+
+    now = datetime.utcnow()
+    booking_ids = {}
+    if won_slots:
+        result = await db.execute(
+            insert(models.Booking).returning(models.Booking.id, models.Booking.slot_id),
+            [
+                {
+                    "user_id": entry.user_id,
+                    "slot_id": slot_id,
+                    "game_id": slots[slot_id].game_id,
+                    "slot_start_time": slots[slot_id].start_time,
+                    "other_players": entry.other_players,
+                    "status": 'pending',
+                    "created_at": now,
+                    "updated_at": now
+                }
+                for slot_id, (entry, _) in won_slots.items()
+            ]
+        )
+        booking_ids = {slot_id: booking_id for booking_id, slot_id in result.all()}
+        await db.execute(
+            insert(models.BookingParticipant),
+            [
+                {"booking_id": booking_ids[slot_id], "user_id": player_id}
+                for slot_id, (_, player_ids) in won_slots.items()
+                for player_id in player_ids
+            ]
+        )
+        await db.execute(
+            update(models.Slot)
+            .where(models.Slot.id.in_(won_slots))
+            .values(is_available=False, updated_at=now)
+        )
+
+    updates = [
+        {
+            "id": entry.id,
+            "status": models.LotteryEntryStatus.WON,
+            "booking_id": booking_ids[slot_id],
+            "reason": None,
+            "updated_at": now
+        }
+        for slot_id, (entry, _) in won_slots.items()
+    ] + [
+        {
+            "id": entry_id,
+            "status": models.LotteryEntryStatus.LOST,
+            "booking_id": None,
+            "reason": reason,
+            "updated_at": now
+        }
+        for entry_id, reason in results.items()
+    ]
+    if updates:
+        await db.execute(update(models.LotteryEntry), updates)
+
+    counts = {
+        "entries": len(entries),
+        "users": len(user_ids),
+        "won": len(won_slots),
+        "lost": len(results),
+        "slots_requested": len({entry.slot_id for entry in entries}),
+    }
+    release.status = models.ReleaseStatus.ALLOCATED
+    release.counts = json.dumps(counts)
+    release.allocated_at = now
+    await db.flush()
+
+    taken = list(won_slots)
+    elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+
+    def on_commit():
+        for slot_id in taken:
+            slot_index.mark_taken(slot_id)
+        stats["allocations"] += 1
+        stats["won"] += counts["won"]
+        stats["lost"] += counts["lost"]
+        stats["last_allocation_ms"] = elapsed_ms
+
+    return Outcome(counts, on_commit)
+
+def summary() -> dict:
+    return {
+        "poll_seconds": LOTTERY_POLL_SECONDS,
+        "history_days": LOTTERY_HISTORY_DAYS,
+        **stats,
+    }
@@ -0,0 +1,113 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, insert, and_, or_, exists
+from app.models import models
+from datetime import datetime
+from typing import Dict, List, Optional
+
+def parse_sap_ids(other_players: Optional[str]) -> List[str]:
+    """Split the comma-separated other_players string into unique SAP IDs."""
+    if not other_players:
+        return []
+    sap_ids = [sap_id.strip() for sap_id in other_players.split(",")]
+    return list(dict.fromkeys(sap_id for sap_id in sap_ids if sap_id))
+
+async def resolve_sap_ids(db: AsyncSession, sap_ids: List[str]) -> Dict[str, int]:
+    """Map SAP IDs to user ids. Unknown SAP IDs are left out of the result."""
+    if not sap_ids:
+        return {}
+    query = select(models.User.sap_id, models.User.id).where(models.User.sap_id.in_(sap_ids))
+    result = await db.execute(query)
+    return {sap_id: user_id for sap_id, user_id in result.all()}
+
+async def find_conflicting_players(
+    db: AsyncSession,
+    user_ids: List[int],
+    start_time: datetime,
+    end_time: datetime
+) -> List[int]:
+    """Return the players that already hold a live booking overlapping the window."""
+    if not user_ids:
+        return []
+    query = (
+        select(models.BookingParticipant.user_id)
+        .join(models.Booking, models.BookingParticipant.booking_id == models.Booking.id)
+        .join(models.Slot, models.Booking.slot_id == models.Slot.id)
+        .where(
+            and_(
+                models.BookingParticipant.user_id.in_(user_ids),
+                models.Booking.status != 'cancelled',
+                models.Slot.start_time < end_time,
+                models.Slot.end_time > start_time
+            )
+        )
+        .distinct()
+    )
+    result = await db.execute(query)
+    return list(result.scalars().all())
+
+async def holds_slot(db: AsyncSession, slot_id: int, user_id: int) -> bool:
+    """Whether the user made, or plays in, a live booking of the slot."""
+    query = (
+        select(models.Booking.id)
+        .outerjoin(models.BookingParticipant, models.BookingParticipant.booking_id == models.Booking.id)
+        .where(
+            and_(
+                models.Booking.slot_id == slot_id,
+                models.Booking.status != 'cancelled',
+                or_(
+                    models.Booking.user_id == user_id,
+                    models.BookingParticipant.user_id == user_id
+                )
+            )
+        )
+        .limit(1)
+    )
+    result = await db.execute(query)
+    return result.first() is not None
+
+async def add_participants(db: AsyncSession, booking_id: int, user_ids: List[int]):
+    if not user_ids:
+        return
+    await db.execute(
+        insert(models.BookingParticipant),
+        [{"booking_id": booking_id, "user_id": user_id} for user_id in dict.fromkeys(user_ids)]
+    )
+
+def backfill_participants(connection):
+    """Create participant rows for bookings made before the table existed.
+
+    Runs through ``AsyncConnection.run_sync`` at startup. Bookings that already
+    have participant rows are skipped, so repeated runs are cheap.
+    """
+    missing = (
+        select(models.Booking.id, models.Booking.user_id, models.Booking.other_players)
+        .where(
+            ~exists().where(models.BookingParticipant.booking_id == models.Booking.id)
+        )
+    )
+    bookings = connection.execute(missing).all()
+    if not bookings:
+        return
+
+    sap_ids = {sap_id for booking in bookings for sap_id in parse_sap_ids(booking.other_players)}
+    users_by_sap_id = {}
+    if sap_ids:
+        result = connection.execute(
+            select(models.User.sap_id, models.User.id).where(models.User.sap_id.in_(sap_ids))
+        )
+        users_by_sap_id = dict(result.all())
+
+    rows = []
+    for booking in bookings:
+        user_ids = [booking.user_id] + [
+            users_by_sap_id[sap_id]
+            for sap_id in parse_sap_ids(booking.other_players)
+            if sap_id in users_by_sap_id
+        ]
+        rows.extend(
+            {"booking_id": booking.id, "user_id": user_id}
+            for user_id in dict.fromkeys(user_ids)
+            if user_id is not None
+        )
+    if rows:
+        connection.execute(insert(models.BookingParticipant), rows)
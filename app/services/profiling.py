@@ -0,0 +1,285 @@
+from sqlalchemy import event, select
+from starlette.routing import Match
+from app.database import shards, async_session, current_site
+from app.models import models
+from app.auth.auth_handler import token_subject
+from app.config import int_env, float_env
+from datetime import datetime
+from typing import List, Optional
+import contextvars
+import cProfile
+import io
+import itertools
+import json
+import os
+import pstats
+import random
+import re
+import sys
+import time
+
+try:
+    import greenlet
+except ImportError:
+    # SQL statements are then recorded without the app code that ran them
+    greenlet = None
+
+# Single requests run under cProfile when an admin sends "X-Profile: 1", or
+# at random with probability PROFILE_SAMPLE_RATE (only for the routes in
+# PROFILE_ROUTES when it is set, e.g. "admin.update_game_status"). Both can
+# be changed at runtime through PUT /admin/profiling. Each profile is a
+# pstats dump plus a JSON report with the top functions and every SQL
+# statement executed, kept in PROFILE_DIR; the oldest are deleted past
+# PROFILE_KEEP. Requests that are not profiled only pay for a header lookup.
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_KEEP = int_env("PROFILE_KEEP", 50)
+PROFILE_TOP_FUNCTIONS = 40
+PROFILE_HEADER = b"x-profile"
+MAX_SQL_STATEMENTS = 500
+
+sample_rate = float_env("PROFILE_SAMPLE_RATE", 0)
+routes = {name.strip() for name in os.getenv("PROFILE_ROUTES", "").split(",") if name.strip()}
+
+stats = {
+    "profiled": 0,
+    "by_header": 0,
+    "sampled": 0,
+    "skipped_busy": 0,
+    "header_denied": 0,
+}
+
+_APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_ID_PATTERN = re.compile(r"^[0-9T]+-[0-9]+-[A-Za-z0-9_.]+$")
+_sequence = itertools.count(1)
+# cProfile hooks the whole thread, so only one request is profiled at a time
+_active: Optional["_Recording"] = None
+_request = contextvars.ContextVar("profiled_request", default=None)
+
+def _app_frames() -> List[str]:
+    """Where in the app the current SQL statement comes from, innermost
+    first. SQLAlchemy runs the DBAPI call in a greenlet, so the request's
+    own frames are found on the parent greenlets."""
+    frames = []
+    frame = sys._getframe(2)
+    current = greenlet.getcurrent() if greenlet else None
+    while True:
+        while frame is not None:
+            filename = frame.f_code.co_filename
+            if filename.startswith(_APP_ROOT) and filename != __file__:
+                frames.append(f"{os.path.relpath(filename, os.path.dirname(_APP_ROOT))}:{frame.f_lineno} in {frame.f_code.co_name}")
+            frame = frame.f_back
+        if current is None or current.parent is None:
+            return frames[:8]
+        current = current.parent
+        frame = current.gr_frame
+
+class _Recording:
+    def __init__(self, token: object):
+        self.token = token
+        self.profiler = cProfile.Profile()
+        self.statements = []
+        self.sql_seconds = 0.0
+        self.engines = []
+
+    def before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        context._profile_started = time.perf_counter()
+
+    def after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - getattr(context, "_profile_started", time.perf_counter())
+        self.sql_seconds += elapsed
+        if len(self.statements) >= MAX_SQL_STATEMENTS:
+            return
+        self.statements.append({
+            "sql": statement,
+            "parameters": repr(parameters)[:500],
+            "ms": round(elapsed * 1000, 3),
+            "executemany": executemany,
+            "site": current_site.get(),
+            # Other requests (and the booking writer) keep running on the
+            # loop while this one is profiled; their statements are kept
+            # but marked
+            "this_request": _request.get() is self.token,
+            "called_from": _app_frames(),
+        })
+
+    def start(self):
+        # Every site's engine: fan-out reports query them all
+        self.engines = [shard.engine.sync_engine for shard in shards.values()]
+        for engine in self.engines:
+            event.listen(engine, "before_cursor_execute", self.before_cursor_execute)
+            event.listen(engine, "after_cursor_execute", self.after_cursor_execute)
+        self.profiler.enable()
+
+    def stop(self):
+        self.profiler.disable()
+        for engine in self.engines:
+            event.remove(engine, "before_cursor_execute", self.before_cursor_execute)
+            event.remove(engine, "after_cursor_execute", self.after_cursor_execute)
+
+def route_name(router, scope) -> Optional[str]:
+    """``module.function`` of the endpoint ``scope`` is routed to, such as
+    ``admin.update_game_status``."""
+    for route in router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            endpoint = getattr(route, "endpoint", None)
+            if endpoint is None:
+                return None
+            return f"{endpoint.__module__.rsplit('.', 1)[-1]}.{endpoint.__name__}"
+    return None
+
+async def _is_admin(scope) -> bool:
+    headers = dict(scope["headers"])
+    authorization = headers.get(b"authorization", b"").decode("latin-1")
+    if not authorization.lower().startswith("bearer "):
+        return False
+    subject = token_subject(authorization[7:].strip())
+    if subject is None:
+        return False
+    async with async_session() as session:
+        result = await session.execute(select(models.User.role).where(models.User.email == subject))
+        return result.scalar_one_or_none() == "admin"
+
+def _report(recording: _Recording) -> str:
+    output = io.StringIO()
+    profile_stats = pstats.Stats(recording.profiler, stream=output)
+    profile_stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(PROFILE_TOP_FUNCTIONS)
+    return output.getvalue()
+
+def _rotate():
+    names = sorted(name for name in os.listdir(PROFILE_DIR) if name.endswith(".json"))
+    for name in names[:max(0, len(names) - PROFILE_KEEP)]:
+        for path in (os.path.join(PROFILE_DIR, name), os.path.join(PROFILE_DIR, name[:-5] + ".prof")):
+            if os.path.exists(path):
+                os.remove(path)
+
+def _save(profile_id: str, recording: _Recording, metadata: dict):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    recording.profiler.dump_stats(os.path.join(PROFILE_DIR, profile_id + ".prof"))
+    report = {
+        **metadata,
+        "sql_count": sum(1 for statement in recording.statements if statement["this_request"]),
+        "sql_ms": round(sum(statement["ms"] for statement in recording.statements if statement["this_request"]), 3),
+        "functions": _report(recording),
+        "sql": recording.statements,
+    }
+    with open(os.path.join(PROFILE_DIR, profile_id + ".json"), "w") as f:
+        json.dump(report, f, indent=1, default=str)
+    _rotate()
+
+class ProfilingMiddleware:
+    """Run selected requests under cProfile and save what they spent their
+    time on; see the settings above. A profiled response carries an
+    ``X-Profile-Id`` header naming its profile under /admin/profiles."""
+
+    def __init__(self, app, router):
+        self.app = app
+        self.router = router
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        requested = any(name == PROFILE_HEADER for name, _ in scope["headers"])
+        if not requested and not sample_rate:
+            await self.app(scope, receive, send)
+            return
+
+        route = route_name(self.router, scope)
+        if requested:
+            if not await _is_admin(scope):
+                stats["header_denied"] += 1
+                await self.app(scope, receive, send)
+                return
+        elif (routes and route not in routes) or random.random() >= sample_rate:
+            await self.app(scope, receive, send)
+            return
+        if _active is not None:
+            stats["skipped_busy"] += 1
+            await self.app(scope, receive, send)
+            return
+
+        await self._profile(scope, receive, send, route, "header" if requested else "sample")
+
+    async def _profile(self, scope, receive, send, route: Optional[str], trigger: str):
+        global _active
+        started_at = datetime.utcnow()
+        profile_id = f"{started_at:%Y%m%dT%H%M%S}-{next(_sequence):04d}-{route or 'unrouted'}"
+        response_status = None
+
+        async def send_with_id(message):
+            nonlocal response_status
+            if message["type"] == "http.response.start":
+                response_status = message["status"]
+                message = {**message, "headers": list(message.get("headers", [])) + [(b"x-profile-id", profile_id.encode())]}
+            await send(message)
+
+        token = object()
+        recording = _active = _Recording(token)
+        context_token = _request.set(token)
+        started = time.perf_counter()
+        recording.start()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            recording.stop()
+            elapsed = time.perf_counter() - started
+            _request.reset(context_token)
+            _active = None
+            stats["profiled"] += 1
+            stats["by_header" if trigger == "header" else "sampled"] += 1
+            try:
+                _save(profile_id, recording, {
+                    "id": profile_id,
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "query": scope.get("query_string", b"").decode("latin-1"),
+                    "route": route,
+                    "trigger": trigger,
+                    "status": response_status,
+                    "duration_ms": round(elapsed * 1000, 3),
+                    "created_at": started_at,
+                })
+            except OSError as e:
+                print(f"Failed to save profile {profile_id}: {e}")
+
+def _load(profile_id: str) -> Optional[dict]:
+    if not _ID_PATTERN.match(profile_id):
+        return None
+    path = os.path.join(PROFILE_DIR, profile_id + ".json")
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+def recent(limit: int) -> List[dict]:
+    """Newest profiles first, without their function and SQL listings."""
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    names = sorted((name for name in os.listdir(PROFILE_DIR) if name.endswith(".json")), reverse=True)
+    profiles = []
+    for name in names[:limit]:
+        report = _load(name[:-5])
+        if report is not None:
+            profiles.append({key: value for key, value in report.items() if key not in ("functions", "sql")})
+    return profiles
+
+def get(profile_id: str) -> Optional[dict]:
+    return _load(profile_id)
+
+def stats_path(profile_id: str) -> Optional[str]:
+    """The pstats dump of a profile, for snakeviz or ``python -m pstats``."""
+    if not _ID_PATTERN.match(profile_id):
+        return None
+    path = os.path.join(PROFILE_DIR, profile_id + ".prof")
+    return path if os.path.exists(path) else None
+
+def summary() -> dict:
+    return {
+        "sample_rate": sample_rate,
+        "routes": sorted(routes),
+        "directory": PROFILE_DIR,
+        "keep": PROFILE_KEEP,
+        "active": _active is not None,
+        **stats,
+    }
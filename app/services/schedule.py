@@ -0,0 +1,257 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, insert, and_, or_, exists, literal, Boolean, DateTime, Integer
+from app.models import models
+from app.services import game_catalog
+from datetime import date, datetime, timedelta, time
+from typing import Dict, List, Optional, Set, Tuple
+import calendar
+
+# Read endpoints only list slots starting between 9 AM and 8 PM
+BOOKING_HOURS = (time(9, 0), time(20, 0))
+
+# Slots of templated games that have no row yet get a negative id that
+# encodes the game and start minute, so clients can book them by id.
+_MINUTE_BITS = 32
+
+def virtual_slot_id(game_id: int, start_time: datetime) -> int:
+    minutes = calendar.timegm(start_time.utctimetuple()) // 60
+    return -((game_id << _MINUTE_BITS) | minutes)
+
+def decode_virtual_slot_id(slot_id: int) -> Optional[Tuple[int, datetime]]:
+    if slot_id >= 0:
+        return None
+    value = -slot_id
+    game_id, minutes = value >> _MINUTE_BITS, value & ((1 << _MINUTE_BITS) - 1)
+    return game_id, datetime.utcfromtimestamp(minutes * 60)
+
+class VirtualSlot:
+    """A bookable slot computed from a template that has no Slot row yet."""
+
+    is_available = True
+    is_cancelled = False
+    cancellation_reason = None
+
+    def __init__(self, game_id: int, start_time: datetime, end_time: datetime, stamp: datetime):
+        self.id = virtual_slot_id(game_id, start_time)
+        self.game_id = game_id
+        self.start_time = start_time
+        self.end_time = end_time
+        self.created_at = stamp
+        self.updated_at = stamp
+
+def generated_day_slots(game_id: int, day_start: datetime, now: datetime) -> List[models.Slot]:
+    """Unsaved 30 minute Slot rows from 9 AM to 8 PM for a game without a template."""
+    slots = []
+    current = day_start.replace(hour=BOOKING_HOURS[0].hour, minute=0)
+    end_time = day_start.replace(hour=BOOKING_HOURS[1].hour, minute=0)
+    while current < end_time:
+        slot_end = current + timedelta(minutes=30)
+        slots.append(models.Slot(
+            game_id=game_id,
+            start_time=current,
+            end_time=slot_end,
+            is_available=True,
+            is_cancelled=False,
+            created_at=now,
+            updated_at=now
+        ))
+        current = slot_end
+    return slots
+
+def within_booking_hours(slot) -> bool:
+    start = slot.start_time.time().replace(microsecond=0)
+    return BOOKING_HOURS[0] <= start <= BOOKING_HOURS[1]
+
+def slot_response(slot) -> dict:
+    """A stored or virtual slot as the Slot schema serializes it, for
+    endpoints that return plain dicts."""
+    return {
+        "game_id": slot.game_id,
+        "start_time": slot.start_time,
+        "end_time": slot.end_time,
+        "id": slot.id,
+        "is_available": slot.is_available,
+        "is_cancelled": slot.is_cancelled,
+        "cancellation_reason": slot.cancellation_reason,
+        "created_at": slot.created_at,
+        "updated_at": slot.updated_at
+    }
+
+def parse_weekdays(weekdays: Optional[str]) -> Set[int]:
+    if not weekdays:
+        return set()
+    return {int(day) for day in weekdays.split(",") if day.strip()}
+
+def template_times(template: models.ScheduleTemplate, day: date) -> List[Tuple[datetime, datetime]]:
+    """Start and end of every slot the template opens on ``day``."""
+    if day.weekday() not in parse_weekdays(template.weekdays):
+        return []
+    length = timedelta(minutes=template.slot_minutes or 30)
+    current = datetime.combine(day, template.open_time)
+    close = datetime.combine(day, template.close_time)
+    times = []
+    while current + length <= close:
+        times.append((current, current + length))
+        current += length
+    return times
+
+async def load_templates(db: AsyncSession, game_ids: List[int]) -> Dict[int, models.ScheduleTemplate]:
+    if not game_ids:
+        return {}
+    result = await db.execute(
+        select(models.ScheduleTemplate).where(models.ScheduleTemplate.game_id.in_(game_ids))
+    )
+    return {template.game_id: template for template in result.scalars().all()}
+
+async def load_closed_days(
+    db: AsyncSession, game_ids: List[int], start: date, end: date
+) -> Set[Tuple[Optional[int], date]]:
+    """(game_id, date) pairs closed by exceptions; game_id None closes all games."""
+    result = await db.execute(
+        select(models.ScheduleException.game_id, models.ScheduleException.date)
+        .where(
+            and_(
+                models.ScheduleException.date >= start,
+                models.ScheduleException.date <= end,
+                or_(
+                    models.ScheduleException.game_id.is_(None),
+                    models.ScheduleException.game_id.in_(game_ids)
+                )
+            )
+        )
+    )
+    return set(result.all())
+
+async def slots_between(
+    db: AsyncSession, games: List[models.Game], start: datetime, end: datetime
+) -> list:
+    """Every non-cancelled slot of ``games`` starting in ``[start, end)``.
+
+    Stored rows are read with one range query. For active games that have a
+    template, the template's future slots without a row are added as
+    VirtualSlot objects; past ones are not, since the archiver removes the
+    rows of past slots and they would otherwise reappear as free. A stored
+    row, cancelled or not, always takes precedence over the template for the
+    same start time. The result is ordered by start time.
+    """
+    game_ids = [game.id for game in games]
+    if not game_ids:
+        return []
+
+    result = await db.execute(
+        select(models.Slot)
+        .where(
+            and_(
+                models.Slot.game_id.in_(game_ids),
+                models.Slot.start_time >= start,
+                models.Slot.start_time < end
+            )
+        )
+        .order_by(models.Slot.start_time, models.Slot.game_id)
+    )
+    rows = result.scalars().all()
+    slots = [slot for slot in rows if not slot.is_cancelled]
+
+    active_ids = [game.id for game in games if game.status == models.GameStatus.ACTIVE]
+    templates = await load_templates(db, active_ids)
+    virtual_start = max(start, datetime.utcnow())
+    if templates and virtual_start < end:
+        stored = {(slot.game_id, slot.start_time) for slot in rows}
+        closed = await load_closed_days(db, list(templates), virtual_start.date(), end.date())
+        day = virtual_start.date()
+        while datetime.combine(day, time()) < end:
+            for game_id, template in templates.items():
+                if (None, day) in closed or (game_id, day) in closed:
+                    continue
+                for slot_start, slot_end in template_times(template, day):
+                    if virtual_start <= slot_start < end and (game_id, slot_start) not in stored:
+                        slots.append(VirtualSlot(game_id, slot_start, slot_end, template.updated_at))
+            day += timedelta(days=1)
+        slots.sort(key=lambda slot: (slot.start_time, slot.game_id))
+    return slots
+
+async def get_virtual_slot(db: AsyncSession, slot_id: int) -> Optional[VirtualSlot]:
+    """The VirtualSlot for a negative id, or None if the template does not
+    open that slot, it is already stored or it is in the past."""
+    decoded = decode_virtual_slot_id(slot_id)
+    if decoded is None:
+        return None
+    game_id, start_time = decoded
+    game = await game_catalog.get_game(db, game_id)
+    if not game:
+        return None
+    day_start = datetime.combine(start_time.date(), time())
+    slots = await slots_between(db, [game], day_start, day_start + timedelta(days=1))
+    for slot in slots:
+        if isinstance(slot, VirtualSlot) and slot.start_time == start_time:
+            return slot
+    return None
+
+async def _stored_slot_id(db: AsyncSession, game_id: int, start_time: datetime) -> Optional[int]:
+    result = await db.execute(
+        select(models.Slot.id)
+        .where(and_(models.Slot.game_id == game_id, models.Slot.start_time == start_time))
+        .order_by(models.Slot.id)
+        .limit(1)
+    )
+    return result.scalar_one_or_none()
+
+async def materialize(db: AsyncSession, slot_id: int) -> Optional[int]:
+    """Return the id of the stored row for ``slot_id``, creating it first if
+    it is a virtual slot. Returns None for an unknown virtual id.
+
+    The row is inserted with INSERT ... SELECT ... WHERE NOT EXISTS, which
+    SQLite runs atomically, so concurrent bookings of the same virtual slot
+    end up on one row. A virtual id for a time in the past is rejected; its
+    row may already have been archived.
+    """
+    if slot_id >= 0:
+        return slot_id
+    decoded = decode_virtual_slot_id(slot_id)
+    if decoded is None or decoded[1] < datetime.utcnow():
+        return None
+    virtual = await get_virtual_slot(db, slot_id)
+    if virtual is None:
+        return await _stored_slot_id(db, *decoded)
+
+    now = datetime.utcnow()
+    await db.execute(_insert_missing(virtual, now, is_cancelled=False, reason=None))
+    return await _stored_slot_id(db, virtual.game_id, virtual.start_time)
+
+def _insert_missing(virtual: VirtualSlot, now: datetime, is_cancelled: bool, reason: Optional[str]):
+    source = select(
+        literal(virtual.game_id, Integer),
+        literal(virtual.start_time, DateTime),
+        literal(virtual.end_time, DateTime),
+        literal(not is_cancelled, Boolean),
+        literal(is_cancelled, Boolean),
+        literal(reason),
+        literal(now, DateTime),
+        literal(now, DateTime)
+    ).where(
+        ~exists().where(
+            and_(
+                models.Slot.game_id == virtual.game_id,
+                models.Slot.start_time == virtual.start_time
+            )
+        )
+    )
+    return insert(models.Slot).from_select(
+        ["game_id", "start_time", "end_time", "is_available", "is_cancelled",
+         "cancellation_reason", "created_at", "updated_at"],
+        source
+    )
+
+async def materialize_cancelled(
+    db: AsyncSession, game: models.Game, day_start: datetime, reason: str
+) -> int:
+    """Store cancelled rows for the template slots of one game and day so the
+    cancellation survives. Returns the number of rows created."""
+    slots = await slots_between(db, [game], day_start, day_start + timedelta(days=1))
+    now = datetime.utcnow()
+    created = 0
+    for slot in slots:
+        if isinstance(slot, VirtualSlot):
+            await db.execute(_insert_missing(slot, now, is_cancelled=True, reason=reason))
+            created += 1
+    return created
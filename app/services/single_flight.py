@@ -0,0 +1,71 @@
+from fastapi import Response
+from fastapi.encoders import jsonable_encoder
+from app.database import async_session, current_site
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+import asyncio
+import json
+import os
+
+# Routes whose identical concurrent requests share one query and one
+# serialized body. Override with a comma-separated SINGLE_FLIGHT_ROUTES, or
+# switch a route at runtime through PUT /admin/single-flight/{route}.
+ROUTES = ("games_list", "slots_available")
+_configured = os.getenv("SINGLE_FLIGHT_ROUTES")
+enabled: Dict[str, bool] = {
+    route: _configured is None or route in {name.strip() for name in _configured.split(",")}
+    for route in ROUTES
+}
+
+stats: Dict[str, dict] = {
+    route: {"requests": 0, "executions": 0, "bypassed": 0} for route in ROUTES
+}
+
+_in_flight: Dict[Tuple, asyncio.Task] = {}
+
+def _key(route: str, params: dict) -> Tuple:
+    # Each site answers from its own database
+    return (current_site.get(), route) + tuple(sorted((name, value) for name, value in params.items() if value is not None))
+
+async def _execute(loader: Callable[..., Awaitable], params: dict) -> bytes:
+    # The shared query runs on its own session so it does not depend on the
+    # request that happened to start it
+    async with async_session() as session:
+        content = await loader(session, **params)
+    return json.dumps(jsonable_encoder(content), separators=(",", ":")).encode("utf-8")
+
+async def serve(route: str, params: dict, loader: Callable[..., Awaitable]) -> Response:
+    """Respond with ``loader(session, **params)`` as JSON, sharing one call
+    between concurrent requests with the same route and params.
+
+    The first request starts the load as a task; requests that arrive while
+    it runs await the same task and send the same bytes. The task is shielded
+    so a caller disconnecting does not cancel it for the others.
+    """
+    if not enabled.get(route):
+        stats[route]["bypassed"] += 1
+        body = await _execute(loader, params)
+    else:
+        route_stats = stats[route]
+        route_stats["requests"] += 1
+        key = _key(route, params)
+        task = _in_flight.get(key)
+        if task is None:
+            route_stats["executions"] += 1
+            task = asyncio.ensure_future(_execute(loader, params))
+            _in_flight[key] = task
+            task.add_done_callback(lambda done: _in_flight.pop(key, None) if _in_flight.get(key) is done else None)
+        body = await asyncio.shield(task)
+    return Response(content=body, media_type="application/json")
+
+def fan_in(route: str) -> Optional[float]:
+    """Requests served per query executed; None before the first request."""
+    route_stats = stats[route]
+    if not route_stats["executions"]:
+        return None
+    return round(route_stats["requests"] / route_stats["executions"], 2)
+
+def summary() -> dict:
+    return {
+        route: {"enabled": enabled[route], **stats[route], "fan_in": fan_in(route)}
+        for route in ROUTES
+    }
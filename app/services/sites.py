@@ -0,0 +1,137 @@
+from sqlalchemy import update
+from app.database import shards, current_site, DEFAULT_SITE
+from app.models import models
+from app.auth.auth_handler import token_claims
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+import asyncio
+import json
+import re
+
+# A request's site is taken from, in order: a /sites/<site> path prefix,
+# which is stripped before routing; the X-Site header; the "site" claim of
+# its access token. Requests naming none use DEFAULT_SITE. A token only
+# works on the site that issued it: its user lives in that site's database,
+# and the same email may belong to someone else at another site.
+SITE_HEADER = b"x-site"
+_PREFIX = re.compile(r"^/sites/([^/]+)(/.*)?$")
+
+async def _reject(send, status_code: int, detail: str):
+    body = json.dumps({"detail": detail}).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status_code,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+class SiteMiddleware:
+    """Pick the database shard for each request; see above. Everything
+    below it, middleware included, sees the path without the site prefix
+    and gets the site's database from ``app.database.async_session``."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        site = None
+        match = _PREFIX.match(scope["path"])
+        if match:
+            site = match.group(1).lower()
+            prefix = f"/sites/{match.group(1)}"
+            raw_path = scope.get("raw_path") or scope["path"].encode()
+            scope = dict(
+                scope,
+                path=match.group(2) or "/",
+                raw_path=raw_path[len(prefix):] or b"/",
+                # Redirects and the OpenAPI docs keep the prefix
+                root_path=scope.get("root_path", "") + prefix
+            )
+
+        headers = dict(scope["headers"])
+        named = headers.get(SITE_HEADER, b"").decode("latin-1").strip().lower()
+        if named:
+            if site is not None and named != site:
+                await _reject(send, 400, f"X-Site {named!r} does not match the site in the path, {site!r}")
+                return
+            site = named
+
+        authorization = headers.get(b"authorization", b"").decode("latin-1")
+        if authorization.lower().startswith("bearer "):
+            claims = token_claims(authorization[7:].strip())
+            if claims is not None:
+                # Tokens issued before sites existed belong to the default one
+                issued_by = claims.get("site", DEFAULT_SITE)
+                if site is not None and issued_by != site:
+                    await _reject(send, 403, f"This token was issued for site {issued_by!r}")
+                    return
+                site = issued_by
+
+        site = site or DEFAULT_SITE
+        if site not in shards:
+            await _reject(send, 404, f"Unknown site {site!r}")
+            return
+        token = current_site.set(site)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_site.reset(token)
+
+async def fan_out(work: Callable[..., Awaitable[Any]], sites: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """Run ``work(session)`` on every site (or those in ``sites``)
+    concurrently, each on its own session with current_site set, and return
+    the results by site, in SITES order."""
+    wanted = set(sites) if sites is not None else None
+    names = [site for site in shards if wanted is None or site in wanted]
+
+    async def run(site: str):
+        # Each gathered coroutine runs in its own task and context
+        current_site.set(site)
+        async with shards[site].session() as session:
+            return await work(session)
+
+    results = await asyncio.gather(*(run(site) for site in names))
+    return dict(zip(names, results))
+
+def start_per_site(loop: Callable[[], Awaitable[None]]) -> List[asyncio.Task]:
+    """Start ``loop()`` as a background task for every site, with
+    current_site set, so each site's database is worked on independently."""
+    async def run(site: str):
+        current_site.set(site)
+        await loop()
+
+    return [asyncio.create_task(run(site)) for site in shards]
+
+class PerSite:
+    """One instance of ``factory()`` per site behind a single name: attribute
+    access goes to the current site's instance, created on first use. For
+    in-memory state loaded from a site's database, such as the slot index."""
+
+    def __init__(self, factory: Callable[[], Any]):
+        self._factory = factory
+        self._instances: Dict[str, Any] = {}
+
+    def instance(self) -> Any:
+        site = current_site.get()
+        instance = self._instances.get(site)
+        if instance is None:
+            instance = self._instances[site] = self._factory()
+        return instance
+
+    def __getattr__(self, name: str):
+        return getattr(self.instance(), name)
+
+    def __len__(self) -> int:
+        return len(self.instance())
+
+def assign_game_site(site: str):
+    """For ``AsyncConnection.run_sync`` at startup: mark games created
+    before sites existed as belonging to the database they are in."""
+    def assign(connection):
+        connection.execute(
+            update(models.Game).where(models.Game.site.is_(None)).values(site=site)
+        )
+    return assign
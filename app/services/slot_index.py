@@ -0,0 +1,155 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import models
+from app.services import schedule, game_catalog
+from app.services.sites import PerSite
+from app.config import int_env
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta
+from heapq import merge
+from itertools import islice
+from typing import Dict, Iterable, List, Optional, Tuple
+import asyncio
+import time
+
+# Full reload interval. Changes made by this process are applied
+# incrementally; the reload picks up writes from other workers.
+REFRESH_SECONDS = int_env("SLOT_INDEX_REFRESH_SECONDS", 300)
+
+# How far ahead the index covers; searches beyond it find nothing
+HORIZON_DAYS = int_env("SLOT_INDEX_HORIZON_DAYS", 62)
+
+class SlotIndex:
+    """In-memory index of free future slots, kept sorted by start time per game.
+
+    Each game maps to a sorted list of ``(start_time, slot_id, end_time)``
+    tuples, so a time window is located with one bisect and consecutive slots
+    are found by walking forward while ``end_time`` of one slot equals the
+    ``start_time`` of the next.
+    """
+
+    def __init__(self):
+        self._games: Dict[int, dict] = {}
+        self._free: Dict[int, List[Tuple[datetime, int, datetime]]] = {}
+        self._slots: Dict[int, Tuple[int, datetime]] = {}
+        self._loaded_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+
+    def invalidate(self):
+        self._loaded_at = None
+
+    def _is_stale(self) -> bool:
+        return self._loaded_at is None or time.monotonic() - self._loaded_at > REFRESH_SECONDS
+
+    async def ensure_loaded(self, db: AsyncSession):
+        if not self._is_stale():
+            return
+        async with self._lock:
+            if not self._is_stale():
+                return
+            all_games = (await game_catalog.current(db)).games
+            games = {
+                game.id: {
+                    "name": game.name,
+                    "type": game.type,
+                    "max_players": game.max_players,
+                    "status": game.status
+                }
+                for game in all_games
+            }
+
+            now = datetime.utcnow()
+            free = {}
+            slots = {}
+            for slot in await schedule.slots_between(db, all_games, now, now + timedelta(days=HORIZON_DAYS)):
+                if not slot.is_available:
+                    continue
+                free.setdefault(slot.game_id, []).append((slot.start_time, slot.id, slot.end_time))
+                slots[slot.id] = (slot.game_id, slot.start_time)
+            for entries in free.values():
+                entries.sort()
+
+            self._games, self._free, self._slots = games, free, slots
+            self._loaded_at = time.monotonic()
+
+    def mark_taken(self, slot_id: int):
+        known = self._slots.pop(slot_id, None)
+        if known is None:
+            return
+        game_id, start_time = known
+        entries = self._free.get(game_id, [])
+        i = bisect_left(entries, (start_time, slot_id))
+        if i < len(entries) and entries[i][1] == slot_id:
+            del entries[i]
+
+    def mark_free(self, slot_id: int, game_id: int, start_time: datetime, end_time: datetime):
+        if self._loaded_at is None or slot_id in self._slots:
+            return
+        insort(self._free.setdefault(game_id, []), (start_time, slot_id, end_time))
+        self._slots[slot_id] = (game_id, start_time)
+
+    def add_slots(self, slots: Iterable[models.Slot]):
+        for slot in slots:
+            if slot.is_available and not slot.is_cancelled:
+                self.mark_free(slot.id, slot.game_id, slot.start_time, slot.end_time)
+
+    def _runs(self, game_id: int, start: datetime, end: datetime, cells: int):
+        """Yield (start, end, slot_ids) for every run of ``cells`` consecutive free slots."""
+        entries = self._free.get(game_id, [])
+        i = bisect_left(entries, (start,))
+        run = []
+        while i < len(entries) and entries[i][2] <= end:
+            entry = entries[i]
+            if run and run[-1][2] != entry[0]:
+                run = []
+            run.append(entry)
+            if len(run) >= cells:
+                window = run[-cells:]
+                yield window[0][0], window[-1][2], [slot_id for _, slot_id, _ in window]
+            i += 1
+
+    def _candidates(self, game_id: int, surplus: int, start: datetime, end: datetime, cells: int):
+        for run_start, run_end, slot_ids in self._runs(game_id, start, end, cells):
+            yield (run_start, surplus, game_id), run_end, slot_ids
+
+    def search(
+        self,
+        start: datetime,
+        end: datetime,
+        players: int,
+        game_types: Optional[List[str]] = None,
+        min_duration: int = 30,
+        limit: int = 20
+    ) -> List[dict]:
+        """Return up to ``limit`` candidates ranked by start time, then by how
+        closely the game's capacity fits the number of players."""
+        start = max(start, datetime.utcnow())
+        per_game = []
+        for game_id, game in self._games.items():
+            if game["status"] != models.GameStatus.ACTIVE or game["max_players"] < players:
+                continue
+            if game_types and game["type"] not in game_types:
+                continue
+            entries = self._free.get(game_id)
+            if not entries:
+                continue
+            slot_minutes = (entries[0][2] - entries[0][0]) / timedelta(minutes=1)
+            cells = max(1, -(-int(min_duration) // int(slot_minutes or 30)))
+            per_game.append(self._candidates(game_id, game["max_players"] - players, start, end, cells))
+
+        ranked = islice(merge(*per_game, key=lambda candidate: candidate[0]), limit)
+        results = []
+        for (run_start, surplus, game_id), run_end, slot_ids in ranked:
+            game = self._games[game_id]
+            results.append({
+                "game_id": game_id,
+                "game_name": game["name"],
+                "game_type": game["type"],
+                "max_players": game["max_players"],
+                "start_time": run_start,
+                "end_time": run_end,
+                "slot_ids": slot_ids
+            })
+        return results
+
+# One index per site, each loaded from that site's database
+slot_index = PerSite(SlotIndex)
@@ -0,0 +1,203 @@
+from fastapi import Response
+from typing import Dict, NamedTuple, Optional
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import sys
+
+try:
+    import brotli
+except ImportError:
+    # Optional; without it only gzip variants are built
+    brotli = None
+
+# The web UI served at / by the API itself, so its requests are same-origin
+# and need no CORS preflight. Set UI_DIR to ui_replica or moder_ui to serve
+# another UI, or to an empty string to serve none.
+UI_DIR = os.getenv("UI_DIR", "ui")
+BUILD_DIR_NAME = "dist"
+MANIFEST_NAME = "manifest.json"
+ASSET_PREFIX = "/assets/"
+# Fingerprinted names change with their content, so they are cached forever;
+# index.html keeps its name and is revalidated with its ETag instead
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+INDEX_CACHE_CONTROL = "no-cache"
+COMPRESSIBLE_TYPES = {".js", ".css", ".html", ".svg", ".json", ".txt"}
+SKIPPED_FILES = {"index.html", "README.md", MANIFEST_NAME}
+
+stats = {
+    "requests": 0,
+    "not_modified": 0,
+    "br": 0,
+    "gzip": 0,
+    "identity": 0,
+}
+
+class Asset(NamedTuple):
+    body: bytes
+    gzip: Optional[bytes]
+    br: Optional[bytes]
+    content_type: str
+    etag: str
+    cache_control: str
+
+# Request path -> asset, loaded once at startup
+_assets: Dict[str, Asset] = {}
+
+def _write_variants(out_dir: str, name: str, body: bytes):
+    with open(os.path.join(out_dir, name), "wb") as f:
+        f.write(body)
+    if os.path.splitext(name)[1] not in COMPRESSIBLE_TYPES:
+        return
+    with open(os.path.join(out_dir, name + ".gz"), "wb") as f:
+        # mtime=0 keeps rebuilds of unchanged files byte-identical
+        f.write(gzip.compress(body, compresslevel=9, mtime=0))
+    if brotli is not None:
+        with open(os.path.join(out_dir, name + ".br"), "wb") as f:
+            f.write(brotli.compress(body, quality=11))
+
+def build(ui_dir: str) -> dict:
+    """Write ``ui_dir/dist`` with content-hashed copies of the UI's assets,
+    their gzip/brotli variants and an index.html pointing at them.
+
+    The built index.html gets an empty ``api-url`` meta tag, which tells
+    api.js to call the API on its own origin.
+    """
+    out_dir = os.path.join(ui_dir, BUILD_DIR_NAME)
+    os.makedirs(out_dir, exist_ok=True)
+    for name in os.listdir(out_dir):
+        os.remove(os.path.join(out_dir, name))
+
+    assets = {}
+    for name in sorted(os.listdir(ui_dir)):
+        path = os.path.join(ui_dir, name)
+        if name in SKIPPED_FILES or not os.path.isfile(path):
+            continue
+        with open(path, "rb") as f:
+            body = f.read()
+        stem, ext = os.path.splitext(name)
+        hashed = f"{stem}.{hashlib.sha256(body).hexdigest()[:12]}{ext}"
+        _write_variants(out_dir, hashed, body)
+        assets[name] = hashed
+
+    with open(os.path.join(ui_dir, "index.html"), encoding="utf-8") as f:
+        html = f.read()
+
+    def fingerprint(match):
+        hashed = assets.get(match.group(2))
+        if hashed is None:
+            return match.group(0)
+        return f'{match.group(1)}="{ASSET_PREFIX}{hashed}"'
+
+    html = re.sub(r'\b(src|href)="([^"]+)"', fingerprint, html)
+    html = html.replace("</head>", '    <meta name="api-url" content="">\n</head>', 1)
+    _write_variants(out_dir, "index.html", html.encode("utf-8"))
+
+    manifest = {"index": "index.html", "assets": assets}
+    with open(os.path.join(out_dir, MANIFEST_NAME), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+def _is_stale(ui_dir: str) -> bool:
+    manifest_path = os.path.join(ui_dir, BUILD_DIR_NAME, MANIFEST_NAME)
+    if not os.path.exists(manifest_path):
+        return True
+    built_at = os.path.getmtime(manifest_path)
+    return any(
+        os.path.getmtime(os.path.join(ui_dir, name)) > built_at
+        for name in os.listdir(ui_dir)
+        if os.path.isfile(os.path.join(ui_dir, name))
+    )
+
+def _read(path: str) -> Optional[bytes]:
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        return f.read()
+
+def _load_asset(out_dir: str, name: str, cache_control: str) -> Asset:
+    path = os.path.join(out_dir, name)
+    body = _read(path)
+    # Response adds "; charset=utf-8" to text/* types itself
+    content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+    return Asset(
+        body=body,
+        gzip=_read(path + ".gz"),
+        br=_read(path + ".br"),
+        content_type=content_type,
+        etag=f'"{hashlib.sha256(body).hexdigest()[:16]}"',
+        cache_control=cache_control
+    )
+
+def load(ui_dir: str = UI_DIR) -> int:
+    """Load the built UI into memory, building it first if the sources are
+    newer than the build. Returns the number of paths served."""
+    _assets.clear()
+    if not ui_dir or not os.path.isfile(os.path.join(ui_dir, "index.html")):
+        return 0
+    if _is_stale(ui_dir):
+        build(ui_dir)
+
+    out_dir = os.path.join(ui_dir, BUILD_DIR_NAME)
+    with open(os.path.join(out_dir, MANIFEST_NAME)) as f:
+        manifest = json.load(f)
+    index = _load_asset(out_dir, manifest["index"], INDEX_CACHE_CONTROL)
+    _assets["/"] = _assets["/index.html"] = index
+    for hashed in manifest["assets"].values():
+        _assets[ASSET_PREFIX + hashed] = _load_asset(out_dir, hashed, IMMUTABLE_CACHE_CONTROL)
+    return len(_assets)
+
+def _accepted_encodings(accept_encoding: str) -> set:
+    accepted = set()
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        if params.replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(name.strip().lower())
+    return accepted
+
+def respond(path: str, accept_encoding: str, if_none_match: Optional[str]) -> Optional[Response]:
+    """The asset for ``path`` in the best encoding the client accepts, or
+    None when there is no such asset."""
+    asset = _assets.get(path)
+    if asset is None:
+        return None
+    stats["requests"] += 1
+    headers = {
+        "Cache-Control": asset.cache_control,
+        "ETag": asset.etag,
+        "Vary": "Accept-Encoding",
+    }
+    if if_none_match and asset.etag in [tag.strip() for tag in if_none_match.split(",")]:
+        stats["not_modified"] += 1
+        return Response(status_code=304, headers=headers)
+
+    accepted = _accepted_encodings(accept_encoding or "")
+    body = asset.body
+    if asset.br is not None and "br" in accepted:
+        body = asset.br
+        headers["Content-Encoding"] = "br"
+    elif asset.gzip is not None and "gzip" in accepted:
+        body = asset.gzip
+        headers["Content-Encoding"] = "gzip"
+    stats[headers.get("Content-Encoding", "identity")] += 1
+    return Response(content=body, media_type=asset.content_type, headers=headers)
+
+def summary() -> dict:
+    return {
+        "ui_dir": UI_DIR or None,
+        "paths": len(_assets),
+        # "/" and "/index.html" share one asset
+        "bytes": sum(len(asset.body) for asset in set(_assets.values())),
+        "brotli_available": brotli is not None,
+        **stats,
+    }
+
+if __name__ == "__main__":
+    # python -m app.services.static_ui [UI_DIR ...]
+    for directory in sys.argv[1:] or [UI_DIR]:
+        built = build(directory)
+        print(f"{directory}: {len(built['assets'])} assets -> {os.path.join(directory, BUILD_DIR_NAME)}")
@@ -0,0 +1,109 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from app.models import models
+from app.services.sites import PerSite
+from app.config import int_env
+from bisect import bisect_left, insort
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import time
+
+# Full reload interval. Users registered through this process are added
+# immediately; the reload picks up registrations on other workers and
+# deactivated accounts.
+REFRESH_SECONDS = int_env("USER_INDEX_REFRESH_SECONDS", 300)
+
+stats = {
+    "searches": 0,
+    "reloads": 0,
+}
+
+class UserIndex:
+    """In-memory prefix index over active users' SAP IDs and emails for
+    player autocomplete.
+
+    SAP IDs and emails are kept, lower-cased, in two sorted lists of
+    ``(key, user_id)`` tuples. The matches for a prefix are a contiguous run
+    starting at ``bisect_left(keys, (prefix,))``, so a search costs one bisect
+    per list plus one step per result.
+    """
+
+    def __init__(self):
+        self._users: Dict[int, Tuple[str, str]] = {}
+        self._sap_ids: List[Tuple[str, int]] = []
+        self._emails: List[Tuple[str, int]] = []
+        self._loaded_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+
+    def invalidate(self):
+        self._loaded_at = None
+
+    def _is_stale(self) -> bool:
+        return self._loaded_at is None or time.monotonic() - self._loaded_at > REFRESH_SECONDS
+
+    async def ensure_loaded(self, db: AsyncSession):
+        if not self._is_stale():
+            return
+        async with self._lock:
+            if not self._is_stale():
+                return
+            result = await db.execute(
+                select(models.User.id, models.User.sap_id, models.User.email)
+                .where(models.User.is_active == True)
+            )
+            users = {user_id: (sap_id, email) for user_id, sap_id, email in result.all()}
+            self._users = users
+            self._sap_ids = sorted((sap_id.lower(), user_id) for user_id, (sap_id, _) in users.items() if sap_id)
+            self._emails = sorted((email.lower(), user_id) for user_id, (_, email) in users.items() if email)
+            self._loaded_at = time.monotonic()
+            stats["reloads"] += 1
+
+    def add_user(self, user: models.User):
+        """Index a newly registered user without waiting for the next reload."""
+        if self._loaded_at is None or user.id in self._users:
+            return
+        self._users[user.id] = (user.sap_id, user.email)
+        if user.sap_id:
+            insort(self._sap_ids, (user.sap_id.lower(), user.id))
+        if user.email:
+            insort(self._emails, (user.email.lower(), user.id))
+
+    @staticmethod
+    def _prefixed(keys: List[Tuple[str, int]], prefix: str):
+        i = bisect_left(keys, (prefix,))
+        while i < len(keys) and keys[i][0].startswith(prefix):
+            yield keys[i][1]
+            i += 1
+
+    def search(self, query: str, limit: int = 10) -> List[dict]:
+        """Users whose SAP ID or email starts with ``query``, ignoring case.
+        SAP ID matches come first, each group in alphabetical order."""
+        stats["searches"] += 1
+        prefix = query.strip().lower()
+        if not prefix:
+            return []
+        results = []
+        seen = set()
+        for keys in (self._sap_ids, self._emails):
+            for user_id in self._prefixed(keys, prefix):
+                if user_id in seen:
+                    continue
+                seen.add(user_id)
+                sap_id, email = self._users[user_id]
+                results.append({"sap_id": sap_id, "email": email})
+                if len(results) >= limit:
+                    return results
+        return results
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+# One index per site, each loaded from that site's database
+user_index = PerSite(UserIndex)
+
+def summary() -> dict:
+    return {
+        "users": len(user_index),
+        "refresh_seconds": REFRESH_SECONDS,
+        **stats,
+    }
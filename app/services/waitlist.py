@@ -0,0 +1,186 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, insert, and_, func
+from app.models import models
+from app.services import participants, booking_rules, game_catalog
+from collections import deque
+from datetime import datetime, timedelta
+from typing import List
+import time
+
+# Counters reported by GET /admin/waitlist/stats. Latency samples are kept in
+# bounded deques so a long-running process does not grow them forever.
+stats = {
+    "batches": 0,
+    "slots_offered": 0,
+    "promotions": 0,
+    "skipped": 0,
+}
+queue_wait_seconds = deque(maxlen=1000)
+batch_duration_ms = deque(maxlen=1000)
+
+async def _skip(db: AsyncSession, entry: models.WaitlistEntry, reason: str, now: datetime):
+    await db.execute(
+        update(models.WaitlistEntry)
+        .where(models.WaitlistEntry.id == entry.id)
+        .values(status=models.WaitlistStatus.SKIPPED, skip_reason=reason, updated_at=now)
+    )
+    stats["skipped"] += 1
+
+async def _check_eligible(db: AsyncSession, entry, slot, game_type: str, max_players: int):
+    """Return the player ids for the entry, or a reason why it cannot be promoted."""
+    if await booking_rules.count_bookings_today(db, entry.user_id, game_type) >= booking_rules.DAILY_GAME_LIMIT:
+        return None, "Daily booking limit reached"
+
+    sap_ids = participants.parse_sap_ids(entry.other_players)
+    if len(sap_ids) > max_players - 1:
+        return None, f"Maximum {max_players} players allowed for this game"
+
+    players_by_sap_id = await participants.resolve_sap_ids(db, sap_ids)
+    if len(players_by_sap_id) != len(sap_ids):
+        return None, "One or more player SAP IDs are invalid"
+
+    player_ids = [entry.user_id] + list(players_by_sap_id.values())
+    if await participants.find_conflicting_players(db, player_ids, slot.start_time, slot.end_time):
+        return None, "One or more players already have a booking at this time"
+    return player_ids, None
+
+async def promote(db: AsyncSession, slot_ids: List[int], now: datetime = None) -> List[dict]:
+    """Give each freed slot to the first eligible user waiting for it.
+
+    All slots are processed as one batch in the caller's transaction: the
+    slots and their queues are loaded with one query each, waiters that no
+    longer qualify are marked skipped, and the slot is claimed with a guarded
+    update so a concurrent direct booking cannot be overwritten. Returns one
+    dict per promotion so callers can notify the users.
+    """
+    if not slot_ids:
+        return []
+    started = time.perf_counter()
+    now = now or datetime.utcnow()
+
+    # Only slots that are still free and can still be checked into
+    slots_query = (
+        select(models.Slot)
+        .where(
+            and_(
+                models.Slot.id.in_(slot_ids),
+                models.Slot.is_available == True,
+                models.Slot.is_cancelled == False,
+                models.Slot.start_time > now - timedelta(minutes=5)
+            )
+        )
+    )
+    result = await db.execute(slots_query)
+    catalog = await game_catalog.current(db)
+    slots = []
+    for slot in result.scalars().all():
+        game = catalog.get(slot.game_id)
+        if game and game.status == models.GameStatus.ACTIVE:
+            slots.append((slot, game.type, game.max_players))
+    if not slots:
+        return []
+
+    queue_query = (
+        select(models.WaitlistEntry, models.User.email)
+        .join(models.User, models.WaitlistEntry.user_id == models.User.id)
+        .where(
+            and_(
+                models.WaitlistEntry.slot_id.in_([slot.id for slot, _, _ in slots]),
+                models.WaitlistEntry.status == models.WaitlistStatus.WAITING
+            )
+        )
+        .order_by(models.WaitlistEntry.slot_id, models.WaitlistEntry.id)
+    )
+    result = await db.execute(queue_query)
+    queues = {}
+    for entry, email in result.all():
+        queues.setdefault(entry.slot_id, []).append((entry, email))
+
+    promoted = []
+    for slot, game_type, max_players in slots:
+        for entry, email in queues.get(slot.id, []):
+            player_ids, reason = await _check_eligible(db, entry, slot, game_type, max_players)
+            if reason:
+                await _skip(db, entry, reason, now)
+                continue
+
+            claim = await db.execute(
+                update(models.Slot)
+                .where(
+                    and_(
+                        models.Slot.id == slot.id,
+                        models.Slot.is_available == True,
+                        models.Slot.is_cancelled == False
+                    )
+                )
+                .values(is_available=False, updated_at=now)
+            )
+            if claim.rowcount == 0:
+                break
+
+            result = await db.execute(
+                insert(models.Booking).values(
+                    user_id=entry.user_id,
+                    slot_id=slot.id,
+                    game_id=slot.game_id,
+                    slot_start_time=slot.start_time,
+                    other_players=entry.other_players,
+                    status='pending',
+                    created_at=now,
+                    updated_at=now
+                ).returning(models.Booking.id)
+            )
+            booking_id = result.scalar_one()
+            await participants.add_participants(db, booking_id, player_ids)
+            await db.execute(
+                update(models.WaitlistEntry)
+                .where(models.WaitlistEntry.id == entry.id)
+                .values(
+                    status=models.WaitlistStatus.PROMOTED,
+                    booking_id=booking_id,
+                    promoted_at=now,
+                    updated_at=now
+                )
+            )
+
+            stats["promotions"] += 1
+            queue_wait_seconds.append((now - entry.created_at).total_seconds())
+            promoted.append({
+                "slot_id": slot.id,
+                "booking_id": booking_id,
+                "user_id": entry.user_id,
+                "email": email,
+                "start_time": slot.start_time
+            })
+            break
+
+    stats["batches"] += 1
+    stats["slots_offered"] += len(slots)
+    batch_duration_ms.append((time.perf_counter() - started) * 1000)
+    return promoted
+
+async def queue_lengths(db: AsyncSession) -> dict:
+    query = (
+        select(models.WaitlistEntry.slot_id, func.count())
+        .where(models.WaitlistEntry.status == models.WaitlistStatus.WAITING)
+        .group_by(models.WaitlistEntry.slot_id)
+    )
+    result = await db.execute(query)
+    return dict(result.all())
+
+def _summary(samples) -> dict:
+    if not samples:
+        return {"count": 0, "avg": None, "p95": None, "max": None}
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "avg": round(sum(ordered) / len(ordered), 3),
+        "p95": round(ordered[int(0.95 * (len(ordered) - 1))], 3),
+        "max": round(ordered[-1], 3)
+    }
+
+def latency_summary() -> dict:
+    return {
+        "queue_wait_seconds": _summary(queue_wait_seconds),
+        "batch_duration_ms": _summary(batch_duration_ms)
+    }
@@ -0,0 +1,33 @@
+import asyncio
+
+import pytest
+
+from app import database
+from app.database import Base, DEFAULT_SITE
+from app.services import game_catalog, slot_index, user_index
+
+@pytest.fixture
+def shard(tmp_path):
+    """A scratch database with the schema, standing in for the default
+    site's. In-memory per-site state is reset around each test."""
+    scratch = database.open_shard(DEFAULT_SITE, f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+    original = database.shards[DEFAULT_SITE]
+    database.shards[DEFAULT_SITE] = scratch
+
+    def reset():
+        game_catalog._catalogs.clear()
+        slot_index.slot_index._instances.clear()
+        user_index.user_index._instances.clear()
+
+    async def create():
+        async with scratch.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    reset()
+    asyncio.run(create())
+    try:
+        yield scratch
+    finally:
+        database.shards[DEFAULT_SITE] = original
+        reset()
+        asyncio.run(scratch.engine.dispose())
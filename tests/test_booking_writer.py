@@ -0,0 +1,71 @@
+from datetime import datetime, timedelta
+import asyncio
+
+import httpx
+from sqlalchemy import func, select
+
+from app.auth.auth_handler import create_access_token
+from app.database import DEFAULT_SITE
+from app.main import app
+from app.models import models
+from app.services import booking_writer
+from app.services.sites import start_per_site
+
+PLAYERS = 8
+
+def test_concurrent_bookings_of_one_slot_through_the_writer(shard, monkeypatch):
+    monkeypatch.setattr(booking_writer, "enabled", True)
+    monkeypatch.setattr(booking_writer, "stats", dict.fromkeys(booking_writer.stats, 0))
+    monkeypatch.setattr(booking_writer, "_last_batch_sizes", {})
+    start = datetime.combine(datetime.utcnow().date() + timedelta(days=1), datetime.min.time()) + timedelta(hours=10)
+
+    async def main():
+        async with shard.session() as db:
+            game = models.Game(name="Chess", type=models.GameType.CHESS, max_players=2, site=DEFAULT_SITE)
+            db.add(game)
+            db.add_all(models.User(email=f"player{number}@example.com", sap_id=f"P{number}")
+                       for number in range(PLAYERS))
+            await db.flush()
+            slot = models.Slot(game_id=game.id, start_time=start, end_time=start + timedelta(minutes=30))
+            db.add(slot)
+            await db.commit()
+            slot_id = slot.id
+
+        writers = start_per_site(booking_writer.run)
+        await asyncio.sleep(0)
+        transport = httpx.ASGITransport(app=app)
+        try:
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                async def book(number: int) -> httpx.Response:
+                    token = create_access_token({"sub": f"player{number}@example.com", "site": DEFAULT_SITE})
+                    return await client.post(
+                        "/bookings/", json={"slot_id": slot_id, "other_players": ""},
+                        headers={"Authorization": f"Bearer {token}"}
+                    )
+                responses = await asyncio.gather(*(book(number) for number in range(PLAYERS)))
+        finally:
+            for writer in writers:
+                writer.cancel()
+            await asyncio.gather(*writers, return_exceptions=True)
+
+        async with shard.session() as db:
+            bookings = (await db.execute(select(models.Booking))).scalars().all()
+            participant_count = (await db.execute(select(func.count()).select_from(models.BookingParticipant))).scalar()
+            slot = await db.get(models.Slot, slot_id)
+        return responses, bookings, participant_count, slot
+
+    responses, bookings, participant_count, slot = asyncio.run(main())
+    codes = sorted(response.status_code for response in responses)
+    assert codes == [200] + [400] * (PLAYERS - 1)
+    assert all(
+        response.json()["detail"] == "Slot is not available"
+        for response in responses if response.status_code == 400
+    )
+    winner = next(response.json() for response in responses if response.status_code == 200)
+    assert len(bookings) == 1 and bookings[0].id == winner["id"]
+    assert participant_count == 1
+    assert slot.is_available is False
+    # The requests really went through the writer, several to a transaction
+    assert booking_writer.stats["direct"] == 0
+    assert booking_writer.stats["items"] == PLAYERS
+    assert booking_writer.stats["largest_batch"] > 1
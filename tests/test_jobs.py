@@ -0,0 +1,38 @@
+from datetime import datetime, time, timedelta
+import asyncio
+import json
+
+from app.models import models
+from app.services import jobs
+
+def test_cancel_slots_counts_each_slot_once(shard):
+    async def main():
+        day = datetime.combine(datetime.utcnow().date(), time()) + timedelta(days=1)
+        async with shard.session() as db:
+            game = models.Game(name="Chess", type=models.GameType.CHESS, max_players=2)
+            db.add(game)
+            await db.flush()
+            # Six template slots, 09:00-12:00, and one stored slot after them
+            db.add(models.ScheduleTemplate(
+                game_id=game.id, weekdays="0,1,2,3,4,5,6",
+                open_time=time(9), close_time=time(12), slot_minutes=30
+            ))
+            db.add(models.Slot(
+                game_id=game.id, start_time=day + timedelta(hours=13),
+                end_time=day + timedelta(hours=14), is_available=True
+            ))
+            job = await jobs.submit(
+                db, jobs.CANCEL_SLOTS,
+                {"game_id": game.id, "date": day.isoformat(), "reason": "Closed"},
+                total=1, created_by="admin@example.com"
+            )
+            while not await jobs.run_chunk(db, job.id):
+                pass
+            await db.refresh(job)
+            return job
+
+    job = asyncio.run(main())
+    assert job.status == models.JobStatus.COMPLETED
+    counts = json.loads(job.counts)
+    assert counts["template_slots_cancelled"] == 6
+    assert counts["slots_cancelled"] == 1
@@ -0,0 +1,49 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.auth import login_throttle
+from app.auth.auth_handler import get_password_hash
+from app.main import app
+from app.models import models
+
+@pytest.fixture
+def client(shard):
+    """The app on a scratch database with one user, and no failed logins
+    remembered from other tests."""
+    async def seed():
+        async with shard.session() as db:
+            db.add(models.User(
+                email="player@example.com", sap_id="S100200",
+                hashed_password=get_password_hash("correct-password")
+            ))
+            await db.commit()
+
+    asyncio.run(seed())
+    login_throttle.accounts._failures.clear()
+    login_throttle.client_ips._failures.clear()
+    yield TestClient(app)
+    login_throttle.accounts._failures.clear()
+    login_throttle.client_ips._failures.clear()
+
+def _login(client, username, password):
+    return client.post("/users/login", json={"username": username, "password": password})
+
+def test_email_and_sap_id_share_one_window(client):
+    names = ["player@example.com", "S100200"]
+    for attempt in range(login_throttle.ACCOUNT_FREE_ATTEMPTS):
+        assert _login(client, names[attempt % 2], "wrong-password").status_code == 401
+    # Alternating the names does not buy extra attempts
+    for name in names:
+        response = _login(client, name, "correct-password")
+        assert response.status_code == 429
+        assert int(response.headers["Retry-After"]) >= 1
+
+def test_success_clears_the_window_for_both_names(client):
+    for _ in range(login_throttle.ACCOUNT_FREE_ATTEMPTS - 1):
+        assert _login(client, "S100200", "wrong-password").status_code == 401
+    assert _login(client, "player@example.com", "correct-password").status_code == 200
+    for _ in range(login_throttle.ACCOUNT_FREE_ATTEMPTS - 1):
+        assert _login(client, "S100200", "wrong-password").status_code == 401
+    assert _login(client, "S100200", "correct-password").status_code == 200
@@ -0,0 +1,51 @@
+from datetime import datetime, time, timedelta
+import asyncio
+
+import pytest
+
+from app.models import models
+from app.services import schedule
+
+def _run(shard, check):
+    """Seed a game open 09:00-12:00 every day by template, then run
+    ``check(db, game)``."""
+    async def main():
+        async with shard.session() as db:
+            game = models.Game(name="Chess", type=models.GameType.CHESS, max_players=2)
+            db.add(game)
+            await db.flush()
+            db.add(models.ScheduleTemplate(
+                game_id=game.id, weekdays="0,1,2,3,4,5,6",
+                open_time=time(9), close_time=time(12), slot_minutes=30
+            ))
+            await db.commit()
+            await check(db, game)
+    asyncio.run(main())
+
+def test_past_days_have_no_virtual_slots(shard):
+    async def check(db, game):
+        today = datetime.combine(datetime.utcnow().date(), time())
+        past = await schedule.slots_between(db, [game], today - timedelta(days=40), today - timedelta(days=39))
+        assert past == []
+        future = await schedule.slots_between(db, [game], today + timedelta(days=1), today + timedelta(days=2))
+        assert len(future) == 6
+        assert all(isinstance(slot, schedule.VirtualSlot) for slot in future)
+    _run(shard, check)
+
+def test_materialize_rejects_past_virtual_id(shard):
+    async def check(db, game):
+        day = datetime.combine(datetime.utcnow().date(), time())
+        past_id = schedule.virtual_slot_id(game.id, day - timedelta(days=40) + timedelta(hours=9))
+        assert await schedule.materialize(db, past_id) is None
+        future_id = schedule.virtual_slot_id(game.id, day + timedelta(days=1, hours=9))
+        slot_id = await schedule.materialize(db, future_id)
+        assert slot_id is not None and slot_id > 0
+    _run(shard, check)
+
+@pytest.mark.parametrize("hour,minute,listed", [
+    (8, 30, False), (9, 0, True), (9, 30, True), (19, 30, True), (20, 0, True), (20, 30, False),
+])
+def test_within_booking_hours(hour, minute, listed):
+    start = datetime(2030, 1, 7, hour, minute)
+    slot = models.Slot(game_id=1, start_time=start, end_time=start + timedelta(minutes=30))
+    assert schedule.within_booking_hours(slot) is listed
@@ -0,0 +1,49 @@
+from datetime import datetime, timedelta
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.database import DEFAULT_SITE
+from app.main import app
+from app.models import models
+
+@pytest.fixture
+def client(shard):
+    """The app on a scratch database holding one free slot tomorrow 09:00-09:30 UTC.
+    Startup events are not run, so no background tasks start."""
+    start = datetime.combine(datetime.utcnow().date() + timedelta(days=1), datetime.min.time()) + timedelta(hours=9)
+
+    async def seed():
+        async with shard.session() as db:
+            game = models.Game(name="Chess", type=models.GameType.CHESS, max_players=2, site=DEFAULT_SITE)
+            db.add(game)
+            await db.flush()
+            db.add(models.Slot(game_id=game.id, start_time=start, end_time=start + timedelta(minutes=30)))
+            await db.commit()
+
+    asyncio.run(seed())
+    return TestClient(app), start
+
+@pytest.mark.parametrize("suffix,offset", [("", timedelta(0)), ("Z", timedelta(0)), ("+02:00", timedelta(hours=2))])
+def test_search_accepts_naive_and_aware_times(client, suffix, offset):
+    test_client, slot_start = client
+    window_start = slot_start - timedelta(hours=1) + offset
+    params = {
+        "start": window_start.isoformat() + suffix,
+        "end": (window_start + timedelta(hours=3)).isoformat() + suffix,
+    }
+    response = test_client.get("/slots/search", params=params)
+    assert response.status_code == 200
+    results = response.json()
+    assert [result["start_time"] for result in results] == [slot_start.isoformat()]
+
+def test_search_rejects_end_before_start_across_offsets(client):
+    test_client, slot_start = client
+    # 10:00+02:00 is 08:00 UTC, before the 09:00 UTC start
+    params = {
+        "start": slot_start.isoformat() + "Z",
+        "end": (slot_start + timedelta(hours=1)).isoformat() + "+02:00",
+    }
+    response = test_client.get("/slots/search", params=params)
+    assert response.status_code == 400
@@ -0,0 +1,61 @@
+from datetime import datetime, timedelta
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.auth.auth_handler import create_access_token
+from app.database import DEFAULT_SITE
+from app.main import app
+from app.models import models
+
+EMAILS = ["owner@example.com", "partner@example.com", "other@example.com"]
+
+@pytest.fixture
+def client(shard):
+    """The app on a scratch database with a slot tomorrow booked by the
+    owner together with the partner. Returns the client and the slot id."""
+    start = datetime.combine(datetime.utcnow().date() + timedelta(days=1), datetime.min.time()) + timedelta(hours=10)
+
+    async def seed():
+        async with shard.session() as db:
+            users = [models.User(email=email, sap_id=f"S{number}") for number, email in enumerate(EMAILS)]
+            game = models.Game(name="Chess", type=models.GameType.CHESS, max_players=2, site=DEFAULT_SITE)
+            db.add_all(users + [game])
+            await db.flush()
+            slot = models.Slot(game_id=game.id, start_time=start, end_time=start + timedelta(minutes=30),
+                               is_available=False, is_cancelled=False)
+            db.add(slot)
+            await db.flush()
+            booking = models.Booking(user_id=users[0].id, slot_id=slot.id, game_id=game.id,
+                                     slot_start_time=start, status="confirmed", other_players="S1")
+            db.add(booking)
+            await db.flush()
+            db.add_all([
+                models.BookingParticipant(booking_id=booking.id, user_id=users[0].id),
+                models.BookingParticipant(booking_id=booking.id, user_id=users[1].id),
+            ])
+            await db.commit()
+            return slot.id
+
+    slot_id = asyncio.run(seed())
+    return TestClient(app), slot_id
+
+def _join(test_client, slot_id, email):
+    token = create_access_token(data={"sub": email, "site": DEFAULT_SITE})
+    return test_client.post(
+        f"/slots/{slot_id}/waitlist", json={}, headers={"Authorization": f"Bearer {token}"}
+    )
+
+@pytest.mark.parametrize("email", EMAILS[:2])
+def test_players_of_the_booking_cannot_join_its_waitlist(client, email):
+    test_client, slot_id = client
+    response = _join(test_client, slot_id, email)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "You already hold a booking for this slot"
+
+def test_others_can_join_the_waitlist(client):
+    test_client, slot_id = client
+    response = _join(test_client, slot_id, EMAILS[2])
+    assert response.status_code == 200
+    assert response.json()["slot_id"] == slot_id
@@ -1,10 +1,57 @@
 // API Configuration
-const API_URL = 'http://localhost:8001';
-let authToken = localStorage.getItem('authToken');
+// The API's own build of this UI adds an empty api-url meta tag, so calls go
+// to the same origin and need no CORS preflight; standalone it uses port 8001.
+// Opened under /sites/<site>/, the UI talks to that site's API and keeps its
+// tokens apart from other sites'.
+const apiUrlMeta = document.querySelector('meta[name="api-url"]');
+const sitePrefix = (window.location.pathname.match(/^\/sites\/[a-z0-9_-]+/) || [''])[0];
+const API_URL = (apiUrlMeta ? apiUrlMeta.content : 'http://localhost:8001') + sitePrefix;
+let authToken = localStorage.getItem(`authToken${sitePrefix}`);
+let refreshToken = localStorage.getItem(`refreshToken${sitePrefix}`);
 let isAdmin = false;
 
+function storeTokens(response) {
+    authToken = response.access_token;
+    refreshToken = response.refresh_token;
+    localStorage.setItem(`authToken${sitePrefix}`, authToken);
+    localStorage.setItem(`refreshToken${sitePrefix}`, refreshToken);
+}
+
+function clearTokens() {
+    localStorage.removeItem(`authToken${sitePrefix}`);
+    localStorage.removeItem(`refreshToken${sitePrefix}`);
+    authToken = null;
+    refreshToken = null;
+}
+
+// Concurrent 401s share one refresh; a refresh token only works once
+let refreshInFlight = null;
+
+async function refreshAccessToken() {
+    if (!refreshToken) {
+        return false;
+    }
+    if (!refreshInFlight) {
+        refreshInFlight = fetch(`${API_URL}/users/token/refresh`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ refresh_token: refreshToken }),
+        })
+            .then(async response => {
+                if (!response.ok) {
+                    return false;
+                }
+                storeTokens(await response.json());
+                return true;
+            })
+            .catch(() => false)
+            .finally(() => { refreshInFlight = null; });
+    }
+    return await refreshInFlight;
+}
+
 // API Helper Functions
-async function apiRequest(endpoint, options = {}) {
+async function apiRequest(endpoint, options = {}, retried = false) {
     const defaultHeaders = {
         'Content-Type': 'application/json',
     };
@@ -22,12 +69,16 @@ async function apiRequest(endpoint, options = {}) {
             },
         });
 
+        // Expired access token: get a new one without logging in again
+        if (response.status === 401 && !retried && endpoint !== '/users/login' && await refreshAccessToken()) {
+            return await apiRequest(endpoint, options, true);
+        }
+
         if (!response.ok) {
             const errorData = await response.json();
             // Check for token expiration
             if (response.status === 401) {
-                localStorage.removeItem('authToken');
-                authToken = null;
+                clearTokens();
                 location.reload();
             }
             throw new Error(errorData.detail || 'Something went wrong');
@@ -35,7 +86,11 @@ async function apiRequest(endpoint, options = {}) {
 
         return await response.json();
     } catch (error) {
-        showError(error.message);
+        // A retried request has already reported its own error
+        if (!error.reported) {
+            showError(error.message);
+            error.reported = true;
+        }
         throw error;
     }
 }
@@ -46,8 +101,7 @@ async function login(username, password) {
         method: 'POST',
         body: JSON.stringify({ username, password }),
     });
-    authToken = response.access_token;
-    localStorage.setItem('authToken', authToken);
+    storeTokens(response);
     return response;
 }
 
@@ -67,6 +121,29 @@ async function getGameSlots(gameId, date) {
     return await apiRequest(`/games/${gameId}/slots?date=${date}`);
 }
 
+// Profile, games, the day's slots for all active games and the next
+// upcoming bookings in one call. `date` defaults to today on the server.
+async function getBootstrap(date, bookingsLimit = 5) {
+    const params = new URLSearchParams({ bookings_limit: bookingsLimit });
+    if (date) params.set('date', date);
+    return await apiRequest(`/bootstrap/?${params.toString()}`);
+}
+
+// Availability for several games and days in one call. Each day has
+// `slots`/`free` bitmasks over 30 minute cells starting at `day_start`
+// and `slot_ids` with the slot id of each cell (null when there is none).
+async function getAvailabilityGrid(fromDate, toDate, gameIds = []) {
+    const params = new URLSearchParams({ from: fromDate, to: toDate });
+    gameIds.forEach(id => params.append('game_ids', id));
+    return await apiRequest(`/grid/?${params.toString()}`);
+}
+
+// Player autocomplete: active users whose SAP ID or email starts with `query`
+async function searchUsers(query, limit = 8) {
+    const params = new URLSearchParams({ q: query, limit });
+    return await apiRequest(`/users/search?${params.toString()}`);
+}
+
 // Booking API Calls
 async function createBooking(slotId, otherPlayers) {
     return await apiRequest('/bookings', {
@@ -1,11 +1,14 @@
 // UI State Management
 let currentUser = null;
 let selectedSlot = null;
+// Slots from the bootstrap response, used once for the first slot list
+let bootstrapSlots = null;
 
 // Initialize Application
 document.addEventListener('DOMContentLoaded', () => {
     setupDateInputs();
     setupMessageSystem();
+    setupPlayerAutocomplete();
     checkAuthStatus();
 });
 
@@ -39,7 +42,7 @@ function setupMessageSystem() {
 function checkAuthStatus() {
     if (authToken) {
         showMainContent();
-        loadUserData();
+        loadDashboard();
     } else {
         showLoginForm();
     }
@@ -67,7 +70,7 @@ async function handleLogin(event) {
             document.getElementById('loginPassword').value
         );
         showMainContent();
-        loadUserData();
+        loadDashboard();
     } catch (error) {
         showError('Login failed: ' + error.message);
     }
@@ -89,8 +92,14 @@ async function handleRegister(event) {
 }
 
 function logout() {
-    localStorage.removeItem('authToken');
-    authToken = null;
+    if (refreshToken) {
+        fetch(`${API_URL}/users/logout`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ refresh_token: refreshToken }),
+        }).catch(() => {});
+    }
+    clearTokens();
     currentUser = null;
     showLoginForm();
 }
@@ -130,62 +139,93 @@ function showMainContent() {
 
         viewSlotsBtn.addEventListener('click', loadSlots);
     }
-    
-    loadGames();
-    loadBookingHistory();
 }
 
-async function loadUserData() {
+// One request for everything the dashboard shows on load
+async function loadDashboard() {
+    const dateSelect = document.getElementById('dateSelect');
     try {
-        const user = await apiRequest('/users/me');
-        currentUser = user;
-        if (user.role === 'admin') {
+        const data = await getBootstrap(dateSelect?.value ? await formatDateForAPI(dateSelect.value) : '');
+        currentUser = data.user;
+        renderGames(data.games);
+        if (currentUser.role === 'admin') {
             document.getElementById('adminPanel').style.display = 'block';
-            loadAdminData();
+            loadAdminGames();
+        }
+
+        bootstrapSlots = {
+            date: data.date,
+            gameIds: new Set(data.games.filter(game => game.status === 'active').map(game => game.id)),
+            slots: data.slots,
+        };
+        if (dateSelect && !dateSelect.value && data.slots.length > 0) {
+            dateSelect.value = data.date;
+        }
+
+        displayBookingHistory(data.upcoming_bookings);
+        const bookingsList = document.getElementById('bookingsList');
+        if (bookingsList) {
+            const fullHistoryBtn = document.createElement('button');
+            fullHistoryBtn.textContent = 'Show full history';
+            fullHistoryBtn.addEventListener('click', loadBookingHistory);
+            bookingsList.appendChild(fullHistoryBtn);
         }
     } catch (error) {
-        console.error('Failed to load user data:', error);
+        console.error('Failed to load dashboard:', error);
     }
 }
 
+// Slots of the bootstrap day for an active game, at most once
+function takeBootstrapSlots(gameId, date) {
+    const cached = bootstrapSlots;
+    bootstrapSlots = null;
+    if (!cached || cached.date !== date || !cached.gameIds.has(Number(gameId))) {
+        return null;
+    }
+    return cached.slots.filter(slot => slot.game_id === Number(gameId));
+}
+
 async function loadGames() {
     try {
-        const games = await getGames();
-        const gameSelect = document.getElementById('gameSelect');
-        const adminGameSelect = document.getElementById('adminGameSelect');
-        
-        // Clear and initialize game selects
-        gameSelect.innerHTML = '<option value="">Select Game</option>';
-        if (adminGameSelect) {  // Admin select might not exist for regular users
-            adminGameSelect.innerHTML = '<option value="">Select Game</option>';
-        }
-        
-        const activeGames = games.filter(game => 
-            game.status === 'active' || currentUser?.role === 'admin'
-        );
-
-        if (activeGames.length === 0) {
-            showMessage('No games are currently available', 'info');
-            return;
-        }
-        
-        // Add games to select elements
-        activeGames.forEach(game => {
-            const status = game.status === 'active' ? '' : ' (Inactive)';
-            const maxPlayers = game.max_players ? ` (Max: ${game.max_players})` : '';
-            const option = `<option value="${game.id}">${game.name} - ${game.type}${maxPlayers}${status}</option>`;
-            gameSelect.insertAdjacentHTML('beforeend', option);
-            if (adminGameSelect) {
-                adminGameSelect.insertAdjacentHTML('beforeend', option);
-            }
-        });
-
-        showSuccess(`Loaded ${activeGames.length} available games`);
+        renderGames(await getGames());
     } catch (error) {
         showError('Failed to load games: ' + error.message);
     }
 }
 
+function renderGames(games) {
+    const gameSelect = document.getElementById('gameSelect');
+    const adminGameSelect = document.getElementById('adminGameSelect');
+    
+    // Clear and initialize game selects
+    gameSelect.innerHTML = '<option value="">Select Game</option>';
+    if (adminGameSelect) {  // Admin select might not exist for regular users
+        adminGameSelect.innerHTML = '<option value="">Select Game</option>';
+    }
+    
+    const activeGames = games.filter(game => 
+        game.status === 'active' || currentUser?.role === 'admin'
+    );
+
+    if (activeGames.length === 0) {
+        showMessage('No games are currently available', 'info');
+        return;
+    }
+    
+    // Add games to select elements
+    activeGames.forEach(game => {
+        const status = game.status === 'active' ? '' : ' (Inactive)';
+        const maxPlayers = game.max_players ? ` (Max: ${game.max_players})` : '';
+        const option = `<option value="${game.id}">${game.name} - ${game.type}${maxPlayers}${status}</option>`;
+        gameSelect.insertAdjacentHTML('beforeend', option);
+        if (adminGameSelect) {
+            adminGameSelect.insertAdjacentHTML('beforeend', option);
+        }
+    });
+
+    showSuccess(`Loaded ${activeGames.length} available games`);
+}
+
 async function loadSlots() {
     const gameId = document.getElementById('gameSelect').value;
     const date = document.getElementById('dateSelect').value;
@@ -199,7 +239,7 @@ async function loadSlots() {
     try {
         slotsContainer.innerHTML = '<div class="loading">Loading available slots...</div>';
         const formattedDate = await formatDateForAPI(date);
-        const slots = await getGameSlots(gameId, formattedDate);
+        const slots = takeBootstrapSlots(gameId, formattedDate) || await getGameSlots(gameId, formattedDate);
         displaySlots(slots, gameId, formattedDate);
     } catch (error) {
         let errorMessage = error.message;
@@ -357,6 +397,43 @@ function displayBookingHistory(bookings) {
     showMessage(`Showing ${bookings.length} bookings`, 'info');
 }
 
+// Suggest players for the SAP ID being typed after the last comma
+function setupPlayerAutocomplete() {
+    const input = document.getElementById('otherPlayersSapIds');
+    const suggestions = document.getElementById('playerSuggestions');
+    if (!input || !suggestions) return;
+
+    let timer = null;
+    input.addEventListener('input', () => {
+        clearTimeout(timer);
+        timer = setTimeout(async () => {
+            const value = input.value;
+            const parts = value.split(',');
+            const query = parts.pop().trim();
+            if (!query) {
+                suggestions.innerHTML = '';
+                return;
+            }
+            try {
+                const users = await searchUsers(query);
+                // Drop answers to a query the user has already typed past
+                if (input.value !== value) return;
+                const chosen = parts.map(part => part.trim()).filter(Boolean);
+                suggestions.innerHTML = '';
+                users.forEach(user => {
+                    if (!user.sap_id || chosen.includes(user.sap_id)) return;
+                    const option = document.createElement('option');
+                    option.value = [...chosen, user.sap_id].join(', ');
+                    option.label = user.email;
+                    suggestions.appendChild(option);
+                });
+            } catch (error) {
+                console.error('Player search failed:', error);
+            }
+        }, 150);
+    });
+}
+
 // Booking Modal Functions
 function showBookingModal(slotId) {
     selectedSlot = slotId;
@@ -385,11 +462,6 @@ async function confirmBooking() {
 }
 
 // Admin Functions
-async function loadAdminData() {
-    await loadGames();
-    loadAdminGames();
-}
-
 function showGameForm() {
     const form = document.getElementById('gameForm');
     if (!form) return;
@@ -1,5 +1,8 @@
 // API Configuration
-const API_URL = 'http://localhost:8001';
+// The API's own build of this UI adds an empty api-url meta tag, so calls go
+// to the same origin and need no CORS preflight; standalone it uses port 8001
+const apiUrlMeta = document.querySelector('meta[name="api-url"]');
+const API_URL = apiUrlMeta ? apiUrlMeta.content : 'http://localhost:8001';
 let authToken = localStorage.getItem('authToken');
 let isAdmin = false;
 
@@ -1,18 +1,33 @@
 import sys
 import os
+import argparse
+import bisect
+import json
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import Manager
 # ======================================================================
 # ADD THIS IMPORT FOR THE FIX
 from PyQt5.QtWidgets import QSizePolicy
 # ======================================================================
 from PyQt5.QtWidgets import (
-    QApplication, QMainWindow, QWidget, QVBoxLayout,
-    QPushButton, QLabel, QMessageBox, QStatusBar
+    QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
+    QPushButton, QLabel, QMessageBox, QStatusBar, QSlider,
+    QComboBox, QSpinBox, QProgressBar
 )
 from PyQt5.QtGui import QPixmap, QImage, QPainter, QPen, QIcon
 from PyQt5.QtCore import Qt, QPoint, QRect, QThread, pyqtSignal, QObject
 
 import cv2
 from moviepy.editor import VideoFileClip
+from moviepy.config import get_setting
+from proglog import ProgressBarLogger
 
 # ======================================================================
 # HARDCODED FILE PATHS
@@ -21,27 +36,457 @@ INPUT_VIDEO_PATH = "yt22.mp4"
 OUTPUT_VIDEO_PATH = "output.mp4"
 # ======================================================================
 
+# Preview frames are decoded, then downscaled so the longest edge is at most
+# PREVIEW_MAX_EDGE pixels. The cache of downscaled frames is capped in bytes,
+# so memory does not depend on the source resolution.
+PREVIEW_MAX_EDGE = 960
+PREVIEW_CACHE_BYTES = 64 * 1024 * 1024
 
-# --- Worker Thread for MoviePy Processing (No changes needed here) ---
+# libx264 presets offered for encodes; "medium" is what moviepy uses by default
+X264_PRESETS = [
+    "ultrafast", "superfast", "veryfast", "faster", "fast",
+    "medium", "slow", "slower", "veryslow",
+]
+
+
+# --- Exporting shared by the GUI worker, batch mode and the benchmark ---
+class ExportCancelled(Exception):
+    pass
+
+
+class CallbackProgressLogger(ProgressBarLogger):
+    """Reports moviepy's video encoding progress as whole percents and
+    aborts the encode when ``is_cancelled()`` turns true."""
+
+    def __init__(self, on_progress=None, is_cancelled=None):
+        super().__init__()
+        self.on_progress = on_progress
+        self.is_cancelled = is_cancelled
+        self.last_percent = -1
+
+    def bars_callback(self, bar, attr, value, old_value=None):
+        if self.is_cancelled and self.is_cancelled():
+            raise ExportCancelled()
+        if bar != "t" or attr != "index" or not self.on_progress:
+            return
+        percent = min(100, int(value * 100 / (self.bars[bar]["total"] or 1)))
+        if percent > self.last_percent:
+            self.last_percent = percent
+            self.on_progress(percent)
+
+
+def video_duration(path):
+    cap = cv2.VideoCapture(path)
+    try:
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        return cap.get(cv2.CAP_PROP_FRAME_COUNT) / fps
+    finally:
+        cap.release()
+
+
+def encode_video(input_path, output_path, crop_rect=None, start=None, end=None,
+                 threads=None, preset="medium", on_progress=None, is_cancelled=None):
+    """Re-encode [start, end) of the clip with libx264, cropped if a
+    rectangle is given."""
+    with VideoFileClip(input_path) as clip:
+        if start is not None or end is not None:
+            clip = clip.subclip(start or 0, end)
+        if crop_rect:
+            x1, y1, x2, y2 = crop_rect
+            clip = clip.crop(x1=x1, y1=y1, x2=x2, y2=y2)
+        clip.write_videofile(
+            output_path, codec="libx264", audio_codec="aac",
+            threads=threads, preset=preset,
+            logger=CallbackProgressLogger(on_progress, is_cancelled)
+        )
+
+
+def stream_copy(input_path, output_path, start=None, end=None, on_progress=None, is_cancelled=None):
+    """Cut [start, end) without re-encoding.
+
+    A copied stream can only begin on a keyframe, so the cut starts at the
+    last keyframe at or before ``start``. Returns that actual start time.
+    """
+    keyframes = list_keyframe_times(input_path)
+    start = start or 0.0
+    copy_start = max([t for t in keyframes if t <= start + 1e-3], default=0.0)
+    end = end if end is not None else video_duration(input_path)
+    duration = max(0.001, end - copy_start)
+
+    command = [
+        get_setting("FFMPEG_BINARY"), "-v", "error", "-nostats", "-y",
+        "-progress", "pipe:1",
+        "-ss", f"{copy_start:.6f}", "-i", input_path, "-t", f"{duration:.6f}",
+        "-map", "0", "-c", "copy", "-avoid_negative_ts", "make_zero",
+        output_path,
+    ]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    last_percent = -1
+    for line in process.stdout:
+        if is_cancelled and is_cancelled():
+            process.kill()
+            process.wait()
+            raise ExportCancelled()
+        if line.startswith("out_time_us=") and on_progress:
+            try:
+                percent = min(100, int(int(line.split("=", 1)[1]) / 1e6 * 100 / duration))
+            except ValueError:
+                continue
+            if percent > last_percent:
+                last_percent = percent
+                on_progress(percent)
+    if process.wait() != 0:
+        raise RuntimeError(f"ffmpeg failed: {process.stderr.read().strip()}")
+    if on_progress and last_percent < 100:
+        on_progress(100)
+    return copy_start
+
+
+def export_video(input_path, output_path, crop_rect=None, start=None, end=None,
+                 threads=None, preset="medium", on_progress=None, is_cancelled=None):
+    """Crop and/or trim a clip. Uncropped cuts are stream-copied, everything
+    else is re-encoded.
+
+    The clip is written to a ".partial" file next to the target and renamed
+    over it once complete, so an export that fails, is cancelled or is
+    killed never leaves a truncated file under the output's name.
+    """
+    root, ext = os.path.splitext(output_path)
+    # Same extension, so ffmpeg and moviepy still pick the container from it
+    partial_path = f"{root}.partial{ext}"
+    try:
+        if crop_rect:
+            encode_video(input_path, partial_path, crop_rect, start, end,
+                         threads, preset, on_progress, is_cancelled)
+        else:
+            stream_copy(input_path, partial_path, start, end, on_progress, is_cancelled)
+        os.replace(partial_path, output_path)
+    except BaseException:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
+
+
+# --- Batch Mode (no QApplication is created) ---
+def load_manifest(manifest_path):
+    """Read a JSON list of {"input", "output", "crop": [x1, y1, x2, y2],
+    "start": seconds, "end": seconds}; crop, start and end are optional.
+    Relative paths are resolved against the manifest's directory."""
+    with open(manifest_path) as f:
+        entries = json.load(f)
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    jobs = []
+    for number, entry in enumerate(entries, 1):
+        try:
+            crop_rect = None
+            if entry.get("crop"):
+                x1, y1, x2, y2 = (int(v) for v in entry["crop"])
+                crop_rect = (x1, y1, x2, y2)
+            start = float(entry["start"]) if entry.get("start") is not None else None
+            end = float(entry["end"]) if entry.get("end") is not None else None
+            jobs.append((
+                os.path.join(base_dir, entry["input"]),
+                os.path.join(base_dir, entry["output"]),
+                crop_rect, start, end,
+            ))
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(
+                f"Manifest entry {number} needs input and output, an optional crop "
+                "[x1, y1, x2, y2] and optional start/end seconds"
+            )
+    return jobs
+
+
+def export_params(job, preset):
+    """What a batch output is made from. Saved next to the output after a
+    successful export, so a rerun redoes it when the input file or its
+    manifest entry has changed."""
+    input_path, _, crop_rect, start, end = job
+    stat = os.stat(input_path)
+    return {
+        "input": os.path.abspath(input_path),
+        "input_size": stat.st_size,
+        "input_mtime": stat.st_mtime,
+        "crop": list(crop_rect) if crop_rect else None,
+        "start": start,
+        "end": end,
+        "preset": preset,
+    }
+
+
+def params_path(output_path):
+    return f"{output_path}.trim.json"
+
+
+def is_up_to_date(output_path, params):
+    if not os.path.exists(output_path):
+        return False
+    try:
+        with open(params_path(output_path)) as f:
+            return json.load(f) == params
+    except (OSError, ValueError):
+        # Missing (e.g. exported from the GUI) or unreadable: redo it
+        return False
+
+
+def _batch_export(index, job, threads, preset, queue):
+    last_step = [-1]
+
+    def report(percent):
+        # Only every 10% so parallel files do not flood the console
+        if percent // 10 > last_step[0]:
+            last_step[0] = percent // 10
+            queue.put((index, last_step[0] * 10))
+
+    input_path, output_path, crop_rect, start, end = job
+    params = export_params(job, preset)
+    started = time.perf_counter()
+    export_video(input_path, output_path, crop_rect, start, end,
+                 threads=threads, preset=preset, on_progress=report)
+    with open(params_path(output_path), "w") as f:
+        json.dump(params, f)
+    return time.perf_counter() - started
+
+
+def run_batch(manifest_path, workers=None, force=False, threads=None, preset="medium"):
+    jobs = load_manifest(manifest_path)
+    workers = max(1, workers or os.cpu_count() or 1)
+    # Split the cores between the parallel encoders instead of letting each
+    # ffmpeg start a thread per core
+    threads = threads or max(1, (os.cpu_count() or 1) // workers)
+    names = [os.path.basename(job[0]) for job in jobs]
+
+    pending = []
+    for index, job in enumerate(jobs):
+        input_path, output_path = job[0], job[1]
+        if not os.path.exists(input_path):
+            print(f"[{names[index]}] missing input, skipped")
+        elif not force and is_up_to_date(output_path, export_params(job, preset)):
+            print(f"[{names[index]}] up to date, skipped")
+        else:
+            pending.append((index, job))
+
+    started = time.perf_counter()
+    timings, failures = {}, {}
+    if pending:
+        print(f"Exporting {len(pending)} file(s) on {min(workers, len(pending))} process(es), "
+              f"{threads} encoder thread(s) each, preset {preset}")
+        with Manager() as manager, ProcessPoolExecutor(max_workers=workers) as pool:
+            queue = manager.Queue()
+            futures = {
+                pool.submit(_batch_export, index, job, threads, preset, queue): index
+                for index, job in pending
+            }
+            remaining = set(futures)
+            while remaining:
+                while not queue.empty():
+                    index, percent = queue.get()
+                    print(f"[{names[index]}] {percent}%")
+                for future in [f for f in remaining if f.done()]:
+                    remaining.discard(future)
+                    index = futures[future]
+                    try:
+                        timings[index] = future.result()
+                        print(f"[{names[index]}] done in {timings[index]:.1f}s")
+                    except Exception as e:
+                        failures[index] = str(e)
+                        print(f"[{names[index]}] failed: {e}")
+                if remaining:
+                    time.sleep(0.2)
+
+    wall = time.perf_counter() - started
+    busy = sum(timings.values())
+    print(f"\n{len(timings)} exported, {len(jobs) - len(pending)} skipped, {len(failures)} failed")
+    for index in sorted(timings):
+        print(f"  {names[index]}: {timings[index]:.1f}s")
+    if timings:
+        print(f"Wall time {wall:.1f}s, summed file time {busy:.1f}s, speedup {busy / wall:.2f}x")
+    return 1 if failures else 0
+
+
+# --- Background Frame Decoder for the Scrubber ---
+def list_keyframe_times(path):
+    """Presentation times of the video's keyframes, read without decoding
+    the other frames. Empty if ffmpeg cannot list them."""
+    command = [
+        get_setting("FFMPEG_BINARY"), "-hide_banner", "-nostats",
+        "-skip_frame", "nokey", "-i", path,
+        "-map", "0:v:0", "-vf", "showinfo", "-f", "null", "-",
+    ]
+    try:
+        result = subprocess.run(command, capture_output=True, text=True, timeout=120)
+    except (OSError, subprocess.SubprocessError):
+        return []
+    return sorted(float(t) for t in re.findall(r"pts_time:([0-9.]+)", result.stderr))
+
+
+class PreviewCache:
+    """LRU cache of downscaled frames keyed by frame index, capped in bytes."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._frames = OrderedDict()
+
+    def get(self, index):
+        image = self._frames.get(index)
+        if image is not None:
+            self._frames.move_to_end(index)
+        return image
+
+    def put(self, index, image):
+        if index in self._frames:
+            return
+        self._frames[index] = image
+        self.bytes += image.sizeInBytes()
+        while self.bytes > self.max_bytes and len(self._frames) > 1:
+            _, evicted = self._frames.popitem(last=False)
+            self.bytes -= evicted.sizeInBytes()
+
+
+class FrameDecoder(QThread):
+    """Decodes preview frames off the GUI thread.
+
+    Frames are read with ffmpeg, which seeks straight to a keyframe and
+    scales to preview size before handing the pixels over. Only the latest
+    request is served, so a fast drag never queues up stale frames. While
+    scrubbing, requests snap to the previous keyframe, which costs a single
+    decode; exact requests (slider released) decode forward from that
+    keyframe to the precise frame. The keyframe list is read in the
+    background; until it is ready every request seeks by time.
+    """
+    opened = pyqtSignal(int, int, int, float)  # width, height, frame count, fps
+    frame_ready = pyqtSignal(int, QImage)
+    error = pyqtSignal(str)
+
+    def __init__(self, path, parent=None):
+        super().__init__(parent)
+        self.path = path
+        self.cache = PreviewCache(PREVIEW_CACHE_BYTES)
+        self._condition = threading.Condition()
+        self._request = None
+        self._stopping = False
+        self._fps = 30.0
+        self._preview_size = (0, 0)
+        self._keyframes = []  # frame indices
+        self._keyframe_times = {}  # frame index -> exact pts time
+        self._shown = None  # index of the last frame sent to the GUI
+
+    def request(self, index, exact):
+        with self._condition:
+            self._request = (index, exact)
+            self._condition.notify()
+
+    def stop(self):
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+        self.wait()
+
+    def run(self):
+        cap = cv2.VideoCapture(self.path)
+        opened = cap.isOpened()
+        width, height = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        self._fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        cap.release()
+        if not opened or not width or not height:
+            self.error.emit(f"Could not open video: {self.path}")
+            return
+
+        scale = min(1.0, PREVIEW_MAX_EDGE / max(width, height))
+        self._preview_size = (max(1, int(width * scale)), max(1, int(height * scale)))
+        self.opened.emit(width, height, frame_count, self._fps)
+        # Listing keyframes reads through the whole file, which takes a
+        # while on long footage; the first frames must not wait for it
+        threading.Thread(target=self._load_keyframes, daemon=True).start()
+
+        while True:
+            with self._condition:
+                while self._request is None and not self._stopping:
+                    self._condition.wait()
+                if self._stopping:
+                    return
+                index, exact = self._request
+                self._request = None
+            self._serve(index, exact)
+
+    def _load_keyframes(self):
+        keyframe_times = {}
+        for t in list_keyframe_times(self.path):
+            keyframe_times[int(round(t * self._fps))] = t
+        with self._condition:
+            self._keyframe_times = keyframe_times
+            self._keyframes = sorted(keyframe_times)
+
+    def _serve(self, index, exact):
+        with self._condition:
+            keyframes, keyframe_times = self._keyframes, self._keyframe_times
+        if not exact and keyframes:
+            index = keyframes[max(0, bisect.bisect_right(keyframes, index) - 1)]
+        if index == self._shown:
+            return
+        cached = self.cache.get(index)
+        if cached is None:
+            cached = self._decode(index, keyframe_times)
+            if cached is None:
+                return
+            self.cache.put(index, cached)
+        self._shown = index
+        self.frame_ready.emit(index, cached)
+
+    def _decode(self, index, keyframe_times):
+        w, h = self._preview_size
+        seconds = keyframe_times.get(index, index / self._fps)
+        command = [
+            get_setting("FFMPEG_BINARY"), "-v", "error",
+            "-ss", f"{seconds:.6f}", "-i", self.path,
+            "-frames:v", "1", "-vf", f"scale={w}:{h}:flags=area",
+            "-f", "rawvideo", "-pix_fmt", "rgb24", "-",
+        ]
+        try:
+            result = subprocess.run(command, capture_output=True, timeout=60)
+        except (OSError, subprocess.SubprocessError):
+            return None
+        if len(result.stdout) < w * h * 3:
+            return None
+        # copy() so the image owns its pixels once the buffer is freed
+        return QImage(result.stdout, w, h, w * 3, QImage.Format_RGB888).copy()
+
+
+# --- Worker Thread for MoviePy Processing ---
 class Worker(QObject):
     finished = pyqtSignal()
+    cancelled = pyqtSignal()
+    progress = pyqtSignal(int)
     error = pyqtSignal(str)
 
-    def __init__(self, input_path, output_path, crop_rect):
+    def __init__(self, input_path, output_path, crop_rect, start=None, end=None,
+                 threads=None, preset="medium"):
         super().__init__()
         self.input_path = input_path
         self.output_path = output_path
         self.crop_rect = crop_rect
+        self.start = start
+        self.end = end
+        self.threads = threads
+        self.preset = preset
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        # Called from the GUI thread; checked between encoded frames
+        self._cancel.set()
 
     def run(self):
         try:
-            with VideoFileClip(self.input_path) as clip:
-                x1, y1, x2, y2 = self.crop_rect
-                cropped_clip = clip.crop(x1=x1, y1=y1, x2=x2, y2=y2)
-                cropped_clip.write_videofile(
-                    self.output_path, codec="libx264", audio_codec="aac"
-                )
+            export_video(
+                self.input_path, self.output_path, self.crop_rect, self.start, self.end,
+                threads=self.threads, preset=self.preset,
+                on_progress=self.progress.emit, is_cancelled=self._cancel.is_set
+            )
             self.finished.emit()
+        except ExportCancelled:
+            self.cancelled.emit()
         except Exception as e:
             self.error.emit(f"An error occurred: {str(e)}")
 
@@ -92,7 +537,12 @@ class MainWindow(QMainWindow):
         self.crop_area = None
         self.thread = None
         self.worker = None
-        self.original_pixmap = QPixmap()
+        self.decoder = None
+        self.original_pixmap = QPixmap()  # Current frame at preview resolution
+        self.video_size = None  # (width, height) of the source
+        self.fps = 30.0
+        self.trim_start = None  # frame indices; None means the clip's own ends
+        self.trim_end = None
 
         self.init_ui()
         self.load_initial_video() # Automatically load the video on start
@@ -119,14 +569,59 @@ class MainWindow(QMainWindow):
         self.preview_label.area_selected.connect(self.on_area_selected)
         main_layout.addWidget(self.preview_label, 1)
 
-        self.start_btn = QPushButton("Start Cropping")
+        scrub_layout = QHBoxLayout()
+        self.scrubber = QSlider(Qt.Horizontal)
+        self.scrubber.setEnabled(False)
+        self.scrubber.valueChanged.connect(self.on_scrub)
+        self.scrubber.sliderReleased.connect(self.on_scrub_released)
+        scrub_layout.addWidget(self.scrubber, 1)
+        self.position_label = QLabel("0:00.00")
+        scrub_layout.addWidget(self.position_label)
+        main_layout.addLayout(scrub_layout)
+
+        trim_layout = QHBoxLayout()
+        self.set_start_btn = QPushButton("Set Start")
+        self.set_start_btn.clicked.connect(self.on_set_start)
+        self.set_end_btn = QPushButton("Set End")
+        self.set_end_btn.clicked.connect(self.on_set_end)
+        self.clear_trim_btn = QPushButton("Clear Trim")
+        self.clear_trim_btn.clicked.connect(self.on_clear_trim)
+        self.trim_label = QLabel("Whole clip")
+        for widget in (self.set_start_btn, self.set_end_btn, self.clear_trim_btn):
+            widget.setEnabled(False)
+            trim_layout.addWidget(widget)
+        trim_layout.addWidget(self.trim_label, 1)
+        trim_layout.addWidget(QLabel("Preset:"))
+        self.preset_box = QComboBox()
+        self.preset_box.addItems(X264_PRESETS)
+        self.preset_box.setCurrentText("medium")
+        trim_layout.addWidget(self.preset_box)
+        trim_layout.addWidget(QLabel("Threads:"))
+        self.threads_box = QSpinBox()
+        self.threads_box.setRange(0, os.cpu_count() or 1)
+        self.threads_box.setSpecialValueText("auto")
+        trim_layout.addWidget(self.threads_box)
+        main_layout.addLayout(trim_layout)
+
+        button_layout = QHBoxLayout()
+        self.start_btn = QPushButton("Start Export")
         self.start_btn.clicked.connect(self.start_cropping)
         self.start_btn.setEnabled(False)
         self.start_btn.setStyleSheet("font-size: 16px; padding: 10px;")
-        main_layout.addWidget(self.start_btn)
+        button_layout.addWidget(self.start_btn, 1)
+        self.cancel_btn = QPushButton("Cancel")
+        self.cancel_btn.clicked.connect(self.cancel_cropping)
+        self.cancel_btn.setEnabled(False)
+        self.cancel_btn.setStyleSheet("font-size: 16px; padding: 10px;")
+        button_layout.addWidget(self.cancel_btn)
+        main_layout.addLayout(button_layout)
         
         self.status_bar = QStatusBar()
         self.setStatusBar(self.status_bar)
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 100)
+        self.progress_bar.setVisible(False)
+        self.status_bar.addPermanentWidget(self.progress_bar)
         self.status_bar.showMessage("Ready.")
 
     def load_initial_video(self):
@@ -137,23 +632,65 @@ class MainWindow(QMainWindow):
             return
 
         self.status_bar.showMessage(f"Loaded: {os.path.basename(INPUT_VIDEO_PATH)}")
-        self.load_and_display_first_frame()
+        self.start_preview_decoder()
+
+    def start_preview_decoder(self):
+        self.decoder = FrameDecoder(INPUT_VIDEO_PATH, self)
+        self.decoder.opened.connect(self.on_video_opened)
+        self.decoder.frame_ready.connect(self.on_frame_ready)
+        self.decoder.error.connect(self.show_error)
+        self.decoder.start()
+        self.decoder.request(0, True)
+
+    def on_video_opened(self, width, height, frame_count, fps):
+        self.video_size = (width, height)
+        self.fps = fps
+        self.scrubber.setRange(0, max(0, frame_count - 1))
+        self.scrubber.setEnabled(frame_count > 1)
+        for widget in (self.set_start_btn, self.set_end_btn, self.clear_trim_btn):
+            widget.setEnabled(frame_count > 1)
+        # Cropping is optional now; a trim alone is exported by stream copy
+        self.start_btn.setEnabled(True)
 
-    def load_and_display_first_frame(self):
-        try:
-            cap = cv2.VideoCapture(INPUT_VIDEO_PATH)
-            ret, frame = cap.read()
-            cap.release()
-            if ret:
-                frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                h, w, ch = frame_rgb.shape
-                q_image = QImage(frame_rgb.data, w, h, ch * w, QImage.Format_RGB888)
-                self.original_pixmap = QPixmap.fromImage(q_image)
-                self.update_preview_pixmap()
-            else:
-                self.show_error("Could not read the first frame of the video.")
-        except Exception as e:
-            self.show_error(f"Error loading video frame: {e}")
+    def on_scrub(self, index):
+        self.position_label.setText(self.format_time(index))
+        # Exact frames only once the user lets go of the slider
+        self.decoder.request(index, not self.scrubber.isSliderDown())
+
+    def on_scrub_released(self):
+        self.decoder.request(self.scrubber.value(), True)
+
+    def on_frame_ready(self, index, image):
+        self.original_pixmap = QPixmap.fromImage(image)
+        self.update_preview_pixmap()
+
+    def format_time(self, index):
+        seconds = index / self.fps
+        return f"{int(seconds // 60)}:{seconds % 60:05.2f}"
+
+    def on_set_start(self):
+        self.trim_start = self.scrubber.value()
+        if self.trim_end is not None and self.trim_end <= self.trim_start:
+            self.trim_end = None
+        self.update_trim_label()
+
+    def on_set_end(self):
+        self.trim_end = self.scrubber.value()
+        if self.trim_start is not None and self.trim_start >= self.trim_end:
+            self.trim_start = None
+        self.update_trim_label()
+
+    def on_clear_trim(self):
+        self.trim_start = self.trim_end = None
+        self.update_trim_label()
+
+    def update_trim_label(self):
+        if self.trim_start is None and self.trim_end is None:
+            self.trim_label.setText("Whole clip")
+            return
+        start = self.format_time(self.trim_start or 0)
+        end = self.format_time(self.trim_end) if self.trim_end is not None else "end"
+        self.trim_label.setText(f"{start} - {end}")
 
     def update_preview_pixmap(self):
         if self.original_pixmap.isNull():
@@ -169,10 +706,11 @@ class MainWindow(QMainWindow):
 
     def on_area_selected(self, rect):
         pixmap = self.preview_label.pixmap()
-        if not pixmap or pixmap.isNull(): return
+        if not pixmap or pixmap.isNull() or not self.video_size: return
             
+        # The preview is downscaled; map the selection to source pixels
         pw, ph = pixmap.width(), pixmap.height() 
-        ow, oh = self.original_pixmap.width(), self.original_pixmap.height()
+        ow, oh = self.video_size
         scale_x, scale_y = ow / pw, oh / ph
         offset_x = (self.preview_label.width() - pw) / 2
         offset_y = (self.preview_label.height() - ph) / 2
@@ -185,28 +723,56 @@ class MainWindow(QMainWindow):
         x1, x2 = sorted([max(0, x1), min(ow, x2)])
         y1, y2 = sorted([max(0, y1), min(oh, y2)])
 
+        if x2 - x1 < 2 or y2 - y1 < 2:
+            # A click without a drag clears the crop
+            self.crop_area = None
+            self.status_bar.showMessage("Crop cleared; the full frame will be exported.")
+            return
         self.crop_area = (x1, y1, x2, y2)
         self.status_bar.showMessage(f"Area selected: ({x1}, {y1}) to ({x2}, {y2})")
         self.start_btn.setEnabled(True)
 
     def start_cropping(self):
         self.start_btn.setEnabled(False)
-        self.status_bar.showMessage("Processing... this may take a while.")
-
+        self.cancel_btn.setEnabled(True)
+        self.progress_bar.setValue(0)
+        self.progress_bar.setVisible(True)
+        if self.crop_area:
+            self.status_bar.showMessage("Encoding... this may take a while.")
+        else:
+            self.status_bar.showMessage("Cutting without re-encoding...")
+
+        start = self.trim_start / self.fps if self.trim_start is not None else None
+        end = self.trim_end / self.fps if self.trim_end is not None else None
         self.thread = QThread()
-        self.worker = Worker(INPUT_VIDEO_PATH, OUTPUT_VIDEO_PATH, self.crop_area)
+        self.worker = Worker(
+            INPUT_VIDEO_PATH, OUTPUT_VIDEO_PATH, self.crop_area, start, end,
+            threads=self.threads_box.value() or None, preset=self.preset_box.currentText()
+        )
         self.worker.moveToThread(self.thread)
         self.thread.started.connect(self.worker.run)
+        self.worker.progress.connect(self.progress_bar.setValue)
         self.worker.finished.connect(self.on_cropping_finished)
+        self.worker.cancelled.connect(self.on_cropping_cancelled)
         self.worker.error.connect(self.on_cropping_error)
         self.thread.start()
 
+    def cancel_cropping(self):
+        if self.worker:
+            self.cancel_btn.setEnabled(False)
+            self.status_bar.showMessage("Cancelling...")
+            self.worker.cancel()
+
     def on_cropping_finished(self):
-        msg = f"Cropping complete! File saved to {OUTPUT_VIDEO_PATH}"
+        msg = f"Export complete! File saved to {OUTPUT_VIDEO_PATH}"
         self.status_bar.showMessage(msg)
         QMessageBox.information(self, "Success", msg)
         self.cleanup_thread()
 
+    def on_cropping_cancelled(self):
+        self.status_bar.showMessage("Export cancelled.")
+        self.cleanup_thread()
+
     def on_cropping_error(self, error_message):
         self.status_bar.showMessage("An error occurred during processing.")
         self.show_error(error_message)
@@ -217,11 +783,92 @@ class MainWindow(QMainWindow):
         self.thread.wait()
         self.thread, self.worker = None, None
         self.start_btn.setEnabled(True)
+        self.cancel_btn.setEnabled(False)
+        self.progress_bar.setVisible(False)
 
     def show_error(self, message):
         QMessageBox.critical(self, "Error", message)
 
+    def closeEvent(self, event):
+        if self.worker:
+            self.worker.cancel()
+        if self.thread:
+            self.thread.quit()
+            self.thread.wait()
+        if self.decoder:
+            self.decoder.stop()
+        super().closeEvent(event)
+
+# --- Benchmark ---
+def run_benchmark(input_path, threads=None, preset="ultrafast"):
+    """Time the old export path (whole clip re-encoded with moviepy's
+    defaults) against a trimmed encode and a trimmed stream copy."""
+    if not os.path.exists(input_path):
+        print(f"Input file not found: {input_path}")
+        return 1
+    duration = video_duration(input_path)
+    cap = cv2.VideoCapture(input_path)
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    cap.release()
+    # The middle half of the clip, cropped to the centre quarter of the frame
+    start, end = duration / 4, duration * 3 / 4
+    crop_rect = (width // 4, height // 4, width * 3 // 4, height * 3 // 4)
+
+    cases = [
+        ("whole clip, crop, defaults (old path)",
+         dict(crop_rect=crop_rect, threads=None, preset="medium")),
+        (f"trimmed, crop, preset {preset}",
+         dict(crop_rect=crop_rect, start=start, end=end, threads=threads, preset=preset)),
+        ("trimmed, no crop, stream copy",
+         dict(start=start, end=end)),
+    ]
+    print(f"{os.path.basename(input_path)}: {width}x{height}, {duration:.2f}s, "
+          f"trim {start:.2f}s-{end:.2f}s")
+    work_dir = tempfile.mkdtemp(prefix="video-trim-bench-")
+    try:
+        baseline = None
+        for number, (label, options) in enumerate(cases):
+            output_path = os.path.join(work_dir, f"case{number}.mp4")
+            started = time.perf_counter()
+            if "crop_rect" in options:
+                encode_video(input_path, output_path, **options)
+            else:
+                stream_copy(input_path, output_path, **options)
+            elapsed = time.perf_counter() - started
+            baseline = baseline or elapsed
+            size_kb = os.path.getsize(output_path) / 1024
+            print(f"  {label:<40} {elapsed:7.2f}s  {size_kb:9.0f} KB  {baseline / elapsed:6.1f}x")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return 0
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        description="Crop and trim videos. Without --batch or --benchmark the window is opened."
+    )
+    parser.add_argument("--batch", metavar="MANIFEST",
+                        help='JSON list of {"input", "output", "crop": [x1, y1, x2, y2], '
+                             '"start": s, "end": s}; crop, start and end are optional')
+    parser.add_argument("--jobs", type=int, default=None,
+                        help="parallel processes (default: number of cores)")
+    parser.add_argument("--force", action="store_true",
+                        help="re-export outputs already made from the same input and settings")
+    parser.add_argument("--threads", type=int, default=None,
+                        help="encoder threads per file (default: cores split between --jobs)")
+    parser.add_argument("--preset", choices=X264_PRESETS, default=None,
+                        help="x264 preset for re-encodes (default: medium; ultrafast for --benchmark)")
+    parser.add_argument("--benchmark", metavar="VIDEO", nargs="?", const=OUTPUT_VIDEO_PATH,
+                        help=f"time the export paths on VIDEO (default: the bundled {OUTPUT_VIDEO_PATH})")
+    return parser.parse_args(argv)
+
 if __name__ == "__main__":
+    args = parse_args(sys.argv[1:])
+    if args.benchmark:
+        sys.exit(run_benchmark(args.benchmark, args.threads, args.preset or "ultrafast"))
+    if args.batch:
+        sys.exit(run_batch(args.batch, args.jobs, args.force, args.threads, args.preset or "medium"))
+
     app = QApplication(sys.argv)
     window = MainWindow()
     window.show()